@@ -1,7 +1,14 @@
 from flask import request, url_for
 from flask.ext.api import FlaskAPI, status, exceptions
+from flask.ext.api.decorators import validate_data
+from flask.ext.api.pagination import paginate
+from flask.ext.api.schema import Optional
+import os
 
 app = FlaskAPI(__name__)
+# Signs pagination cursors.  Without a configured key, a random one is used,
+# so cursors are only valid until the server restarts.
+app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or os.urandom(32)
 
 
 notes = {
@@ -17,28 +24,33 @@ def note_repr(key):
     }
 
 
+note_schema = {'text': Optional(str, default='')}
+
+
 @app.route("/", methods=['GET', 'POST'])
+@validate_data(note_schema)
 def notes_list():
     """
     List or create notes.
     """
     if request.method == 'POST':
-        note = str(request.data.get('text', ''))
+        note = request.data['text']
         idx = max(notes.keys()) + 1
         notes[idx] = note
         return note_repr(idx), status.HTTP_201_CREATED
 
     # request.method == 'GET'
-    return [note_repr(idx) for idx in sorted(notes.keys())]
+    return paginate(sorted(notes.keys()), key=lambda idx: idx, serializer=note_repr)
 
 
 @app.route("/<int:key>/", methods=['GET', 'PUT', 'DELETE'])
+@validate_data(note_schema)
 def notes_detail(key):
     """
     Retrieve, update or delete note instances.
     """
     if request.method == 'PUT':
-        note = str(request.data.get('text', ''))
+        note = request.data['text']
         notes[key] = note
         return note_repr(key)
 
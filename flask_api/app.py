@@ -1,13 +1,25 @@
 # coding: utf8
 from __future__ import unicode_literals
-from flask import request, Flask, Blueprint
+from flask import current_app, request, Flask, Blueprint
 from flask._compat import reraise, string_types, text_type
+from flask_api import exceptions, renderers
+from flask_api.batch import Batcher, parse_batch, BATCH_ENVIRON_KEY, INHERITED_HEADERS
+from flask_api.cache import LRUCache
+from flask_api.coalesce import Coalescer, get_coalesce_key
+from flask_api.compression import compress_response
+from flask_api.decorators import set_renderers
+from flask_api.etags import make_etag, not_modified
 from flask_api.exceptions import APIException
+from flask_api.idempotency import Idempotency, UNSAFE_METHODS
+from flask_api.pipeline import get_pipeline
+from flask_api.precompute import Precomputer
 from flask_api.request import APIRequest
-from flask_api.response import APIResponse
+from flask_api.response import APIResponse, get_matching_etag
 from flask_api.settings import APISettings
+from flask_api.streaming import is_streaming, StreamingList
 from itertools import chain
 from werkzeug.exceptions import HTTPException
+from werkzeug.wsgi import get_content_length
 import re
 import sys
 from flask_api.compat import is_flask_legacy
@@ -20,6 +32,32 @@ api_resources = Blueprint(
 )
 
 
+@api_resources.route('/batch/', methods=['POST'])
+@set_renderers(renderers.JSONRenderer, renderers.NDJSONRenderer)
+def batch():
+    """
+    Dispatch a list of sub-requests, if `BATCH_REQUESTS` is set, streaming
+    out their results as they complete.
+    """
+    settings = current_app.api_settings
+    if not settings.BATCH_REQUESTS or BATCH_ENVIRON_KEY in request.environ:
+        raise exceptions.NotFound()
+    items = parse_batch(request.data, settings.BATCH_MAX_SIZE)
+    inherited_headers = [
+        (key, request.headers[key]) for key in INHERITED_HEADERS
+        if key in request.headers
+    ]
+    results = current_app.batcher.run(
+        items,
+        request.url_root,
+        inherited_headers,
+        concurrency=settings.BATCH_CONCURRENCY,
+        timeout=settings.BATCH_TIMEOUT
+    )
+    # Send each result as soon as it is available.
+    return StreamingList(results, chunk_size=1)
+
+
 def urlize_quoted_links(content):
     return re.sub(r'"(https?://[^"]*)"', r'"<a href="\1">\1</a>"', content)
 
@@ -31,13 +69,157 @@ class FlaskAPI(Flask):
     def __init__(self, *args, **kwargs):
         super(FlaskAPI, self).__init__(*args, **kwargs)
         self.api_settings = APISettings(self.config)
+        self.negotiation_cache = LRUCache()
+        self.coalescer = Coalescer()
+        self._response_cache = None
+        self._precomputer = None
+        self._idempotency = None
+        self._batcher = None
+        self.data_loaders = {}
         self.register_blueprint(api_resources)
         self.jinja_env.filters['urlize_quoted_links'] = urlize_quoted_links
 
+    @property
+    def response_cache(self):
+        """
+        The backend used by the `cache_response` decorator, which is created
+        from the `RESPONSE_CACHE_BACKEND` setting when it is first used.
+        """
+        if self._response_cache is None:
+            backend = self.api_settings.RESPONSE_CACHE_BACKEND
+            self._response_cache = backend(**self.api_settings.RESPONSE_CACHE_OPTIONS)
+        return self._response_cache
+
+    @property
+    def precomputer(self):
+        """
+        Holds and refreshes the responses of views using the `precompute`
+        decorator.  Its threads are started when first used.
+        """
+        if self._precomputer is None:
+            settings = self.api_settings
+            self._precomputer = Precomputer(
+                self, workers=settings.PRECOMPUTE_WORKERS, max_entries=settings.PRECOMPUTE_MAX_ENTRIES
+            )
+        return self._precomputer
+
+    @property
+    def idempotency(self):
+        """
+        Stores and replays responses for the 'Idempotency-Key' header, if
+        `IDEMPOTENCY_KEYS` is set.  The store is created when first used.
+        """
+        if self._idempotency is None:
+            settings = self.api_settings
+            store = settings.IDEMPOTENCY_BACKEND(**settings.IDEMPOTENCY_OPTIONS)
+            self._idempotency = Idempotency(store, settings.IDEMPOTENCY_TIMEOUT, settings.IDEMPOTENCY_LOCK_TIMEOUT)
+        return self._idempotency
+
+    @property
+    def batcher(self):
+        """
+        Dispatches the sub-requests of batch requests.  Its threads are
+        started when first used.
+        """
+        if self._batcher is None:
+            self._batcher = Batcher(self, workers=self.api_settings.BATCH_WORKERS)
+        return self._batcher
+
+    def data_loader(self, relation):
+        """
+        A decorator that registers a function to load the related resources
+        for `relation`, for use by `flask_api.expand.expand()`.  The function
+        is called with a list of keys.
+        """
+        def decorator(func):
+            self.data_loaders[relation] = func
+            return func
+        return decorator
+
     def preprocess_request(self):
-        request.parser_classes = self.api_settings.DEFAULT_PARSERS
-        request.renderer_classes = self.api_settings.DEFAULT_RENDERERS
-        return super(FlaskAPI, self).preprocess_request()
+        settings = self.api_settings
+        request.parser_classes = settings.DEFAULT_PARSERS
+        request.renderer_classes = settings.DEFAULT_RENDERERS
+        cache_size = settings.NEGOTIATION_CACHE_SIZE
+        if cache_size:
+            self.negotiation_cache.maxsize = cache_size
+            request.negotiation_cache = self.negotiation_cache
+
+        if request.url_rule is not None:
+            view_func = self.view_functions.get(request.url_rule.endpoint)
+            request.route_max_content_length = getattr(view_func, 'max_content_length', None)
+            if settings.EARLY_BODY_CHECKS:
+                # Use the view's parsers, rather than waiting for `set_parsers`
+                # to set them.
+                request.parser_classes = getattr(view_func, 'parser_classes', request.parser_classes)
+
+        rv = super(FlaskAPI, self).preprocess_request()
+        if rv is None and settings.EARLY_BODY_CHECKS:
+            request.check_body()
+        return rv
+
+    def dispatch_request(self):
+        """
+        We override this so that identical concurrent requests may share
+        a single execution of the view, if `COALESCE_REQUESTS` is set, and
+        so that retried requests with an 'Idempotency-Key' header can be
+        replayed, if `IDEMPOTENCY_KEYS` is set.
+        """
+        settings = self.api_settings
+        if request.routing_exception is not None:
+            return super(FlaskAPI, self).dispatch_request()
+
+        def view():
+            return self.make_response(super(FlaskAPI, self).dispatch_request())
+
+        if settings.COALESCE_REQUESTS and request.method in ('GET', 'HEAD'):
+            # The key includes the negotiated media type, so use the view's
+            # renderers, rather than waiting for `set_renderers` to set them.
+            view_func = self.view_functions[request.url_rule.endpoint]
+            request.renderer_classes = getattr(view_func, 'renderer_classes', request.renderer_classes)
+            self.coalescer.timeout = settings.COALESCE_TIMEOUT
+            return self.coalescer.run(get_coalesce_key(request), view, self.response_class)
+
+        if settings.IDEMPOTENCY_KEYS and request.method in UNSAFE_METHODS and 'Idempotency-Key' in request.headers:
+            return self.idempotency.run(request, view, self.response_class)
+
+        return super(FlaskAPI, self).dispatch_request()
+
+    def add_url_rule(self, rule, endpoint=None, view_func=None, **options):
+        super(FlaskAPI, self).add_url_rule(rule, endpoint, view_func, **options)
+        # Compile the view's parsers and renderers once, up front, rather
+        # than on the first request.  Note that `Flask.__init__()` registers
+        # the static route before `api_settings` exists.
+        if view_func is not None and hasattr(self, 'api_settings'):
+            get_pipeline(
+                getattr(view_func, 'parser_classes', self.api_settings.DEFAULT_PARSERS),
+                getattr(view_func, 'renderer_classes', self.api_settings.DEFAULT_RENDERERS),
+                self.request_class.negotiator_class
+            )
+
+    def process_response(self, response):
+        response = super(FlaskAPI, self).process_response(response)
+        settings = self.api_settings
+        if request.body_rejected:
+            # The body has not been read, so the connection can not be reused.
+            response.headers['Connection'] = 'close'
+        if response.status_code == 200 and request.method in ('GET', 'HEAD'):
+            if settings.ETAGS and 'ETag' not in response.headers and not (
+                    response.is_streamed or response.direct_passthrough):
+                response.headers['ETag'] = make_etag(settings.ETAG_HASH, response.get_data())
+            if 'ETag' in response.headers:
+                matched = get_matching_etag(response.headers['ETag'])
+                if matched is not None:
+                    response = not_modified(response, matched)
+        if settings.COMPRESSION:
+            response = compress_response(
+                response,
+                request.headers.get('Accept-Encoding'),
+                settings.COMPRESSION_ENCODINGS,
+                settings.COMPRESSION_MEDIA_TYPES,
+                settings.COMPRESSION_MIN_SIZE
+            )
+        return response
 
     def make_response(self, rv):
         """
@@ -54,10 +236,17 @@ class FlaskAPI(Flask):
         if isinstance(status_or_headers, (dict, list)):
             headers, status_or_headers = status_or_headers, None
 
+        if is_streaming(rv) and not isinstance(rv, StreamingList):
+            rv = StreamingList(rv)
+
         if not isinstance(rv, self.response_class):
-            if isinstance(rv, (text_type, bytes, bytearray, list, dict)):
+            if isinstance(rv, (text_type, bytes, bytearray, list, dict, StreamingList)):
                 status = status_or_headers
-                rv = self.response_class(rv, headers=headers, status=status)
+                try:
+                    rv = self.response_class(rv, headers=headers, status=status)
+                except APIException as exc:
+                    # Eg. a `NotAcceptable` raised by content negotiation.
+                    return self.handle_api_exception(exc)
                 headers = status_or_headers = None
             else:
                 rv = self.response_class.force_type(rv, request.environ)
@@ -89,7 +278,7 @@ class FlaskAPI(Flask):
         handlers = self.error_handler_spec.get(request.blueprint)
         if handlers is not None:
             blueprint_handlers = handlers.get(None, ())
-        app_handlers = self.error_handler_spec[None].get(None, ())
+        app_handlers = self.error_handler_spec.get(None, {}).get(None, ())
         if is_flask_legacy():
             for typecheck, handler in chain(blueprint_handlers, app_handlers):
                 if isinstance(e, typecheck):
@@ -103,7 +292,31 @@ class FlaskAPI(Flask):
         reraise(exc_type, exc_value, tb)
 
     def handle_api_exception(self, exc):
-        return APIResponse({'message': exc.detail}, status=exc.status_code)
+        content = {'message': exc.detail}
+        errors = getattr(exc, 'errors', None)
+        if errors:
+            content['errors'] = errors
+        return APIResponse(content, status=exc.status_code)
+
+    def allows_method_overloading(self, request):
+        """
+        Return `False` if the request is routed, by its original method, to a
+        view that disables method overloading, or if the request is too large
+        to be read.
+        """
+        adapter = self.url_map.bind_to_environ(request.environ, server_name=self.config['SERVER_NAME'])
+        try:
+            rule, view_args = adapter.match(return_rule=True)
+            view_func = self.view_functions.get(rule.endpoint)
+        except HTTPException:
+            # Eg. the URL only allows the overloaded method.
+            view_func = None
+        if not getattr(view_func, 'method_overloading', True):
+            return False
+        # Oversized forms are left to be rejected without being read.
+        max_length = getattr(view_func, 'max_content_length', None) or self.config['MAX_CONTENT_LENGTH']
+        length = get_content_length(request.environ) or 0
+        return max_length is None or length <= max_length
 
     def create_url_adapter(self, request):
         """
@@ -113,6 +326,10 @@ class FlaskAPI(Flask):
         browsable API are routed to the correct view.
         """
         if request is not None:
+            # Set before the request is read, as there is no app context yet.
+            request.api_settings = self.api_settings
+            if self.api_settings.METHOD_OVERLOADING and request.is_overloadable():
+                request.method_overloading = self.allows_method_overloading(request)
             environ = request.environ.copy()
             environ['REQUEST_METHOD'] = request.method
             return self.url_map.bind_to_environ(environ,
@@ -0,0 +1,218 @@
+# coding: utf8
+"""
+Batching of sub-requests into a single request.
+
+When enabled with the `BATCH_REQUESTS` setting, a JSON array of
+sub-requests may be posted to the batch endpoint.  Each sub-request is
+dispatched internally, through the application's URL map and views, in a
+pool of worker threads, and the results are streamed back as they complete.
+"""
+from __future__ import unicode_literals
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from flask._compat import string_types, text_type
+from flask_api import exceptions, status
+from werkzeug.datastructures import Headers
+import json
+import threading
+import time
+
+
+# Headers of the batch request that are passed on to each sub-request,
+# unless the sub-request sets them itself.
+INHERITED_HEADERS = ('Authorization', 'Cookie', 'Accept-Language')
+
+# Set in the WSGI environ of sub-requests, so that batches can not be nested.
+BATCH_ENVIRON_KEY = 'flask_api.batch'
+
+
+def parse_batch(data, max_size):
+    """
+    Validate the body of a batch request, returning a list of sub-requests,
+    each a dict with `id`, `method`, `path`, `headers` and `body` keys.
+    """
+    if not isinstance(data, list):
+        raise exceptions.ParseError('Batch requests must be a list of requests.')
+    if max_size is not None and len(data) > max_size:
+        raise exceptions.ParseError('Batch requests may contain at most %d requests.' % max_size)
+
+    items = []
+    for idx, item in enumerate(data):
+        if not isinstance(item, dict):
+            raise exceptions.ParseError('Request %d must be an object.' % idx)
+        method = item.get('method', 'GET')
+        path = item.get('path')
+        headers = item.get('headers', {})
+        if not isinstance(method, string_types):
+            raise exceptions.ParseError('Request %d has an invalid "method".' % idx)
+        if not isinstance(path, string_types) or not path.startswith('/'):
+            raise exceptions.ParseError('Request %d must have a "path" starting with "/".' % idx)
+        if not isinstance(headers, dict) or not all(
+                isinstance(value, string_types) for value in headers.values()):
+            raise exceptions.ParseError('Request %d has invalid "headers".' % idx)
+        items.append({
+            'id': item.get('id'),
+            'method': method.upper(),
+            'path': path,
+            'headers': headers,
+            'body': item.get('body')
+        })
+    return items
+
+
+def get_response_body(response):
+    """
+    Return a sub-request's response body, decoded if it is JSON.
+    """
+    data = response.get_data()
+    if response.mimetype == 'application/json' or response.mimetype.endswith('+json'):
+        try:
+            return json.loads(data.decode('utf8'))
+        except ValueError:
+            pass
+    return data.decode(response.charset or 'utf8', 'replace')
+
+
+class Batcher(object):
+    """
+    Dispatches the sub-requests of batch requests in a pool of `workers`
+    threads, which is shared by every batch.
+    """
+
+    def __init__(self, app, workers=8):
+        self.app = app
+        self.workers = workers
+        self.batches = 0
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def dispatch(self, item, base_url, inherited_headers):
+        """
+        Run a single sub-request, returning its status code, headers and
+        body.
+        """
+        headers = Headers(inherited_headers)
+        headers.setdefault('Accept', 'application/json')
+        for key, value in item['headers'].items():
+            headers[key] = value
+        kwargs = {}
+        body = item['body']
+        if body is not None:
+            # String bodies with an explicit content type are sent as-is,
+            # anything else is sent as JSON.
+            if not (isinstance(body, string_types) and 'Content-Type' in headers):
+                body = json.dumps(body)
+                headers['Content-Type'] = 'application/json'
+            kwargs['data'] = body.encode('utf8')
+
+        with self.app.test_request_context(
+                item['path'],
+                method=item['method'],
+                base_url=base_url,
+                headers=headers,
+                environ_overrides={BATCH_ENVIRON_KEY: True},
+                **kwargs):
+            response = self.app.full_dispatch_request()
+            # Read the body while the request context is still active, as
+            # it may be streamed.
+            return response.status_code, list(response.headers.items()), get_response_body(response)
+
+    def run(self, items, base_url, inherited_headers=(), concurrency=4, timeout=None):
+        """
+        Dispatch the sub-requests, running up to `concurrency` of them at a
+        time, and yield a result for each, in the order that they complete.
+
+        A sub-request that raises an exception, or that has not completed
+        within `timeout` seconds of being submitted, results in an error,
+        without affecting the other sub-requests.
+        """
+        with self._lock:
+            self.batches += 1
+            self.requests += len(items)
+
+        queue = deque(enumerate(items))
+        pending = {}
+        try:
+            while queue or pending:
+                while queue and len(pending) < concurrency:
+                    idx, item = queue.popleft()
+                    future = self.executor.submit(self.dispatch, item, base_url, inherited_headers)
+                    deadline = None if timeout is None else time.time() + timeout
+                    pending[future] = (idx, item, deadline)
+
+                deadlines = [deadline for idx, item, deadline in pending.values() if deadline is not None]
+                wait_for = max(min(deadlines) - time.time(), 0) if deadlines else None
+                done, not_done = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    idx, item, deadline = pending.pop(future)
+                    yield self.get_result(idx, item, future)
+
+                now = time.time()
+                for future in list(not_done):
+                    idx, item, deadline = pending[future]
+                    if deadline is not None and deadline <= now:
+                        # The thread can not be interrupted, but its result
+                        # is discarded, and its slot in the batch released.
+                        del pending[future]
+                        future.cancel()
+                        with self._lock:
+                            self.timeouts += 1
+                        yield self.get_error(idx, item, status.HTTP_504_GATEWAY_TIMEOUT, 'Request timed out.')
+        finally:
+            # Eg. if the client disconnected before the batch completed.
+            for future in pending:
+                future.cancel()
+
+    def get_result(self, idx, item, future):
+        try:
+            status_code, headers, body = future.result()
+        except Exception:
+            self.app.logger.exception('Batched request to %s failed' % item['path'])
+            with self._lock:
+                self.errors += 1
+            return self.get_error(idx, item, status.HTTP_500_INTERNAL_SERVER_ERROR, 'Internal server error.')
+        return {
+            'index': idx,
+            'id': item['id'],
+            'status': status_code,
+            'headers': dict(headers),
+            'body': body
+        }
+
+    def get_error(self, idx, item, status_code, message):
+        return {
+            'index': idx,
+            'id': item['id'],
+            'status': status_code,
+            'headers': {},
+            'body': {'message': text_type(message)}
+        }
+
+    def shutdown(self):
+        """
+        Stop the worker threads, once any running sub-requests complete.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    @property
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'requests': self.requests,
+            'errors': self.errors,
+            'timeouts': self.timeouts
+        }
@@ -0,0 +1,235 @@
+# coding: utf8
+"""
+A minimal, pure Python implementation of CBOR, as described in RFC 8949.
+
+Supports the JSON data model, plus bytestrings and arbitrarily large
+integers.  Any other types are passed to the `default` function, which
+should return a value that can be encoded, or raise a `TypeError`.
+"""
+from __future__ import unicode_literals
+from flask._compat import integer_types, text_type
+import struct
+
+
+MAJOR_UNSIGNED = 0
+MAJOR_NEGATIVE = 1
+MAJOR_BYTES = 2
+MAJOR_TEXT = 3
+MAJOR_ARRAY = 4
+MAJOR_MAP = 5
+MAJOR_TAG = 6
+MAJOR_SIMPLE = 7
+
+TAG_POSITIVE_BIGNUM = 2
+TAG_NEGATIVE_BIGNUM = 3
+
+FALSE = b'\xf4'
+TRUE = b'\xf5'
+NULL = b'\xf6'
+BREAK = b'\xff'
+INDEFINITE_ARRAY = b'\x9f'
+
+
+def encode_head(major_type, value):
+    """
+    Encode the initial bytes of a data item, given its major type and
+    either its value, for integers, or its length.
+    """
+    major_type <<= 5
+    if value < 24:
+        return struct.pack('>B', major_type | value)
+    elif value < 0x100:
+        return struct.pack('>BB', major_type | 24, value)
+    elif value < 0x10000:
+        return struct.pack('>BH', major_type | 25, value)
+    elif value < 0x100000000:
+        return struct.pack('>BI', major_type | 26, value)
+    return struct.pack('>BQ', major_type | 27, value)
+
+
+class Encoder(object):
+    def __init__(self, default=None):
+        self.default = default
+
+    def encode(self, obj):
+        chunks = []
+        self._encode(obj, chunks.append)
+        return b''.join(chunks)
+
+    def _encode(self, obj, write):
+        if obj is None:
+            write(NULL)
+        elif obj is True:
+            write(TRUE)
+        elif obj is False:
+            write(FALSE)
+        elif isinstance(obj, text_type):
+            data = obj.encode('utf-8')
+            write(encode_head(MAJOR_TEXT, len(data)))
+            write(data)
+        elif isinstance(obj, integer_types):
+            self._encode_int(obj, write)
+        elif isinstance(obj, float):
+            write(b'\xfb' + struct.pack('>d', obj))
+        elif isinstance(obj, dict):
+            write(encode_head(MAJOR_MAP, len(obj)))
+            for key, value in obj.items():
+                self._encode(key, write)
+                self._encode(value, write)
+        elif isinstance(obj, (list, tuple)):
+            write(encode_head(MAJOR_ARRAY, len(obj)))
+            for item in obj:
+                self._encode(item, write)
+        elif isinstance(obj, (bytes, bytearray)):
+            write(encode_head(MAJOR_BYTES, len(obj)))
+            write(bytes(obj))
+        elif self.default is not None:
+            self._encode(self.default(obj), write)
+        else:
+            raise TypeError('%r is not CBOR serializable' % (obj,))
+
+    def _encode_int(self, value, write):
+        if value >= 0:
+            major_type, value = MAJOR_UNSIGNED, value
+        else:
+            major_type, value = MAJOR_NEGATIVE, -1 - value
+
+        if value < 0x10000000000000000:
+            write(encode_head(major_type, value))
+            return
+
+        tag = TAG_POSITIVE_BIGNUM if major_type == MAJOR_UNSIGNED else TAG_NEGATIVE_BIGNUM
+        data = bytearray()
+        while value:
+            data.insert(0, value & 0xff)
+            value >>= 8
+        write(encode_head(MAJOR_TAG, tag))
+        write(encode_head(MAJOR_BYTES, len(data)))
+        write(bytes(data))
+
+
+class Decoder(object):
+    def __init__(self, data):
+        self.data = bytearray(data)
+        self.pos = 0
+
+    def decode(self):
+        obj = self._decode()
+        if self.pos != len(self.data):
+            raise ValueError('Extra data at position %d' % self.pos)
+        return obj
+
+    def _read(self, length):
+        end = self.pos + length
+        if end > len(self.data):
+            raise ValueError('Unexpected end of data at position %d' % self.pos)
+        data = self.data[self.pos:end]
+        self.pos = end
+        return data
+
+    def _read_head(self):
+        initial = self._read(1)[0]
+        major_type, info = initial >> 5, initial & 0x1f
+        if info < 24:
+            value = info
+        elif info == 24:
+            value = self._read(1)[0]
+        elif info == 25:
+            value = struct.unpack('>H', bytes(self._read(2)))[0]
+        elif info == 26:
+            value = struct.unpack('>I', bytes(self._read(4)))[0]
+        elif info == 27:
+            value = struct.unpack('>Q', bytes(self._read(8)))[0]
+        elif info == 31 and major_type in (MAJOR_BYTES, MAJOR_TEXT, MAJOR_ARRAY, MAJOR_MAP, MAJOR_SIMPLE):
+            value = None  # Indefinite length, or a 'break' stop code.
+        else:
+            raise ValueError('Invalid additional information at position %d' % (self.pos - 1))
+        return major_type, info, value
+
+    def _at_break(self):
+        if self.pos < len(self.data) and self.data[self.pos] == 0xff:
+            self.pos += 1
+            return True
+        return False
+
+    def _decode(self):
+        major_type, info, value = self._read_head()
+
+        if major_type == MAJOR_UNSIGNED:
+            return value
+        elif major_type == MAJOR_NEGATIVE:
+            return -1 - value
+        elif major_type in (MAJOR_BYTES, MAJOR_TEXT):
+            if value is None:
+                chunks = []
+                while not self._at_break():
+                    chunk_type, _, length = self._read_head()
+                    if chunk_type != major_type or length is None:
+                        raise ValueError('Invalid indefinite length string chunk')
+                    chunks.append(self._read(length))
+                data = b''.join(bytes(chunk) for chunk in chunks)
+            else:
+                data = bytes(self._read(value))
+            return data.decode('utf-8') if major_type == MAJOR_TEXT else data
+        elif major_type == MAJOR_ARRAY:
+            if value is None:
+                items = []
+                while not self._at_break():
+                    items.append(self._decode())
+                return items
+            return [self._decode() for idx in range(value)]
+        elif major_type == MAJOR_MAP:
+            ret = {}
+            if value is None:
+                while not self._at_break():
+                    key = self._decode()
+                    ret[key] = self._decode()
+            else:
+                for idx in range(value):
+                    key = self._decode()
+                    ret[key] = self._decode()
+            return ret
+        elif major_type == MAJOR_TAG:
+            item = self._decode()
+            if value in (TAG_POSITIVE_BIGNUM, TAG_NEGATIVE_BIGNUM) and isinstance(item, bytes):
+                number = 0
+                for byte in bytearray(item):
+                    number = (number << 8) | byte
+                return number if value == TAG_POSITIVE_BIGNUM else -1 - number
+            # Other tags are semantic annotations, so return the tagged item.
+            return item
+
+        # Major type 7, simple values and floats.
+        if info == 20:
+            return False
+        elif info == 21:
+            return True
+        elif info in (22, 23):
+            return None
+        elif info == 25:
+            return struct.unpack('>e', struct.pack('>H', value))[0]
+        elif info == 26:
+            return struct.unpack('>f', struct.pack('>I', value))[0]
+        elif info == 27:
+            return struct.unpack('>d', struct.pack('>Q', value))[0]
+        elif info == 31:
+            raise ValueError('Unexpected break stop code at position %d' % (self.pos - 1))
+        raise ValueError('Unsupported simple value %d' % value)
+
+
+def dumps(obj, default=None):
+    """
+    Serialize `obj` to CBOR encoded bytes.
+    """
+    return Encoder(default).encode(obj)
+
+
+def loads(data):
+    """
+    Deserialize CBOR encoded bytes.  Raises `ValueError` on invalid input.
+    """
+    try:
+        return Decoder(data).decode()
+    except (TypeError, RuntimeError) as exc:
+        # Unhashable map keys, or excessively deep nesting.
+        raise ValueError(text_type(exc))
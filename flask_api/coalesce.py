@@ -0,0 +1,127 @@
+# coding: utf8
+"""
+Coalescing of identical concurrent requests.
+
+When enabled with the `COALESCE_REQUESTS` setting, a safe request that
+arrives while an identical request is already being handled waits for that
+request's view to complete, and shares its rendered response, rather than
+running the view again.
+"""
+from __future__ import unicode_literals
+from flask_api.responsecache import dump_response, load_response
+import threading
+
+
+def get_coalesce_key(request):
+    """
+    Return the key identifying identical requests.  Credentials are
+    included, so that responses are only shared between requests made
+    on behalf of the same user.
+    """
+    method = 'GET' if request.method == 'HEAD' else request.method
+    return (
+        method,
+        request.host,
+        request.path,
+        request.query_string,
+        str(request.accepted_media_type),
+        request.headers.get('Authorization'),
+        request.headers.get('Cookie')
+    )
+
+
+def is_shareable(response):
+    """
+    Return `True` if the response may be replayed to coalesced requests.
+    """
+    return not (response.is_streamed or response.direct_passthrough or 'Set-Cookie' in response.headers)
+
+
+class _Call(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.data = None
+        self.error = None
+        self.waiters = 0
+
+
+class Coalescer(object):
+    """
+    Runs a single execution of the view for each set of identical
+    concurrent requests.
+
+    Waiting requests give up after `timeout` seconds, and run the view
+    themselves.  Exceptions raised by the view are raised in every
+    waiting request.
+    """
+
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+        self.executions = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.errors = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def run(self, key, view, response_class):
+        """
+        Return the response for `view`, shared with any identical requests.
+        `view` should return a response object.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self.executions += 1
+            else:
+                call.waiters += 1
+                leader = False
+
+        if leader:
+            return self._lead(key, call, view)
+
+        if not call.event.wait(self.timeout):
+            with self._lock:
+                self.timeouts += 1
+                self.executions += 1
+            return view()
+
+        if call.error is not None:
+            raise call.error
+        if call.data is None:
+            # The response can not be shared, eg. as it is streamed.
+            with self._lock:
+                self.executions += 1
+            return view()
+
+        with self._lock:
+            self.coalesced += 1
+        return load_response(call.data, response_class)
+
+    def _lead(self, key, call, view):
+        try:
+            response = view()
+            if is_shareable(response):
+                call.data = dump_response(response)
+            return response
+        except Exception as exc:
+            call.error = exc
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    @property
+    def stats(self):
+        return {
+            'executions': self.executions,
+            'coalesced': self.coalesced,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'in_flight': len(self._calls)
+        }
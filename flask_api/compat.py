@@ -24,3 +24,55 @@ except ImportError:
 def is_flask_legacy():
     v = flask_version.split(".")
     return int(v[0]) == 0 and int(v[1]) < 11
+
+
+# Alternative JSON libraries are optional
+try:
+    import simplejson
+except ImportError:
+    simplejson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# MessagePack is optional
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Brotli and Zstandard compression are optional
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# simdjson is optional, for lazily parsed JSON request bodies
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+# xxhash is optional, for faster ETag generation
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# fcntl is only available on Unix
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
@@ -0,0 +1,301 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask_api import exceptions
+from flask_api.compat import brotli, zstandard
+from flask_api.etags import encoded_etag
+from werkzeug.http import parse_accept_header
+from werkzeug.wsgi import ClosingIterator
+import io
+import zlib
+
+
+class BaseCompressor(object):
+    """
+    Compressors provide one-shot compression of a complete body, and
+    streaming compression, where the output of each chunk is flushed so
+    that it can be sent to the client immediately.
+
+    They also provide streaming decompression, for request bodies.
+    """
+    encoding = None
+    available = False
+    default_level = None
+    errors = ()  # The exceptions raised when decompressing invalid data.
+
+    def __init__(self, level=None):
+        self.level = self.default_level if level is None else level
+
+    def compress(self, data):
+        msg = '`compress()` method must be implemented for class "%s"'
+        raise NotImplementedError(msg % self.__class__.__name__)
+
+    def compress_stream(self, chunks):
+        msg = '`compress_stream()` method must be implemented for class "%s"'
+        raise NotImplementedError(msg % self.__class__.__name__)
+
+    def decompress_stream(self, stream, chunk_size):
+        """
+        Yield the decompressed contents of `stream`, in chunks of around
+        `chunk_size` bytes, however well compressed the input is.
+        """
+        msg = '`decompress_stream()` method must be implemented for class "%s"'
+        raise NotImplementedError(msg % self.__class__.__name__)
+
+
+class ZlibCompressor(BaseCompressor):
+    available = True
+    default_level = 6
+    errors = (zlib.error,)
+    wbits = None
+
+    def compress(self, data):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, self.wbits)
+        return compressor.compress(data) + compressor.flush()
+
+    def compress_stream(self, chunks):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, self.wbits)
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    def decompress_stream(self, stream, chunk_size):
+        decompressor = zlib.decompressobj(self.wbits)
+        while not decompressor.eof:
+            data = decompressor.unconsumed_tail or stream.read(chunk_size)
+            if not data:
+                raise ValueError('Compressed data ended before the end-of-stream marker')
+            data = decompressor.decompress(data, chunk_size)
+            if data:
+                yield data
+
+
+class GzipCompressor(ZlibCompressor):
+    encoding = 'gzip'
+    wbits = 16 + zlib.MAX_WBITS
+
+
+class DeflateCompressor(ZlibCompressor):
+    # HTTP 'deflate' is the zlib format, rather than a raw deflate stream.
+    encoding = 'deflate'
+    wbits = zlib.MAX_WBITS
+
+
+class BrotliCompressor(BaseCompressor):
+    encoding = 'br'
+    available = brotli is not None
+    default_level = 4
+    errors = (brotli.error,) if brotli is not None else ()
+
+    def compress(self, data):
+        return brotli.compress(data, quality=self.level)
+
+    def compress_stream(self, chunks):
+        compressor = brotli.Compressor(quality=self.level)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+
+    def decompress_stream(self, stream, chunk_size):
+        decompressor = brotli.Decompressor()
+        while not decompressor.is_finished():
+            # Only pass in more input once any pending output has been read.
+            data = stream.read(chunk_size) if decompressor.can_accept_more_data() else b''
+            output = decompressor.process(data, output_buffer_limit=chunk_size)
+            if output:
+                yield output
+            elif not data and not decompressor.is_finished():
+                raise ValueError('Compressed data ended before the end-of-stream marker')
+
+
+class ZstandardCompressor(BaseCompressor):
+    encoding = 'zstd'
+    available = zstandard is not None
+    default_level = 3
+    errors = (zstandard.ZstdError,) if zstandard is not None else ()
+    input_size = 64
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def compress_stream(self, chunks):
+        compressor = zstandard.ZstdCompressor(level=self.level).compressobj()
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            if data:
+                yield data
+        yield compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+    def decompress_stream(self, stream, chunk_size):
+        decompressor = zstandard.ZstdDecompressor().decompressobj(write_size=chunk_size)
+        while not decompressor.eof:
+            data = stream.read(chunk_size)
+            if not data:
+                raise ValueError('Compressed data ended before the end-of-stream marker')
+            # The decompressor returns all of the output for its input, and a
+            # block of up to 128KB may be encoded in a few bytes, so pass the
+            # input in small pieces to bound the size of the output.
+            for start in range(0, len(data), self.input_size):
+                output = decompressor.decompress(data[start:start + self.input_size])
+                for offset in range(0, len(output), chunk_size):
+                    yield output[offset:offset + chunk_size]
+                if decompressor.eof:
+                    break
+
+
+COMPRESSORS = dict([
+    (compressor.encoding, compressor)
+    for compressor in (GzipCompressor, DeflateCompressor, BrotliCompressor, ZstandardCompressor)
+])
+
+
+def get_compressors(encodings, level=None):
+    """
+    Return a list of compressor instances for the given encodings, in
+    order of preference, skipping any that are not installed.
+
+    `level` may be an integer, or a dictionary of levels keyed by encoding.
+    """
+    compressors = []
+    for encoding in encodings:
+        try:
+            compressor_cls = COMPRESSORS[encoding]
+        except KeyError:
+            msg = "Unknown content encoding '%s'. Choose from %s."
+            raise ValueError(msg % (encoding, ', '.join(sorted(COMPRESSORS))))
+        if not compressor_cls.available:
+            continue
+        encoding_level = level.get(encoding) if isinstance(level, dict) else level
+        compressors.append(compressor_cls(encoding_level))
+    return compressors
+
+
+def get_decompressors(encodings):
+    """
+    Return a dictionary of compressor instances for the given encodings,
+    keyed by encoding, skipping any that are not installed.
+    """
+    return dict([
+        (compressor.encoding, compressor)
+        for compressor in get_compressors(encodings)
+    ])
+
+
+def select_compressor(accept_encoding, compressors):
+    """
+    Return the first of the compressors that the client's 'Accept-Encoding'
+    header allows, or `None` if the response should not be compressed.
+    """
+    if not accept_encoding:
+        return None
+    accepted = parse_accept_header(accept_encoding)
+    for compressor in compressors:
+        if accepted[compressor.encoding] > 0:
+            return compressor
+    return None
+
+
+def precompress(data, compressors):
+    """
+    Compress a body once for each of the compressors, returning a dictionary
+    of compressed bodies keyed by encoding.  Assigning the result to
+    `APIResponse.precompressed` allows a cached body to be served many times
+    without compressing it again.
+    """
+    return dict([
+        (compressor.encoding, compressor.compress(data))
+        for compressor in compressors
+    ])
+
+
+def compress_response(response, accept_encoding, compressors, media_types, min_size):
+    """
+    Compress the response body in place, if the client accepts one of the
+    compressors, and the response is of a compressible media type.
+    """
+    if response.mimetype not in media_types:
+        return response
+    response.vary.add('Accept-Encoding')
+
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return response
+    if 'Content-Encoding' in response.headers or response.direct_passthrough:
+        return response
+
+    compressor = select_compressor(accept_encoding, compressors)
+    if compressor is None:
+        return response
+
+    if response.is_streamed:
+        # Ensure the original iterable is still closed, eg. so that
+        # `stream_with_context` can tear down the request context.
+        original = response.response
+        callbacks = [original.close] if hasattr(original, 'close') else []
+        response.response = ClosingIterator(compressor.compress_stream(original), callbacks)
+        response.headers.pop('Content-Length', None)
+    else:
+        precompressed = getattr(response, 'precompressed', None) or {}
+        data = precompressed.get(compressor.encoding)
+        if data is None:
+            body = response.get_data()
+            if len(body) < min_size:
+                return response
+            data = compressor.compress(body)
+        response.set_data(data)
+
+    response.headers['Content-Encoding'] = compressor.encoding
+    if 'ETag' in response.headers:
+        response.headers['ETag'] = encoded_etag(response.headers['ETag'], compressor.encoding)
+    return response
+
+
+class DecompressingStream(io.RawIOBase):
+    """
+    A readable stream of the decompressed contents of `stream`.
+
+    Raises `RequestEntityTooLarge` as soon as more than `max_length` bytes
+    have been decompressed, so that small, highly compressed request bodies
+    can not be used to exhaust memory, and `ParseError` if the compressed
+    data is invalid.
+    """
+
+    def __init__(self, stream, compressor, max_length=None, chunk_size=64 * 1024):
+        self.encoding = compressor.encoding
+        self.max_length = max_length
+        self.bytes_read = 0
+        self._errors = (ValueError,) + compressor.errors
+        self._chunks = compressor.decompress_stream(stream, chunk_size)
+        self._buffer = b''
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self._pos == len(self._buffer):
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+            except self._errors as exc:
+                msg = '%s decode error - %s' % (self.encoding, exc)
+                raise exceptions.ParseError(msg)
+            self._pos = 0
+            self.bytes_read += len(self._buffer)
+            if self.max_length is not None and self.bytes_read > self.max_length:
+                raise exceptions.RequestEntityTooLarge()
+
+        size = min(len(buffer), len(self._buffer) - self._pos)
+        buffer[:size] = self._buffer[self._pos:self._pos + size]
+        self._pos += size
+        return size
+
+
+def decompressing_stream(stream, compressor, max_length=None):
+    """
+    Wrap `stream` so that reads return its decompressed contents.
+    """
+    return io.BufferedReader(DecompressingStream(stream, compressor, max_length))
@@ -1,28 +1,202 @@
 from functools import wraps
-from flask import request
+from flask import current_app, request
+from flask_api.etags import make_version_etag, not_modified
+from flask_api.precompute import REFRESH_ENVIRON_KEY
+from flask_api.response import get_matching_etag
+from flask_api.responsecache import dump_response, get_cache_key, has_credentials, is_cacheable, load_response, precompress_response
+from flask_api.schema import get_schema
+from flask_api.settings import current_settings
 
 
 def set_parsers(*parsers):
+    if len(parsers) == 1 and isinstance(parsers[0], (list, tuple)):
+        parsers = parsers[0]
+    parser_classes = tuple(parsers)
+
     def decorator(func):
         @wraps(func)
         def decorated_function(*args, **kwargs):
-            if len(parsers) == 1 and isinstance(parsers[0], (list, tuple)):
-                request.parser_classes = parsers[0]
-            else:
-                request.parser_classes = parsers
+            request.parser_classes = parser_classes
             return func(*args, **kwargs)
+        # Allows `FlaskAPI` to compile the view's pipeline on registration.
+        decorated_function.parser_classes = parser_classes
         return decorated_function
     return decorator
 
 
 def set_renderers(*renderers):
+    if len(renderers) == 1 and isinstance(renderers[0], (list, tuple)):
+        renderers = renderers[0]
+    renderer_classes = tuple(renderers)
+
+    def decorator(func):
+        @wraps(func)
+        def decorated_function(*args, **kwargs):
+            request.renderer_classes = renderer_classes
+            return func(*args, **kwargs)
+        # Allows `FlaskAPI` to compile the view's pipeline on registration.
+        decorated_function.renderer_classes = renderer_classes
+        return decorated_function
+    return decorator
+
+
+def set_max_content_length(max_length):
+    """
+    Set the largest request body that the view accepts, in bytes, in place
+    of Flask's `MAX_CONTENT_LENGTH` setting.
+    """
+    def decorator(func):
+        @wraps(func)
+        def decorated_function(*args, **kwargs):
+            request.route_max_content_length = max_length
+            return func(*args, **kwargs)
+        # Allows `FlaskAPI` to check the request size before the view is run.
+        decorated_function.max_content_length = max_length
+        return decorated_function
+    return decorator
+
+
+def validate_data(schema, methods=('POST', 'PUT', 'PATCH')):
+    """
+    Validate and coerce the request data with `schema` before the view is
+    run, for requests using one of `methods`.  The schema is compiled when
+    the view is decorated, so that errors in it are raised on registration.
+    """
+    schema = get_schema(schema)
+
+    def decorator(func):
+        @wraps(func)
+        def decorated_function(*args, **kwargs):
+            if request.method in methods:
+                request.validate_data(schema)
+            return func(*args, **kwargs)
+        decorated_function.data_schema = schema
+        return decorated_function
+    return decorator
+
+
+def set_upload_sink(sink_factory):
+    """
+    Pass the files uploaded to the view to a sink as they are parsed,
+    rather than spooling them to temporary files.
+
+    `sink_factory` is called with the field name, filename and content type
+    of each file, and should return an object with a `write()` method, and
+    optionally `close()` and `abort()` methods, or `None` to spool the file.
+    """
     def decorator(func):
         @wraps(func)
         def decorated_function(*args, **kwargs):
-            if len(renderers) == 1 and isinstance(renderers[0], (list, tuple)):
-                request.renderer_classes = renderers[0]
-            else:
-                request.renderer_classes = renderers
+            request.upload_sink = sink_factory
             return func(*args, **kwargs)
         return decorated_function
     return decorator
+
+
+def disable_method_overloading(func):
+    """
+    Disable method and content type overloading for the view, so that the
+    body of form requests is not inspected before the view is run.
+    """
+    func.method_overloading = False
+    return func
+
+
+def etag(get_version):
+    """
+    Set an ETag on the view's responses, derived from a version key.
+
+    `get_version` is called with the view's arguments, and should cheaply
+    return a value that changes whenever the content does, such as a last
+    modified timestamp.  If the client already has that version then the
+    view is not called at all, and a '304 Not Modified' response is sent.
+
+    Should be applied beneath `set_renderers`, if both are used.
+    """
+    def decorator(func):
+        @wraps(func)
+        def decorated_function(*args, **kwargs):
+            version = get_version(*args, **kwargs)
+            media_type = request.accepted_media_type
+            tag = make_version_etag(current_settings().ETAG_HASH, version, media_type)
+
+            matched = get_matching_etag(tag)
+            if matched is not None:
+                response = current_app.response_class(content_type=str(media_type))
+                return not_modified(response, matched)
+
+            response = current_app.make_response(func(*args, **kwargs))
+            if response.status_code == 200:
+                response.headers['ETag'] = tag
+            return response
+        return decorated_function
+    return decorator
+
+
+def cache_response(timeout=None, per_client=False):
+    """
+    Cache the view's rendered responses on the server, for `timeout`
+    seconds, using the application's `response_cache`.
+
+    Only 'GET' and 'HEAD' requests are cached.  Responses are cached
+    separately for each negotiated media type, and vary on 'Accept'.  If
+    compression is enabled, the cached bodies are compressed up front.
+
+    Requests with an 'Authorization' or 'Cookie' header are not cached,
+    unless `per_client` is set, in which case responses are cached
+    separately for each client's credentials.
+
+    Should be applied beneath `set_renderers`, if both are used.
+    """
+    def decorator(func):
+        @wraps(func)
+        def decorated_function(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return func(*args, **kwargs)
+            if not per_client and has_credentials(request):
+                return func(*args, **kwargs)
+
+            cache = current_app.response_cache
+            key = get_cache_key(request, per_client)
+            cached = cache.get(key)
+            if cached is not None:
+                return load_response(cached, current_app.response_class)
+
+            response = current_app.make_response(func(*args, **kwargs))
+            response.vary.add('Accept')
+            if is_cacheable(response, per_client):
+                settings = current_settings()
+                seconds = settings.RESPONSE_CACHE_TIMEOUT if timeout is None else timeout
+                precompress_response(response, settings)
+                cache.set(key, dump_response(response), seconds)
+            return response
+        return decorated_function
+    return decorator
+
+
+def precompute(interval=None):
+    """
+    Serve the view's rendered responses from memory, while re-running the
+    view in the background every `interval` seconds to keep them fresh.
+    Call `app.precomputer.invalidate()` to refresh them sooner.
+
+    Only 'GET' and 'HEAD' requests are precomputed, with responses being
+    kept separately for each path, query string and negotiated media type.
+
+    Only suitable for public resources, as the view is re-run without the
+    client's credentials.  Requests with an 'Authorization' or 'Cookie'
+    header are passed straight to the view, and are never precomputed.
+
+    Should be applied beneath `set_renderers`, if both are used.
+    """
+    def decorator(func):
+        @wraps(func)
+        def decorated_function(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or request.environ.get(REFRESH_ENVIRON_KEY):
+                return func(*args, **kwargs)
+            if has_credentials(request):
+                return func(*args, **kwargs)
+            seconds = current_settings().PRECOMPUTE_INTERVAL if interval is None else interval
+            return current_app.precomputer.serve(request, lambda: func(*args, **kwargs), seconds)
+        return decorated_function
+    return decorator
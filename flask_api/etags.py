@@ -0,0 +1,111 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask._compat import string_types, text_type
+from flask_api.compat import xxhash
+from werkzeug.http import parse_etags, quote_etag, unquote_etag
+import hashlib
+
+
+def _xxhash(data):
+    return xxhash.xxh64_hexdigest(data)
+
+
+def _blake2b(data):
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def _md5(data):
+    return hashlib.md5(data).hexdigest()
+
+
+def _sha1(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+# Hash functions for generating ETags, keyed by name, with a flag
+# indicating whether each is available.
+HASHERS = {
+    'xxhash': (_xxhash, xxhash is not None),
+    'blake2b': (_blake2b, hasattr(hashlib, 'blake2b')),
+    'md5': (_md5, True),
+    'sha1': (_sha1, True),
+}
+
+
+def select_hasher(val):
+    """
+    Return a hash function, given a hasher name, a list of hasher names
+    in order of preference, or a function taking bytes and returning a
+    string digest.
+
+    Falls back to `md5` if none of the named hashers are available.
+    """
+    if callable(val):
+        return val
+    if isinstance(val, string_types):
+        val = [val]
+    for name in val:
+        try:
+            hasher, available = HASHERS[name]
+        except KeyError:
+            msg = "Unknown ETag hasher '%s'. Choose from %s."
+            raise ValueError(msg % (name, ', '.join(sorted(HASHERS))))
+        if available:
+            return hasher
+    return _md5
+
+
+def make_etag(hasher, data):
+    """
+    Return a quoted, strong ETag for the given bytes.
+    """
+    return quote_etag(hasher(data))
+
+
+def make_version_etag(hasher, version, media_type):
+    """
+    Return a quoted, strong ETag for a view's version key.  The media type
+    is included, as each representation of a resource needs its own ETag.
+    """
+    data = '%s\n%s' % (text_type(version), text_type(media_type))
+    return make_etag(hasher, data.encode('utf8'))
+
+
+def encoded_etag(etag, encoding):
+    """
+    Return the ETag for the content encoded version of a response, as
+    a strong ETag must differ between encodings of the same resource.
+    """
+    tag, weak = unquote_etag(etag)
+    return quote_etag('%s-%s' % (tag, encoding), weak)
+
+
+def match_etag(if_none_match, etag, encodings=()):
+    """
+    Return the ETag that the client's 'If-None-Match' header matches,
+    out of `etag` and its content encoded variants, or `None`.
+    """
+    if not if_none_match or not etag:
+        return None
+    etags = parse_etags(if_none_match)
+    if etags.star_tag:
+        return etag
+    for candidate in [etag] + [encoded_etag(etag, encoding) for encoding in encodings]:
+        if etags.contains_weak(unquote_etag(candidate)[0]):
+            return candidate
+    return None
+
+
+def not_modified(response, etag):
+    """
+    Turn `response` into a bodiless '304 Not Modified' response.
+
+    The 'Content-Type' header is left in place, so that the response
+    still varies on 'Accept-Encoding' when compression is enabled.
+    """
+    response.status_code = 304
+    response.response = []
+    response.headers['ETag'] = etag
+    for header in ('Content-Length', 'Content-Encoding'):
+        response.headers.pop(header, None)
+    return response
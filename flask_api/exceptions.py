@@ -17,6 +17,12 @@ class APIException(Exception):
 class ParseError(APIException):
     status_code = status.HTTP_400_BAD_REQUEST
     detail = 'Malformed request.'
+    errors = None
+
+    def __init__(self, detail=None, errors=None):
+        super(ParseError, self).__init__(detail)
+        if errors is not None:
+            self.errors = errors
 
 
 class AuthenticationFailed(APIException):
@@ -51,11 +57,26 @@ class NotAcceptable(APIException):
     detail = 'Could not satisfy the request Accept header.'
 
 
+class Conflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    detail = 'The request conflicts with the current state of the resource.'
+
+
+class RequestEntityTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    detail = 'Request entity too large.'
+
+
 class UnsupportedMediaType(APIException):
     status_code = status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
     detail = 'Unsupported media type in the request Content-Type header.'
 
 
+class UnprocessableEntity(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    detail = 'The request could not be processed.'
+
+
 class Throttled(APIException):
     status_code = status.HTTP_429_TOO_MANY_REQUESTS
     detail = 'Request was throttled.'
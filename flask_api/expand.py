@@ -0,0 +1,189 @@
+# coding: utf8
+"""
+Expansion of related resources.
+
+Representations mark related resources with `Related` values, which are
+rendered as a link or key by default, or replaced with the related resource
+itself if the client includes them in the 'expand' query parameter, such as
+`?expand=author,comments.author`.
+
+Related resources are loaded with data loader functions registered on the
+application, which are called once per relation with every key needed,
+rather than once per resource.
+"""
+from __future__ import unicode_literals
+from flask import current_app, request
+from flask_api.cache import LRUCache
+from flask_api.fields import compile_paths, ALL_FIELDS
+from flask_api.pagination import Page
+from flask_api.settings import current_settings
+from flask_api.streaming import is_streaming, StreamingList
+from itertools import islice
+
+
+# Parsed 'expand' query parameters.
+expand_cache = LRUCache(maxsize=256)
+
+
+class Related(object):
+    """
+    A related resource, identified by the name of a registered data loader
+    and a key, which is rendered as `default` unless it is expanded.  If no
+    `default` is given then the key is rendered.
+    """
+
+    def __init__(self, relation, key, default=None):
+        self.relation = relation
+        self.key = key
+        self.default = key if default is None else default
+
+    def __repr__(self):
+        return '<Related %s %r>' % (self.relation, self.key)
+
+
+class DataLoader(object):
+    """
+    Loads related resources in batches, using the data loader functions in
+    `loaders`, and caches them for the lifetime of the request.
+
+    Each loader function is called with a list of keys, and should return
+    either a dictionary mapping keys to resources, or a list of resources
+    in the same order as the keys.  Missing resources are loaded as `None`.
+    """
+
+    def __init__(self, loaders):
+        self.loaders = loaders
+        self.cache = {}
+        self.calls = 0
+
+    def load_many(self, relation, keys):
+        """
+        Return a list of the resources for `keys`, calling the relation's
+        loader function at most once, for the keys that are not cached.
+        """
+        try:
+            loader = self.loaders[relation]
+        except KeyError:
+            raise ValueError('No data loader is registered for the relation "%s".' % relation)
+
+        missing = []
+        seen = set()
+        for key in keys:
+            if key not in seen and (relation, key) not in self.cache:
+                seen.add(key)
+                missing.append(key)
+        if missing:
+            self.calls += 1
+            loaded = loader(missing)
+            if not isinstance(loaded, dict):
+                loaded = dict(zip(missing, loaded))
+            for key in missing:
+                self.cache[(relation, key)] = loaded.get(key)
+        return [self.cache[(relation, key)] for key in keys]
+
+    def load(self, relation, key):
+        return self.load_many(relation, [key])[0]
+
+
+def get_data_loader():
+    """
+    Return the data loader for the current request.
+    """
+    if getattr(request, 'data_loader', None) is None:
+        request.data_loader = DataLoader(current_app.data_loaders)
+    return request.data_loader
+
+
+def get_expand_tree(spec):
+    if not spec:
+        return {}
+    tree = expand_cache.get(spec)
+    if tree is None:
+        tree = compile_paths(spec)
+        expand_cache.set(spec, tree)
+    return tree
+
+
+def _collect(data, tree, path, fields, needed):
+    """
+    Add the `(relation, key)` of each related resource in `data` that is to
+    be expanded to `needed`.
+    """
+    if isinstance(data, list):
+        for item in data:
+            _collect(item, tree, path, fields, needed)
+    elif isinstance(data, dict):
+        for name, value in data.items():
+            if name in tree:
+                child_path = path + (name,)
+                if isinstance(value, Related):
+                    # Skip loading resources which will be pruned anyway.
+                    if fields is ALL_FIELDS or '.'.join(child_path) in fields:
+                        needed.setdefault(value.relation, []).append(value.key)
+                else:
+                    _collect(value, tree[name], child_path, fields, needed)
+
+
+def _substitute(data, tree, loader, final):
+    """
+    Return a copy of `data`, with the related resources that are to be
+    expanded replaced with the loaded resources.  If `final` is set, any
+    remaining related resources are replaced with their default value.
+    """
+    if isinstance(data, Related):
+        if tree is not None and (data.relation, data.key) in loader.cache:
+            return _substitute(loader.cache[(data.relation, data.key)], tree, loader, final)
+        return data.default if final else data
+    if isinstance(data, list):
+        return [_substitute(item, tree, loader, final) for item in data]
+    if isinstance(data, dict):
+        return dict(
+            (name, _substitute(value, None if tree is None else tree.get(name), loader, final))
+            for name, value in data.items()
+        )
+    return data
+
+
+def _expand(data, tree, loader, fields):
+    # Each pass loads one more level of nested relations.
+    while tree:
+        needed = {}
+        _collect(data, tree, (), fields, needed)
+        if not needed:
+            break
+        for relation, keys in needed.items():
+            loader.load_many(relation, keys)
+        data = _substitute(data, tree, loader, final=False)
+    return _substitute(data, None, loader, final=True)
+
+
+def expand(data, chunk_size=None):
+    """
+    Return `data` with the related resources selected by the request's
+    'expand' query parameter loaded, and any others replaced with their
+    default values.
+
+    Iterables are expanded in chunks of `chunk_size` items as they are
+    rendered, which defaults to the `STREAMING_CHUNK_SIZE` setting, with
+    one call to each data loader for each chunk.
+    """
+    tree = get_expand_tree(request.args.get('expand'))
+    loader = get_data_loader()
+    fields = getattr(request, 'fields', ALL_FIELDS)
+
+    if isinstance(data, Page):
+        # Pages are already held in memory, so are expanded in one batch.
+        return Page(_expand(list(data), tree, loader, fields), data.next_cursor, chunk_size=data.chunk_size)
+    if is_streaming(data):
+        chunk_size = chunk_size or getattr(data, 'chunk_size', None) or current_settings().STREAMING_CHUNK_SIZE
+
+        def expand_chunks(iterator):
+            while True:
+                chunk = list(islice(iterator, chunk_size))
+                if not chunk:
+                    return
+                for item in _expand(chunk, tree, loader, fields):
+                    yield item
+
+        return StreamingList(expand_chunks(iter(data)), getattr(data, 'chunk_size', None))
+    return _expand(data, tree, loader, fields)
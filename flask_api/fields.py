@@ -0,0 +1,131 @@
+# coding: utf8
+"""
+Sparse fieldsets.
+
+When enabled with the `SPARSE_FIELDSETS` setting, clients may use the
+'fields' and 'exclude' query parameters to select which keys of the
+response data are rendered, as comma separated lists of dotted paths,
+such as `?fields=id,title,author.name`.
+"""
+from __future__ import unicode_literals
+from flask_api.cache import LRUCache
+from flask_api.streaming import StreamingList
+
+
+# Parsed field sets, keyed by the ('fields', 'exclude') query parameters.
+fieldset_cache = LRUCache(maxsize=256)
+
+
+def compile_paths(spec):
+    """
+    Compile a comma separated list of dotted paths into a tree of nested
+    dictionaries, in which an empty dictionary selects the whole value.
+    """
+    tree = {}
+    for path in spec.split(','):
+        names = [name.strip() for name in path.split('.')]
+        if not all(names):
+            continue
+        node = tree
+        for idx, name in enumerate(names):
+            if name in node and not node[name]:
+                # An ancestor is already selected in full.
+                break
+            if idx == len(names) - 1:
+                node[name] = {}
+            else:
+                node = node.setdefault(name, {'': None})
+    return _strip(tree)
+
+
+def _strip(tree):
+    # Remove the markers distinguishing branches from leaves.
+    return dict((name, _strip(node)) for name, node in tree.items() if name)
+
+
+class FieldSet(object):
+    """
+    The fields selected by a request, which may be applied to the response
+    data, and which views may check in order to skip computing values that
+    will not be rendered, eg. `if 'author.bio' in request.fields:`.
+    """
+
+    def __init__(self, include=None, exclude=None):
+        self.include = include
+        self.exclude = exclude
+
+    def __contains__(self, path):
+        """
+        Return `True` if any part of the value at a dotted path is rendered.
+        """
+        names = path.split('.')
+        include, exclude = self.include, self.exclude
+        for name in names:
+            if include is not None:
+                if name not in include:
+                    return False
+                # An empty node selects the whole value.
+                include = include[name] or None
+            if exclude is not None:
+                if name in exclude and not exclude[name]:
+                    return False
+                exclude = exclude.get(name)
+        return True
+
+    def apply(self, data):
+        """
+        Return the data, pruned to the selected fields.  Lists are pruned
+        item by item.
+        """
+        return self._apply(data, self.include, self.exclude)
+
+    def _apply(self, data, include, exclude):
+        if isinstance(data, list):
+            return [self._apply(item, include, exclude) for item in data]
+        if not isinstance(data, dict):
+            return data
+
+        if include is not None:
+            keys = [key for key in data if key in include]
+        else:
+            keys = data.keys()
+        pruned = {}
+        for key in keys:
+            child_include = (include[key] or None) if include is not None else None
+            child_exclude = exclude.get(key) if exclude is not None else None
+            if child_exclude is not None and not child_exclude:
+                continue
+            if child_include is None and child_exclude is None:
+                pruned[key] = data[key]
+            else:
+                pruned[key] = self._apply(data[key], child_include, child_exclude)
+        return pruned
+
+    def apply_stream(self, content):
+        """
+        Return a `StreamingList` that prunes each item as it is rendered.
+        """
+        return StreamingList((self.apply(item) for item in content), content.chunk_size)
+
+
+# Selects every field, for requests without 'fields' or 'exclude' parameters.
+ALL_FIELDS = FieldSet()
+
+
+def get_fieldset(fields=None, exclude=None):
+    """
+    Return the `FieldSet` for the given 'fields' and 'exclude' query
+    parameters, or `ALL_FIELDS` if neither is set.  Parsed field sets are
+    cached.
+    """
+    if not fields and not exclude:
+        return ALL_FIELDS
+    key = (fields, exclude)
+    fieldset = fieldset_cache.get(key)
+    if fieldset is None:
+        fieldset = FieldSet(
+            compile_paths(fields) if fields else None,
+            compile_paths(exclude) if exclude else None
+        )
+        fieldset_cache.set(key, fieldset)
+    return fieldset
@@ -0,0 +1,141 @@
+# coding: utf8
+"""
+Support for the 'Idempotency-Key' request header.
+
+When enabled with the `IDEMPOTENCY_KEYS` setting, the response to an
+unsafe request that includes an 'Idempotency-Key' header is stored, and
+replayed byte for byte if the client retries the request with the same
+key, without running the view again.
+"""
+from __future__ import unicode_literals
+from flask import current_app
+from flask_api import cbor, exceptions
+from flask_api.responsecache import dump_response, load_response
+import hashlib
+
+
+UNSAFE_METHODS = frozenset(['POST', 'PUT', 'PATCH', 'DELETE'])
+MAX_KEY_LENGTH = 255
+
+# Responses are only replayed to the same client, so unlike cached
+# responses they keep their 'Set-Cookie' headers.
+UNSTORED_HEADERS = frozenset(['content-length'])
+
+PENDING = 0
+COMPLETE = 1
+
+
+class Idempotency(object):
+    """
+    Stores responses against idempotency keys, in `store`, which should be
+    one of the `flask_api.responsecache` backends.  Completed responses are
+    kept for `timeout` seconds.
+
+    While a request is in progress its key is marked as pending, for up to
+    `lock_timeout` seconds, so that concurrent duplicates can be rejected.
+    Using a store that is shared between processes, such as `MMapCache`,
+    extends this to duplicates that are handled by other processes.
+    """
+
+    def __init__(self, store, timeout=24 * 60 * 60, lock_timeout=60):
+        self.store = store
+        self.timeout = timeout
+        self.lock_timeout = lock_timeout
+        self.executions = 0
+        self.replays = 0
+        self.conflicts = 0
+        self.mismatches = 0
+        self.unstored = 0
+
+    def get_key(self, request):
+        """
+        Return the store key for a request.  Keys are scoped to the client's
+        credentials, in the 'Authorization' and 'Cookie' headers, so that
+        clients can not replay each other's responses.
+        """
+        key = request.headers['Idempotency-Key']
+        if len(key) > MAX_KEY_LENGTH:
+            msg = 'Idempotency-Key header must be at most %d characters.' % MAX_KEY_LENGTH
+            raise exceptions.ParseError(msg)
+        credentials = hashlib.sha256()
+        for header in ('Authorization', 'Cookie'):
+            credentials.update(request.headers.get(header, '').encode('utf8') + b'\n')
+        return ('idempotency\n%s\n%s' % (credentials.hexdigest(), key)).encode('utf8')
+
+    def get_fingerprint(self, request):
+        """
+        Return a hash of the request's method, URL, content type and body.
+        """
+        fingerprint = hashlib.sha256()
+        for part in (request.method, request.path, request.query_string, request.content_type or ''):
+            if not isinstance(part, bytes):
+                part = part.encode('utf8')
+            fingerprint.update(part + b'\n')
+        fingerprint.update(request.get_buffered_body())
+        return fingerprint.digest()
+
+    def run(self, request, view, response_class):
+        """
+        Return the stored response for the request's idempotency key, or
+        run `view` and store its response.  `view` should return a
+        response object.
+        """
+        key = self.get_key(request)
+        fingerprint = self.get_fingerprint(request)
+
+        while not self.store.add(key, cbor.dumps([PENDING, fingerprint, None]), self.lock_timeout):
+            record = self.store.get(key)
+            if record is None:
+                # The key was released, or expired, in the meantime.
+                continue
+            state, stored_fingerprint, data = cbor.loads(record)
+            if stored_fingerprint != fingerprint:
+                self.mismatches += 1
+                msg = 'This Idempotency-Key has already been used for a different request.'
+                raise exceptions.UnprocessableEntity(msg)
+            if state == PENDING:
+                self.conflicts += 1
+                msg = 'A request with this Idempotency-Key is still being processed.'
+                raise exceptions.Conflict(msg)
+            if data is None:
+                self.conflicts += 1
+                msg = 'A request with this Idempotency-Key has already been processed, but its response was not stored.'
+                raise exceptions.Conflict(msg)
+            self.replays += 1
+            response = load_response(data, response_class)
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+
+        self.executions += 1
+        try:
+            response = view()
+        except Exception:
+            # Release the key, so that the request may be retried.
+            self.store.delete(key)
+            raise
+
+        if response.is_streamed or response.direct_passthrough or response.status_code >= 500:
+            self.store.delete(key)
+            return response
+
+        record = cbor.dumps([COMPLETE, fingerprint, dump_response(response, UNSTORED_HEADERS)])
+        if not self.store.set(key, record, self.timeout):
+            # The response is too large for the store.  Mark the request as
+            # complete without it, so that retries are rejected rather than
+            # running the view again.
+            self.unstored += 1
+            current_app.logger.warning(
+                'The response to %s %s is too large to store for its Idempotency-Key.' % (request.method, request.path)
+            )
+            self.store.set(key, cbor.dumps([COMPLETE, fingerprint, None]), self.timeout)
+        return response
+
+    @property
+    def stats(self):
+        return {
+            'executions': self.executions,
+            'replays': self.replays,
+            'conflicts': self.conflicts,
+            'mismatches': self.mismatches,
+            'unstored': self.unstored
+        }
@@ -0,0 +1,165 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask._compat import string_types
+from flask.json import JSONEncoder as FlaskJSONEncoder
+from flask_api.compat import orjson, simplejson, ujson
+from flask_api.lazyjson import materialize
+import json
+import math
+
+
+class JSONEncoder(FlaskJSONEncoder):
+    """
+    Extends `flask.json.JSONEncoder` to render lazily parsed JSON documents,
+    so that views may return data parsed by `LazyJSONParser` unchanged.
+    """
+
+    def default(self, o):
+        value = materialize(o)
+        if value is not o:
+            return value
+        return super(JSONEncoder, self).default(o)
+
+
+class BaseJSONBackend(object):
+    """
+    Backends parse JSON directly from bytes, and render JSON directly to
+    UTF-8 encoded bytes, using the same semantics as `flask.json.JSONEncoder`
+    for datetimes, UUIDs, dataclasses and objects with an `__html__` method,
+    and rendering lazily parsed JSON documents.
+    """
+    name = None
+    available = False
+
+    def __init__(self):
+        self.default = JSONEncoder().default
+
+    def loads(self, data):
+        msg = '`loads()` method must be implemented for class "%s"'
+        raise NotImplementedError(msg % self.__class__.__name__)
+
+    def dumps(self, data, indent=None):
+        msg = '`dumps()` method must be implemented for class "%s"'
+        raise NotImplementedError(msg % self.__class__.__name__)
+
+
+class StdlibJSONBackend(BaseJSONBackend):
+    name = 'json'
+    available = True
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps(self, data, indent=None):
+        text = json.dumps(data, cls=JSONEncoder, ensure_ascii=False, indent=indent)
+        return text.encode('utf-8')
+
+
+class SimpleJSONBackend(BaseJSONBackend):
+    name = 'simplejson'
+    available = simplejson is not None
+
+    def loads(self, data):
+        return simplejson.loads(data)
+
+    def dumps(self, data, indent=None):
+        text = simplejson.dumps(
+            data, default=self.default, ensure_ascii=False, indent=indent,
+            namedtuple_as_object=False, for_json=False, allow_nan=True
+        )
+        return text.encode('utf-8')
+
+
+class UJSONBackend(BaseJSONBackend):
+    name = 'ujson'
+    available = ujson is not None
+
+    def __init__(self):
+        super(UJSONBackend, self).__init__()
+        self.fallback = StdlibJSONBackend()
+
+    def loads(self, data):
+        return ujson.loads(data)
+
+    def dumps(self, data, indent=None):
+        if indent == 0:
+            # ujson renders zero indentation without newlines.
+            return self.fallback.dumps(data, indent=indent)
+        text = ujson.dumps(
+            data, default=self.default, ensure_ascii=False,
+            escape_forward_slashes=False, indent=indent or 0
+        )
+        return text.encode('utf-8')
+
+
+class ORJSONBackend(BaseJSONBackend):
+    name = 'orjson'
+    available = orjson is not None
+
+    def __init__(self):
+        super(ORJSONBackend, self).__init__()
+        if self.available:
+            # Hand datetimes and dataclasses to the Flask encoder, rather
+            # than using orjson's own ISO 8601 and dataclass support.
+            self.options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+            self.fallback = StdlibJSONBackend()
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def dumps(self, data, indent=None):
+        if indent is None:
+            options = self.options
+        elif indent == 2:
+            options = self.options | orjson.OPT_INDENT_2
+        else:
+            # orjson only supports two space indentation.
+            return self.fallback.dumps(data, indent=indent)
+        try:
+            content = orjson.dumps(data, default=self.default, option=options)
+        except TypeError:
+            # Eg. integers wider than 64 bits, or decimals.
+            return self.fallback.dumps(data, indent=indent)
+        if b'null' in content and has_non_finite_float(data):
+            # orjson renders NaN and infinity as null.
+            return self.fallback.dumps(data, indent=indent)
+        return content
+
+
+def has_non_finite_float(data):
+    if isinstance(data, float):
+        return math.isinf(data) or math.isnan(data)
+    if isinstance(data, dict):
+        return any(has_non_finite_float(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(has_non_finite_float(item) for item in data)
+    return False
+
+
+BACKENDS = dict([
+    (backend.name, backend)
+    for backend in (StdlibJSONBackend, SimpleJSONBackend, UJSONBackend, ORJSONBackend)
+])
+
+
+def select_json_backend(val):
+    """
+    Return a backend instance, given a backend name, a list of backend
+    names in order of preference, or a backend instance.
+
+    Falls back to the standard library if none of the named backends
+    are installed.
+    """
+    if isinstance(val, BaseJSONBackend):
+        return val
+    if isinstance(val, string_types):
+        val = [val]
+    for name in val:
+        try:
+            backend_cls = BACKENDS[name]
+        except KeyError:
+            msg = "Unknown JSON backend '%s'. Choose from %s."
+            raise ValueError(msg % (name, ', '.join(sorted(BACKENDS))))
+        if backend_cls.available:
+            return backend_cls()
+    return StdlibJSONBackend()
@@ -0,0 +1,162 @@
+# coding: utf8
+"""
+Lazily parsed JSON documents.
+
+The request body is indexed by `simdjson` when the document is parsed, and
+objects and arrays are only converted into Python values as they are
+accessed, so that reading a few keys of a large document does not pay for
+building the whole of it.
+"""
+from __future__ import unicode_literals
+from flask_api.compat import simdjson
+try:
+    from collections.abc import Mapping, Sequence
+except ImportError:
+    from collections import Mapping, Sequence
+
+
+def loads(data):
+    """
+    Parse a JSON document, returning a `LazyObject` or `LazyArray`, or a
+    plain value for a scalar document.  Raises `ValueError` if the
+    document is invalid.
+    """
+    # Each parser holds a single document, which would be invalidated by
+    # parsing another with the same parser, so use one for each document.
+    return _wrap(simdjson.Parser().parse(data))
+
+
+def _wrap(value):
+    if isinstance(value, simdjson.Object):
+        return LazyObject(value)
+    if isinstance(value, simdjson.Array):
+        return LazyArray(value)
+    return value
+
+
+class LazyObject(Mapping):
+    """
+    A read only mapping over a JSON object, which converts values as they
+    are accessed, and caches them.
+
+    Looking up a key scans the object, so iterating over it converts the
+    whole object in a single pass instead, as fast as parsing it eagerly.
+    """
+    __slots__ = ('_proxy', '_cache', '_complete')
+
+    def __init__(self, proxy):
+        self._proxy = proxy
+        self._cache = {}
+        self._complete = False
+
+    def __getitem__(self, key):
+        try:
+            return self._cache[key]
+        except KeyError:
+            if self._complete:
+                raise
+        value = self._cache[key] = _wrap(self._proxy[key])
+        return value
+
+    def _load(self):
+        if not self._complete:
+            # Values that were already accessed keep their lazy wrappers.
+            values = self._proxy.as_dict()
+            values.update(self._cache)
+            self._cache = values
+            self._complete = True
+
+    def __iter__(self):
+        self._load()
+        return iter(self._cache)
+
+    def __len__(self):
+        return len(self._proxy)
+
+    def materialize(self):
+        """
+        Return the whole object as a `dict`, converted in a single pass.
+        """
+        return self._proxy.as_dict()
+
+    def __repr__(self):
+        return '<LazyObject %r>' % self.materialize()
+
+
+class LazyArray(Sequence):
+    """
+    A read only sequence over a JSON array, which converts items as they
+    are accessed, and caches them.
+
+    As with `LazyObject`, iterating over the array converts the whole array
+    in a single pass.
+    """
+    __slots__ = ('_proxy', '_cache', '_items', '_length')
+
+    def __init__(self, proxy):
+        self._proxy = proxy
+        self._cache = {}
+        self._items = None
+        self._length = len(proxy)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            self._load()
+        if self._items is not None:
+            return self._items[index]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('list index out of range')
+        try:
+            return self._cache[index]
+        except KeyError:
+            pass
+        value = self._cache[index] = _wrap(self._proxy[index])
+        return value
+
+    def _load(self):
+        if self._items is None:
+            # Items that were already accessed keep their lazy wrappers.
+            items = self._proxy.as_list()
+            for index, value in self._cache.items():
+                items[index] = value
+            self._items = items
+
+    def __iter__(self):
+        self._load()
+        return iter(self._items)
+
+    def __len__(self):
+        return self._length
+
+    def __eq__(self, other):
+        if isinstance(other, LazyArray):
+            other = other.materialize()
+        if not isinstance(other, (list, tuple)):
+            return NotImplemented
+        return self.materialize() == list(other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def materialize(self):
+        """
+        Return the whole array as a `list`, converted in a single pass.
+        """
+        return self._proxy.as_list()
+
+    def __repr__(self):
+        return '<LazyArray %r>' % self.materialize()
+
+
+def materialize(value):
+    """
+    Return a lazily parsed value as plain Python values.
+    """
+    if isinstance(value, (LazyObject, LazyArray)):
+        return value.materialize()
+    return value
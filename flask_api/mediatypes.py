@@ -1,17 +1,63 @@
 # coding: utf8
 from __future__ import unicode_literals
+from flask_api.cache import LRUCache
+from werkzeug.datastructures import ImmutableDict
 
 
-class MediaType(object):
-    def __init__(self, media_type):
-        self.main_type, self.sub_type, self.params = self._parse(media_type)
+# Parsed media types, keyed on (class, media type string).
+_interned = LRUCache(maxsize=1024)
+
 
-    @property
-    def full_type(self):
-        return self.main_type + '/' + self.sub_type
+class MediaType(object):
+    """
+    An immutable, parsed media type.
 
-    @property
-    def precedence(self):
+    Instances are interned, so constructing a `MediaType` from a string
+    that has been seen before returns the existing instance, and the
+    canonical string, precedence and hash are only computed once.
+    """
+    __slots__ = (
+        'main_type', 'sub_type', 'params', 'full_type', 'precedence',
+        '_string', '_hash'
+    )
+
+    def __new__(cls, media_type):
+        key = (cls, media_type)
+        instance = _interned.get(key)
+        if instance is None:
+            instance = object.__new__(cls)
+            instance._setup(media_type)
+            # Also intern the canonical form, so that equivalent strings
+            # end up sharing a single instance.
+            canonical = _interned.get((cls, instance._string))
+            if canonical is not None:
+                instance = canonical
+            else:
+                _interned.set((cls, instance._string), instance)
+            _interned.set(key, instance)
+        return instance
+
+    def _setup(self, media_type):
+        main_type, sub_type, params = self._parse(media_type)
+        set_attr = super(MediaType, self).__setattr__
+        set_attr('main_type', main_type)
+        set_attr('sub_type', sub_type)
+        set_attr('params', ImmutableDict(params))
+        set_attr('full_type', main_type + '/' + sub_type)
+        set_attr('precedence', self._get_precedence())
+        set_attr('_string', self._get_string())
+        set_attr('_hash', hash(self._string))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%s instances are immutable' % self.__class__.__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError('%s instances are immutable' % self.__class__.__name__)
+
+    def __reduce__(self):
+        return (self.__class__, (self._string,))
+
+    def _get_precedence(self):
         """
         Precedence is determined by how specific a media type is:
 
@@ -66,10 +112,7 @@ class MediaType(object):
         main_type, sep, sub_type = [s.strip() for s in full_type.partition('/')]
         return (main_type, sub_type, params)
 
-    def __repr__(self):
-        return "<%s '%s'>" % (self.__class__.__name__, str(self))
-
-    def __str__(self):
+    def _get_string(self):
         """
         Return a canonical string representing the media type.
         Note that this ensures the params are sorted.
@@ -82,16 +125,32 @@ class MediaType(object):
             return self.full_type + '; ' + params_str
         return self.full_type
 
+    def __repr__(self):
+        return "<%s '%s'>" % (self.__class__.__name__, self._string)
+
+    def __str__(self):
+        return self._string
+
     def __hash__(self):
-        return hash(str(self))
+        return self._hash
 
     def __eq__(self, other):
         # Compare two MediaType instances, ignoring parameter ordering.
+        if self is other:
+            return True
+        if not isinstance(other, MediaType):
+            return NotImplemented
         return (
             self.full_type == other.full_type and
             self.params == other.params
         )
 
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
 
 def parse_accept_header(accept):
     """
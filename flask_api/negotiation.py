@@ -42,7 +42,9 @@ class DefaultNegotiation(BaseNegotiation):
             for renderer in renderers:
                 server_media_type = MediaType(renderer.media_type)
                 for client_media_type in client_media_types:
-                    if client_media_type.satisfies(server_media_type):
+                    # Parameters the renderer does not declare, such as
+                    # 'indent', are rendering hints and do not prevent a match.
+                    if client_media_type.satisfies(server_media_type) or server_media_type.satisfies(client_media_type):
                         if server_media_type.precedence > client_media_type.precedence:
                             return (renderer, server_media_type)
                         else:
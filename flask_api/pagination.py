@@ -0,0 +1,164 @@
+# coding: utf8
+"""
+Keyset pagination.
+
+Rather than skipping over an offset, each page is fetched starting after the
+sort key of the last item on the previous page, which is carried between
+requests in a signed, opaque cursor.  Given an index on the sort key, the
+cost of fetching a page stays the same however deep the client paginates.
+"""
+from __future__ import unicode_literals
+from flask import current_app, request
+from flask_api import exceptions
+from flask_api.settings import current_settings
+from flask_api.streaming import StreamingList
+from itsdangerous import BadSignature, URLSafeSerializer
+from werkzeug.urls import url_encode
+
+
+CURSOR_SALT = 'flask-api.pagination'
+
+
+def _get_serializer():
+    if not current_app.secret_key:
+        raise RuntimeError('Cursor pagination requires the application\'s SECRET_KEY to be set.')
+    # Cursors are only valid for the endpoint that issued them.
+    salt = '%s.%s' % (CURSOR_SALT, request.endpoint)
+    return URLSafeSerializer(current_app.secret_key, salt=salt)
+
+
+def _as_key(value):
+    # JSON has no tuples, so compound keys are loaded as lists.
+    if isinstance(value, list):
+        return tuple(_as_key(item) for item in value)
+    return value
+
+
+def encode_cursor(key):
+    """
+    Return an opaque cursor for a page that starts after the given key.
+    """
+    return _get_serializer().dumps(key)
+
+
+def decode_cursor(cursor):
+    """
+    Return the key encoded in a cursor, or raise a `ParseError` if it has
+    been tampered with, or was issued by another endpoint.
+    """
+    try:
+        return _as_key(_get_serializer().loads(cursor))
+    except BadSignature:
+        raise exceptions.ParseError('Invalid cursor.')
+
+
+def get_page_size(page_size=None, max_page_size=None):
+    """
+    Return the page size requested with the 'page_size' query parameter,
+    capped to `max_page_size`, falling back to `page_size` if it is not
+    given or is invalid.
+    """
+    settings = current_settings()
+    page_size = page_size or settings.PAGINATION_PAGE_SIZE
+    max_page_size = max_page_size or settings.PAGINATION_MAX_PAGE_SIZE
+    try:
+        requested = int(request.args['page_size'])
+    except (KeyError, ValueError):
+        requested = page_size
+    if requested < 1:
+        requested = page_size
+    return min(requested, max_page_size)
+
+
+def _is_after(item_key, after):
+    try:
+        return item_key > after
+    except TypeError:
+        # The cursor's key can not be compared with the sort key.
+        raise exceptions.ParseError('Invalid cursor.')
+
+
+def seek(items, key, after):
+    """
+    Return an iterator over the items of a sorted sequence that come after
+    the given key, using a binary search, or skipping over earlier items
+    for other iterables.
+    """
+    if after is None:
+        return iter(items)
+    if not (hasattr(items, '__getitem__') and hasattr(items, '__len__')):
+        return (item for item in items if _is_after(key(item), after))
+
+    low, high = 0, len(items)
+    while low < high:
+        middle = (low + high) // 2
+        if _is_after(key(items[middle]), after):
+            high = middle
+        else:
+            low = middle + 1
+    return (items[idx] for idx in range(low, len(items)))
+
+
+class Page(StreamingList):
+    """
+    A page of items, which is rendered as a list, with a 'Link' header
+    pointing to the next page, if there is one.
+
+    Items are passed through `serializer`, if given, as they are rendered,
+    so that the representation of the page is streamed.
+    """
+
+    def __init__(self, items, next_cursor=None, serializer=None, chunk_size=None):
+        super(Page, self).__init__(items, chunk_size)
+        self.items = items
+        self.next_cursor = next_cursor
+        self.serializer = serializer
+
+    def __iter__(self):
+        if self.serializer is None:
+            return iter(self.items)
+        return (self.serializer(item) for item in self.items)
+
+    def get_link(self, cursor):
+        args = request.args.copy()
+        args['cursor'] = cursor
+        return '%s?%s' % (request.base_url, url_encode(args, sort=True))
+
+    @property
+    def headers(self):
+        if self.next_cursor is None:
+            return []
+        return [('Link', '<%s>; rel="next"' % self.get_link(self.next_cursor))]
+
+
+def paginate(source, key, page_size=None, max_page_size=None, serializer=None):
+    """
+    Return a `Page` of items for the request, starting after the request's
+    'cursor' query parameter, if it has one.
+
+    `source` is either an iterable of items sorted by `key`, or a callable
+    taking `after` and `limit` arguments, which should return up to `limit`
+    items with a sort key greater than `after` (or the first `limit` items,
+    if `after` is `None`), in order.  `key` is a function that returns the
+    sort key of an item, which must be unique, and may be a tuple.
+    """
+    size = get_page_size(page_size, max_page_size)
+    cursor = request.args.get('cursor')
+    after = decode_cursor(cursor) if cursor else None
+
+    # Fetch an extra item, to find out whether there is a next page.
+    if callable(source):
+        fetched = source(after, size + 1)
+    else:
+        fetched = seek(source, key, after)
+    items = []
+    for item in fetched:
+        items.append(item)
+        if len(items) > size:
+            break
+
+    next_cursor = None
+    if len(items) > size:
+        items = items[:size]
+        next_cursor = encode_cursor(key(items[-1]))
+    return Page(items, next_cursor, serializer)
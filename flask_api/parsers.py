@@ -1,10 +1,13 @@
 # coding: utf8
 from __future__ import unicode_literals
+from flask import has_request_context, request
 from flask._compat import text_type
-from flask_api import exceptions
-from werkzeug.formparser import MultiPartParser as WerkzeugMultiPartParser
-from werkzeug.formparser import default_stream_factory
+from flask_api import cbor, exceptions, lazyjson
+from flask_api.compat import msgpack, simdjson
+from flask_api.settings import current_settings
+from flask_api.uploads import UploadMultiPartParser, UploadStreamFactory
 from werkzeug.urls import url_decode_stream
+import codecs
 import json
 
 
@@ -22,36 +25,298 @@ class JSONParser(BaseParser):
     media_type = 'application/json'
 
     def parse(self, stream, media_type, **options):
-        data = stream.read().decode('utf-8')
+        backend = current_settings().JSON_BACKEND
         try:
-            return json.loads(data)
+            return backend.loads(stream.read())
         except ValueError as exc:
             msg = 'JSON parse error - %s' % text_type(exc)
             raise exceptions.ParseError(msg)
 
 
+class LazyJSONParser(BaseParser):
+    """
+    Parses JSON on demand, so that views which read a few fields of a large
+    request body only pay for converting those fields into Python values.
+
+    `request.data` is a read only `LazyObject` or `LazyArray`, which behave
+    as a mapping or sequence.  Call `materialize()` on them to convert the
+    whole document at once.  Requires the `pysimdjson` package, and falls
+    back to parsing eagerly with the `JSON_BACKEND` when it is not installed.
+    """
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type, **options):
+        if simdjson is None:
+            return JSONParser().parse(stream, media_type, **options)
+        try:
+            return lazyjson.loads(stream.read())
+        except ValueError as exc:
+            msg = 'JSON parse error - %s' % text_type(exc)
+            raise exceptions.ParseError(msg)
+
+
+class StreamingJSONParser(BaseParser):
+    """
+    Parses a JSON array incrementally, as the request body is read.
+
+    `request.data` is an iterator over the items of the array, which are
+    parsed one at a time, so that memory use is bounded by the size of
+    the largest item rather than the size of the request body.
+    """
+    media_type = 'application/json'
+    chunk_size = 64 * 1024
+
+    def parse(self, stream, media_type, **options):
+        max_length = request.max_content_length if has_request_context() else None
+        return JSONArrayStream(stream, self.chunk_size, max_length)
+
+
+class JSONArrayStream(object):
+    """
+    An iterator over the items of a JSON array, read from `stream`.
+    """
+
+    def __init__(self, stream, chunk_size, max_length=None):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.max_length = max_length
+        self.bytes_read = 0
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._items = self._iter_items()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._items)
+
+    next = __next__
+
+    def _iter_items(self):
+        if self._next_char() != '[':
+            raise exceptions.ParseError('JSON parse error - Expected a JSON array')
+        self._pos += 1
+
+        index = 0
+        if self._next_char() == ']':
+            self._pos += 1
+        else:
+            while True:
+                yield self._decode_item(index)
+                index += 1
+                char = self._next_char()
+                self._pos += 1
+                if char == ']':
+                    break
+                elif char != ',':
+                    msg = "JSON parse error in element %d - Expecting ',' delimiter"
+                    raise exceptions.ParseError(msg % index)
+                elif self._next_char() == ']':
+                    msg = 'JSON parse error in element %d - Expecting value'
+                    raise exceptions.ParseError(msg % index)
+
+        if self._next_char():
+            raise exceptions.ParseError('JSON parse error - Extra data after JSON array')
+
+    def _decode_item(self, index):
+        while True:
+            try:
+                item, end = self._json_decoder.raw_decode(self._buffer, self._pos)
+            except ValueError as exc:
+                if self._eof or not self._is_truncated(exc):
+                    msg = 'JSON parse error in element %d - %s'
+                    raise exceptions.ParseError(msg % (index, text_type(exc)))
+                self._fill()
+                continue
+            if not self._eof and (end == len(self._buffer) or (
+                    isinstance(item, (int, float)) and end >= len(self._buffer) - 2)):
+                # A number may continue into the next chunk, including after
+                # a partial fraction or exponent, such as '1.' or '1e+'.
+                self._fill()
+                continue
+            self._pos = end
+            return item
+
+    def _is_truncated(self, exc):
+        """
+        Return `True` if a decoding error may be because the item continues
+        into the next chunk, rather than because the item is invalid, so that
+        invalid items are reported without reading the rest of the stream.
+        """
+        pos = getattr(exc, 'pos', None)
+        if pos is None:
+            return True
+        if exc.msg.startswith('Unterminated string'):
+            return True
+        # Allow for a partial literal, such as '-Infinit', or escape sequence.
+        return pos >= len(self._buffer) - len('-Infinity')
+
+    def _next_char(self):
+        """
+        Skip any whitespace, and return the next character, or an empty
+        string once the end of the stream has been reached.
+        """
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in ' \t\r\n':
+                self._pos += 1
+            if self._pos < len(self._buffer) or self._eof:
+                return self._buffer[self._pos:self._pos + 1]
+            self._fill()
+
+    def _fill(self):
+        """
+        Read more data from the stream onto the buffer.  The read size
+        grows with any partially decoded item, to avoid repeatedly
+        re-decoding very large items.
+        """
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+        chunk = self.stream.read(max(self.chunk_size, len(self._buffer)))
+        self.bytes_read += len(chunk)
+        if self.max_length is not None and self.bytes_read > self.max_length:
+            raise exceptions.RequestEntityTooLarge()
+        try:
+            self._buffer += self._text_decoder.decode(chunk, final=not chunk)
+        except UnicodeDecodeError as exc:
+            raise exceptions.ParseError('JSON parse error - %s' % text_type(exc))
+        self._eof = not chunk
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline delimited JSON, also known as JSON Lines.
+
+    `request.data` is an iterator over the records, which are parsed
+    lazily, one line at a time, as the request body is read.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type, **options):
+        max_length = request.max_content_length if has_request_context() else None
+        settings = current_settings()
+        return NDJSONStream(stream, settings.JSON_BACKEND, max_length, settings.NDJSON_MAX_LINE_LENGTH)
+
+
+class NDJSONStream(object):
+    """
+    An iterator over the records of a newline delimited JSON stream.
+    """
+
+    def __init__(self, stream, backend, max_length=None, max_line_length=None):
+        self.stream = stream
+        self.backend = backend
+        self.max_length = max_length
+        self.max_line_length = max_line_length
+        self.bytes_read = 0
+        self._records = self._iter_records()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._records)
+
+    next = __next__
+
+    def _readline(self):
+        if self.max_line_length is None:
+            return self.stream.readline()
+        return self.stream.readline(self.max_line_length + 1)
+
+    def _iter_records(self):
+        for line_number, line in enumerate(iter(self._readline, b''), 1):
+            self.bytes_read += len(line)
+            if self.max_length is not None and self.bytes_read > self.max_length:
+                raise exceptions.RequestEntityTooLarge()
+            if self.max_line_length is not None and len(line) > self.max_line_length and not line.endswith(b'\n'):
+                msg = 'NDJSON parse error on line %d - Line exceeds %d bytes'
+                raise exceptions.ParseError(msg % (line_number, self.max_line_length))
+            if not line.strip():
+                continue
+            try:
+                yield self.backend.loads(line)
+            except ValueError as exc:
+                msg = 'NDJSON parse error on line %d - %s'
+                raise exceptions.ParseError(msg % (line_number, text_type(exc)))
+
+
+class MessagePackParser(BaseParser):
+    """
+    Parses MessagePack request content.  Requires the `msgpack` package.
+    """
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type, **options):
+        assert msgpack is not None, 'MessagePackParser requires the `msgpack` package'
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError, msgpack.UnpackException) as exc:
+            msg = 'MessagePack parse error - %s' % text_type(exc)
+            raise exceptions.ParseError(msg)
+
+
+class CBORParser(BaseParser):
+    """
+    Parses CBOR request content.
+    """
+    media_type = 'application/cbor'
+
+    def parse(self, stream, media_type, **options):
+        try:
+            return cbor.loads(stream.read())
+        except ValueError as exc:
+            msg = 'CBOR parse error - %s' % text_type(exc)
+            raise exceptions.ParseError(msg)
+
+
 class MultiPartParser(BaseParser):
     media_type = 'multipart/form-data'
     handles_file_uploads = True
     handles_form_data = True
 
     def parse(self, stream, media_type, **options):
-        multipart_parser = WerkzeugMultiPartParser(default_stream_factory)
-
         boundary = media_type.params.get('boundary')
         if boundary is None:
             msg = 'Multipart message missing boundary in Content-Type header'
             raise exceptions.ParseError(msg)
         boundary = boundary.encode('ascii')
 
+        # The content length is `None` if the request body is compressed,
+        # in which case the stream is read until it is exhausted.
         content_length = options.get('content_length')
-        assert content_length is not None, 'MultiPartParser.parse() requires `content_length` argument'
+        max_length = request.max_content_length if has_request_context() else None
+        if max_length is not None and content_length is not None and content_length > max_length:
+            raise exceptions.RequestEntityTooLarge()
+
+        settings = current_settings()
+        stream_factory = UploadStreamFactory(
+            spool_size=settings.UPLOAD_SPOOL_SIZE,
+            temp_dir=settings.UPLOAD_TEMP_DIR,
+            checksums=settings.UPLOAD_CHECKSUMS,
+            max_file_size=settings.UPLOAD_MAX_FILE_SIZE,
+            max_size=max_length,
+            sink_factory=getattr(request, 'upload_sink', None) if has_request_context() else None
+        )
+        multipart_parser = UploadMultiPartParser(
+            stream_factory,
+            max_form_memory_size=request.max_form_memory_size if has_request_context() else None
+        )
 
         try:
-            return multipart_parser.parse(stream, boundary, content_length)
+            data, files = multipart_parser.parse(stream, boundary, content_length)
         except ValueError as exc:
+            stream_factory.abort()
             msg = 'Multipart parse error - %s' % text_type(exc)
             raise exceptions.ParseError(msg)
+        except BaseException:
+            stream_factory.abort()
+            raise
+        stream_factory.finish()
+        return data, files
 
 
 class URLEncodedParser(BaseParser):
@@ -59,4 +324,7 @@ class URLEncodedParser(BaseParser):
     handles_form_data = True
 
     def parse(self, stream, media_type, **options):
+        form_data = options.get('form_data')
+        if form_data is not None:
+            return form_data
         return url_decode_stream(stream)
@@ -0,0 +1,91 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask_api.mediatypes import MediaType
+from flask_api.negotiation import DefaultNegotiation
+import threading
+
+
+class Pipeline(object):
+    """
+    The parser and renderer instances for a given set of parser and
+    renderer classes, built once and then shared between requests.
+
+    Parsers and renderers are expected to be stateless, as a single
+    instance of each is used for every request.
+    """
+
+    def __init__(self, parser_classes, renderer_classes, negotiator_class=DefaultNegotiation):
+        self.parser_classes = tuple(parser_classes)
+        self.renderer_classes = tuple(renderer_classes)
+        self.negotiator = negotiator_class()
+
+        self.parsers = tuple(parser_cls() for parser_cls in self.parser_classes)
+        self.renderers = tuple(renderer_cls() for renderer_cls in self.renderer_classes)
+        self.parser_media_types = tuple(MediaType(parser.media_type) for parser in self.parsers)
+        self.renderer_media_types = tuple(MediaType(renderer.media_type) for renderer in self.renderers)
+
+        self._renderer_instances = dict(zip(self.renderer_classes, self.renderers))
+        self._parser_dispatch = self._compile_parser_dispatch()
+
+    def _compile_parser_dispatch(self):
+        """
+        Return a dictionary mapping content types to the parser that
+        `DefaultNegotiation.select_parser()` would choose for them.
+
+        Only parsers ahead of the first wildcard or parameterized parser
+        can be dispatched on directly.  Any other content type falls back
+        to running the negotiator.
+        """
+        if type(self.negotiator).select_parser != DefaultNegotiation.select_parser:
+            return {}
+
+        dispatch = {}
+        for parser, media_type in zip(self.parsers, self.parser_media_types):
+            if media_type.precedence != 2:
+                break
+            dispatch.setdefault(media_type.full_type, parser)
+        return dispatch
+
+    def select_parser(self, content_type):
+        """
+        Returns a two-tuple of (parser, content type) for the request body.
+        """
+        client_media_type = MediaType(content_type)
+        parser = self._parser_dispatch.get(client_media_type.full_type)
+        if parser is not None:
+            return (parser, client_media_type)
+        return self.negotiator.select_parser(self.parsers)
+
+    def select_renderer(self):
+        """
+        Returns a two-tuple of (renderer, accepted media type) for the
+        response body.
+        """
+        renderer_cls, media_type = self.negotiator.select_renderer(self.renderer_classes)
+        return (self._renderer_instances[renderer_cls], media_type)
+
+
+_pipelines = {}
+_lock = threading.Lock()
+
+
+def get_pipeline(parser_classes, renderer_classes, negotiator_class=DefaultNegotiation):
+    """
+    Return the shared `Pipeline` for the given classes, compiling it
+    the first time it is requested.
+    """
+    if not isinstance(parser_classes, tuple):
+        parser_classes = tuple(parser_classes)
+    if not isinstance(renderer_classes, tuple):
+        renderer_classes = tuple(renderer_classes)
+
+    key = (parser_classes, renderer_classes, negotiator_class)
+    try:
+        return _pipelines[key]
+    except KeyError:
+        pass
+
+    with _lock:
+        if key not in _pipelines:
+            _pipelines[key] = Pipeline(parser_classes, renderer_classes, negotiator_class)
+        return _pipelines[key]
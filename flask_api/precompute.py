@@ -0,0 +1,268 @@
+# coding: utf8
+"""
+Background refreshing of precomputed responses.
+
+Views are opted in with the `precompute` decorator.  The first request for
+each path, query string and negotiated media type runs the view as usual,
+after which the rendered response is kept in memory and served directly.
+A scheduler thread re-runs the view in a synthetic request context every
+`interval` seconds, or as soon as the response is invalidated, and until
+a refresh completes the previous response continues to be served.
+
+Only responses that are requested again are refreshed, so that requests
+for one-off URLs do not each cause the view to be re-run in the background.
+"""
+from __future__ import unicode_literals
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from flask_api.responsecache import dump_response, is_cacheable, load_response, precompress_response
+import threading
+import time
+
+
+# Set in the WSGI environ of synthetic requests, so that the view is run
+# rather than served from the precomputed response.
+REFRESH_ENVIRON_KEY = 'flask_api.precompute.refresh'
+
+
+class PrecomputedResponse(object):
+    def __init__(self, request, interval):
+        self.path = request.path
+        self.base_url = request.url_root
+        self.query_string = request.query_string
+        self.media_type = str(request.accepted_media_type)
+        self.interval = interval
+        self.data = None
+        self.computed_at = None
+        self.refreshed_at = None
+        self.last_served = time.time()
+        self.hits = 0
+        self.served_since_refresh = False
+        self.stale = False
+        self.in_flight = False
+        self.refreshes = 0
+        self.failures = 0
+        self.last_duration = None
+        self.last_error = None
+
+    @property
+    def due(self):
+        return self.stale or self.refreshed_at + self.interval <= time.time()
+
+    @property
+    def wanted(self):
+        """
+        Only responses which were served since they were last refreshed, or
+        which have been served more than once, are refreshed, along with any
+        that have been invalidated.
+        """
+        return self.stale or self.served_since_refresh or self.hits > 1
+
+    @property
+    def stats(self):
+        return {
+            'path': self.path,
+            'query_string': self.query_string.decode('latin-1'),
+            'media_type': self.media_type,
+            'age': time.time() - self.computed_at,
+            'hits': self.hits,
+            'in_flight': self.in_flight,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'last_duration': self.last_duration,
+            'last_error': self.last_error
+        }
+
+
+class Precomputer(object):
+    """
+    Holds the precomputed responses for an application, and refreshes
+    them in a pool of `workers` background threads.
+
+    At most `max_entries` responses are held, with the least recently used
+    being discarded when full.  Responses that have not been served for
+    `max_idle` refresh intervals are also discarded, and responses older
+    than `max_stale` intervals, because their refreshes keep failing, are
+    no longer served.
+    """
+
+    def __init__(self, app, workers=4, max_idle=10, max_entries=1000, max_stale=3):
+        self.app = app
+        self.workers = workers
+        self.max_idle = max_idle
+        self.max_entries = max_entries
+        self.max_stale = max_stale
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._executor = None
+        self._scheduler = None
+        self._running = False
+
+    def get_key(self, request):
+        return (request.host, request.path, request.query_string, str(request.accepted_media_type))
+
+    def serve(self, request, view, interval):
+        """
+        Return the precomputed response for the request, or run `view`
+        and precompute its response if there is not one yet.
+        """
+        key = self.get_key(request)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None and entry.computed_at + entry.interval * self.max_stale > now:
+                # Re-insert the entry, marking it as the most recently used.
+                self._entries[key] = entry
+                entry.last_served = now
+                entry.hits += 1
+                entry.served_since_refresh = True
+                self.hits += 1
+                data = entry.data
+            else:
+                self.misses += 1
+                data = None
+
+        if data is not None:
+            # The entry may now be wanted for refreshing.
+            self._wakeup.set()
+            return load_response(data, self.app.response_class)
+
+        response = self.app.make_response(view())
+        if is_cacheable(response):
+            precompress_response(response, self.app.api_settings)
+            entry = PrecomputedResponse(request, interval)
+            entry.data = dump_response(response)
+            entry.computed_at = entry.refreshed_at = time.time()
+            with self._lock:
+                self._entries.pop(key, None)
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            self.start()
+        return response
+
+    def invalidate(self, path=None):
+        """
+        Mark the precomputed responses for `path`, or for every path, as
+        stale, so that they are refreshed as soon as possible.  The stale
+        responses are served until then.
+        """
+        with self._lock:
+            for entry in self._entries.values():
+                if path is None or entry.path == path:
+                    entry.stale = True
+        self._wakeup.set()
+
+    def refresh(self, entry):
+        """
+        Re-run the view for a precomputed response, in a synthetic request.
+        """
+        started = time.time()
+        with self._lock:
+            entry.served_since_refresh = False
+        try:
+            with self.app.test_request_context(
+                    entry.path,
+                    base_url=entry.base_url,
+                    query_string=entry.query_string,
+                    headers={'Accept': entry.media_type},
+                    environ_overrides={REFRESH_ENVIRON_KEY: True}):
+                # Store the response from the same stage as `serve()`, before
+                # `process_response`, which is applied whenever it is served.
+                rv = self.app.preprocess_request()
+                if rv is None:
+                    rv = self.app.dispatch_request()
+                response = self.app.make_response(rv)
+                if not is_cacheable(response):
+                    msg = 'Response with status %d can not be precomputed.'
+                    raise ValueError(msg % response.status_code)
+                precompress_response(response, self.app.api_settings)
+                data = dump_response(response)
+        except Exception as exc:
+            self.app.logger.exception('Failed to refresh precomputed response for %s' % entry.path)
+            with self._lock:
+                entry.failures += 1
+                entry.last_error = '%s: %s' % (type(exc).__name__, exc)
+                entry.last_duration = time.time() - started
+                # Retry after the next interval, rather than immediately.
+                entry.refreshed_at = time.time()
+                entry.stale = False
+                entry.in_flight = False
+            self._wakeup.set()
+            return
+
+        with self._lock:
+            entry.data = data
+            entry.computed_at = time.time()
+            entry.refreshes += 1
+            entry.last_error = None
+            entry.last_duration = time.time() - started
+            entry.refreshed_at = time.time()
+            entry.stale = False
+            entry.in_flight = False
+        # Let the scheduler take the entry's next refresh into account.
+        self._wakeup.set()
+
+    def start(self):
+        """
+        Start the scheduler thread, if it is not already running.
+        """
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+            self._scheduler = threading.Thread(target=self._schedule, name='flask-api-precompute')
+            self._scheduler.daemon = True
+            self._scheduler.start()
+
+    def stop(self):
+        """
+        Stop the scheduler thread, and wait for any refreshes to complete.
+        """
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+        self._wakeup.set()
+        self._scheduler.join()
+        self._executor.shutdown(wait=True)
+
+    def _schedule(self):
+        while True:
+            with self._lock:
+                if not self._running:
+                    return
+                now = time.time()
+                timeout = 1.0
+                for key, entry in list(self._entries.items()):
+                    if entry.in_flight:
+                        continue
+                    if entry.last_served + entry.interval * self.max_idle <= now:
+                        del self._entries[key]
+                    elif not entry.wanted:
+                        continue
+                    elif entry.due:
+                        entry.in_flight = True
+                        self._executor.submit(self.refresh, entry)
+                    else:
+                        timeout = min(timeout, entry.refreshed_at + entry.interval - now)
+                self._wakeup.clear()
+            self._wakeup.wait(max(timeout, 0.01))
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'refreshes': sum(entry.refreshes for entry in self._entries.values()),
+                'failures': sum(entry.failures for entry in self._entries.values()),
+                'entries': [entry.stats for entry in self._entries.values()]
+            }
@@ -1,11 +1,13 @@
 # coding: utf8
 from __future__ import unicode_literals
 from flask import request, render_template, current_app
-from flask.json import JSONEncoder
 from flask.globals import _request_ctx_stack
 from flask_api.mediatypes import MediaType
-from flask_api.compat import apply_markdown
-import json
+from flask_api import cbor
+from flask_api.compat import apply_markdown, msgpack
+from flask_api.jsonbackends import JSONEncoder
+from flask_api.settings import current_settings
+from flask_api.streaming import StreamingList
 import pydoc
 import re
 
@@ -40,6 +42,7 @@ class BaseRenderer(object):
     media_type = None
     charset = 'utf-8'
     handles_empty_responses = False
+    handles_streaming = False  # If set then `render()` may be passed a `StreamingList`.
 
     def render(self, data, media_type, **options):
         msg = '`render()` method must be implemented for class "%s"'
@@ -49,6 +52,7 @@ class BaseRenderer(object):
 class JSONRenderer(BaseRenderer):
     media_type = 'application/json'
     charset = None
+    handles_streaming = True
 
     def render(self, data, media_type, **options):
         # Requested indentation may be set in the Accept header.
@@ -58,7 +62,118 @@ class JSONRenderer(BaseRenderer):
             indent = None
         # Indent may be set explicitly, eg when rendered by the browsable API.
         indent = options.get('indent', indent)
-        return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, indent=indent)
+        settings = current_settings()
+        if isinstance(data, StreamingList):
+            chunk_size = data.chunk_size or settings.STREAMING_CHUNK_SIZE
+            return self.render_stream(data, settings.JSON_BACKEND, indent, chunk_size)
+        return settings.JSON_BACKEND.dumps(data, indent=indent)
+
+    def render_stream(self, data, backend, indent, chunk_size):
+        """
+        Render an iterable as a JSON array, returning an iterator of
+        bytestrings, each containing up to `chunk_size` items.
+        """
+        if indent is None:
+            start, separator, end = b'[', b', ', b']'
+        else:
+            padding = b'\n' + b' ' * indent
+            start, separator, end = b'[' + padding, b',' + padding, b'\n]'
+
+        chunk = []
+        for item in data:
+            content = backend.dumps(item, indent=indent)
+            if indent is not None:
+                content = content.replace(b'\n', padding)
+            chunk.append(content)
+            if len(chunk) >= chunk_size:
+                yield start + separator.join(chunk)
+                start, chunk = separator, []
+        if chunk:
+            yield start + separator.join(chunk)
+            start = separator
+        yield b'[]' if start != separator else end
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renders a list or iterable as newline delimited JSON, with one
+    record per line.
+    """
+    media_type = 'application/x-ndjson'
+    charset = None
+    handles_streaming = True
+
+    def render(self, data, media_type, **options):
+        settings = current_settings()
+        if isinstance(data, StreamingList):
+            chunk_size = data.chunk_size or settings.STREAMING_CHUNK_SIZE
+            return self.render_stream(data, settings.JSON_BACKEND, chunk_size)
+        if not isinstance(data, (list, tuple)):
+            data = [data]
+        return b''.join(settings.JSON_BACKEND.dumps(item) + b'\n' for item in data)
+
+    def render_stream(self, data, backend, chunk_size):
+        """
+        Render an iterable as newline delimited JSON, returning an iterator
+        of bytestrings, each containing up to `chunk_size` records.
+        """
+        chunk = []
+        for item in data:
+            chunk.append(backend.dumps(item) + b'\n')
+            if len(chunk) >= chunk_size:
+                yield b''.join(chunk)
+                chunk = []
+        if chunk:
+            yield b''.join(chunk)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders MessagePack, handling the same extended types as
+    `flask.json.JSONEncoder`.  Requires the `msgpack` package.
+    """
+    media_type = 'application/msgpack'
+    charset = None
+
+    def __init__(self):
+        self.default = JSONEncoder().default
+
+    def render(self, data, media_type, **options):
+        assert msgpack is not None, 'MessagePackRenderer requires the `msgpack` package'
+        return msgpack.packb(data, default=self.default, use_bin_type=True)
+
+
+class CBORRenderer(BaseRenderer):
+    """
+    Renders CBOR, handling the same extended types as
+    `flask.json.JSONEncoder`.  Streamed lists are rendered as
+    indefinite length arrays.
+    """
+    media_type = 'application/cbor'
+    charset = None
+    handles_streaming = True
+
+    def __init__(self):
+        self.encoder = cbor.Encoder(default=JSONEncoder().default)
+
+    def render(self, data, media_type, **options):
+        if isinstance(data, StreamingList):
+            chunk_size = data.chunk_size or current_settings().STREAMING_CHUNK_SIZE
+            return self.render_stream(data, chunk_size)
+        return self.encoder.encode(data)
+
+    def render_stream(self, data, chunk_size):
+        """
+        Render an iterable as an indefinite length CBOR array, returning an
+        iterator of bytestrings, each containing up to `chunk_size` items.
+        """
+        start, chunk = cbor.INDEFINITE_ARRAY, []
+        for item in data:
+            chunk.append(self.encoder.encode(item))
+            if len(chunk) >= chunk_size:
+                yield start + b''.join(chunk)
+                start, chunk = b'', []
+        yield start + b''.join(chunk) + cbor.BREAK
 
 
 class HTMLRenderer(object):
@@ -88,6 +203,8 @@ class BrowsableAPIRenderer(BaseRenderer):
             mock_content = None
         else:
             text = mock_renderer.render(data, mock_media_type, indent=4)
+            if isinstance(text, bytes):
+                text = text.decode('utf-8')
             mock_content = self._html_escape(text)
 
         # Determine the allowed methods on this view.
@@ -1,10 +1,16 @@
 # coding: utf8
 from __future__ import unicode_literals
 from flask import Request
+from flask_api import exceptions
+from flask_api.compression import decompressing_stream
+from flask_api.fields import get_fieldset, ALL_FIELDS
 from flask_api.negotiation import DefaultNegotiation
+from flask_api.parsers import URLEncodedParser
+from flask_api.pipeline import get_pipeline
 from flask_api.settings import default_settings
+from flask_api.streaming import is_streaming
 from werkzeug.datastructures import MultiDict
-from werkzeug.urls import url_decode_stream
+from werkzeug.urls import url_decode
 from werkzeug.wsgi import get_content_length
 from werkzeug._compat import to_unicode
 import io
@@ -14,7 +20,15 @@ class APIRequest(Request):
     parser_classes = default_settings.DEFAULT_PARSERS
     renderer_classes = default_settings.DEFAULT_RENDERERS
     negotiator_class = DefaultNegotiation
+    negotiation_cache = None
+    api_settings = default_settings
     empty_data_class = MultiDict
+    # Set to `False` by `FlaskAPI` for views that disable method overloading.
+    method_overloading = True
+    # Set by `FlaskAPI` for views using the `set_max_content_length` decorator.
+    route_max_content_length = None
+    # Set if `check_body()` rejected the request before its body was read.
+    body_rejected = False
 
     # Request parsing...
 
@@ -36,20 +50,94 @@ class APIRequest(Request):
             self._parse()
         return self._files
 
+    def iter_data(self):
+        """
+        Return an iterator over the items of a list in the request body.
+
+        When used with `StreamingJSONParser` the items are parsed lazily,
+        as the request body is read.
+        """
+        data = self.data
+        if isinstance(data, (list, tuple)) or is_streaming(data):
+            return iter(data)
+        elif not data:
+            return iter(())
+        raise exceptions.ParseError('Expected a list of items in the request body.')
+
+    def validate_data(self, schema):
+        """
+        Replace `request.data` with the result of validating and coercing it
+        with a compiled `Schema`, which raises a `ParseError` listing every
+        invalid field.
+        """
+        self._data = schema.validate(self.data)
+        return self._data
+
+    def get_buffered_body(self):
+        """
+        Return the request body as bytes, so that it may be inspected before
+        it is parsed.  The body is held in memory, and is still available to
+        the parsers.
+        """
+        if not hasattr(self, '_buffered_body'):
+            self._buffered_body = self.stream.read()
+            self._stream = io.BytesIO(self._buffered_body)
+        return self._buffered_body
+
+    @property
+    def max_content_length(self):
+        if self.route_max_content_length is not None:
+            return self.route_max_content_length
+        return super(APIRequest, self).max_content_length
+
+    def check_body(self):
+        """
+        Check that the request body could be parsed, using the request
+        headers alone, so that unsupported or oversized requests can be
+        rejected without reading the body.  For requests sent with an
+        'Expect: 100-continue' header, the client will not send the body
+        at all, if the server waits for the body to be read before
+        continuing.
+        """
+        length = get_content_length(self.environ)
+        chunked = 'chunked' in self.environ.get('HTTP_TRANSFER_ENCODING', '').lower()
+        if not (length or chunked):
+            return
+
+        try:
+            max_length = self.max_content_length
+            if max_length is not None and length is not None and length > max_length:
+                raise exceptions.RequestEntityTooLarge()
+            if not self.content_type:
+                return
+            if self.content_encoding and not self._content_decoded:
+                msg = 'Unsupported Content-Encoding "%s" in request.' % self.content_encoding
+                raise exceptions.UnsupportedMediaType(msg)
+            self.pipeline.select_parser(self.content_type)
+        except exceptions.APIException:
+            self.body_rejected = True
+            raise
+
     def _parse(self):
         """
         Parse the body of the request, using whichever parser satifies the
         client 'Content-Type' header.
         """
-        if not self.content_type or not self.content_length:
+        if not self.content_type or not (self.content_length or self.content_encoding):
             self._set_empty_data()
             return
 
-        negotiator = self.negotiator_class()
-        parsers = [parser_cls() for parser_cls in self.parser_classes]
+        if self.content_encoding and not self._content_decoded:
+            self._set_empty_data()
+            msg = 'Unsupported Content-Encoding "%s" in request.' % self.content_encoding
+            raise exceptions.UnsupportedMediaType(msg)
+
         options = self._get_parser_options()
         try:
-            parser, media_type = negotiator.select_parser(parsers)
+            parser, media_type = self.pipeline.select_parser(self.content_type)
+            if self._form_data is not None and isinstance(parser, URLEncodedParser):
+                # The form was already decoded by method overloading.
+                options['form_data'] = self._form_data
             ret = parser.parse(self.stream, media_type, **options)
         except:
             # Ensure that accessing `request.data` again does not reraise
@@ -80,6 +168,21 @@ class APIRequest(Request):
         self._form = self.empty_data_class()
         self._files = self.empty_data_class()
 
+    # Sparse fieldsets...
+
+    @property
+    def fields(self):
+        """
+        The fields selected by the 'fields' and 'exclude' query parameters,
+        if `SPARSE_FIELDSETS` is set.
+        """
+        if not hasattr(self, '_fields'):
+            if self.api_settings.SPARSE_FIELDSETS:
+                self._fields = get_fieldset(self.args.get('fields'), self.args.get('exclude'))
+            else:
+                self._fields = ALL_FIELDS
+        return self._fields
+
     # Content negotiation...
 
     @property
@@ -99,9 +202,44 @@ class APIRequest(Request):
         Determine which of the available renderers should be used for
         rendering the response content, based on the client 'Accept' header.
         """
-        negotiator = self.negotiator_class()
-        renderers = [renderer() for renderer in self.renderer_classes]
-        self._accepted_renderer, self._accepted_media_type = negotiator.select_renderer(renderers)
+        pipeline = self.pipeline
+        cache = self.negotiation_cache
+        if cache is None:
+            result = self._select_renderer(pipeline)
+        else:
+            key = (self.headers.get('Accept', '*/*'), pipeline)
+            result = cache.get(key)
+            if result is None:
+                result = self._select_renderer(pipeline)
+                cache.set(key, result)
+
+        renderer, media_type = result
+        if renderer is None:
+            # Fall back to the first renderer, so that the resulting
+            # 406 response can itself be rendered.
+            self._accepted_renderer = pipeline.renderers[0]
+            self._accepted_media_type = pipeline.renderer_media_types[0]
+            raise exceptions.NotAcceptable()
+
+        self._accepted_renderer = renderer
+        self._accepted_media_type = media_type
+
+    def _select_renderer(self, pipeline):
+        """
+        Returns a two-tuple of (renderer, media type), or `(None, None)`
+        if none of the renderers satisfy the client 'Accept' header.
+        """
+        try:
+            return pipeline.select_renderer()
+        except exceptions.NotAcceptable:
+            return (None, None)
+
+    @property
+    def pipeline(self):
+        """
+        The shared parsers and renderers for this request.
+        """
+        return get_pipeline(self.parser_classes, self.renderer_classes, self.negotiator_class)
 
     # Method and content type overloading.
 
@@ -123,6 +261,12 @@ class APIRequest(Request):
             self._perform_method_overloading()
         return self._content_length
 
+    @property
+    def content_encoding(self):
+        if not hasattr(self, '_content_encoding'):
+            self._perform_method_overloading()
+        return self._content_encoding
+
     @property
     def stream(self):
         if not hasattr(self, '_stream'):
@@ -138,17 +282,37 @@ class APIRequest(Request):
 
         Also provides support for browser non-form requests (eg JSON),
         by specifing '_content' and '_content_type' form fields.
+
+        Compressed request bodies are decompressed as they are read from
+        `stream`, in which case `content_length` is unknown, and `None`.
         """
         self._method = super(APIRequest, self).method
         self._stream = super(APIRequest, self).stream
         self._content_type = self.headers.get('Content-Type')
         self._content_length = get_content_length(self.environ)
-
-        if (self._method == 'POST' and self._content_type == 'application/x-www-form-urlencoded'):
-            # Read the request data, then push it back onto the stream again.
-            body = self.get_data()
-            data = url_decode_stream(io.BytesIO(body))
+        self._content_encoding = None
+        self._content_decoded = False
+
+        encoding = self.headers.get('Content-Encoding', '').strip().lower()
+        if encoding and encoding != 'identity':
+            self._content_encoding = encoding
+            settings = self.api_settings
+            compressor = settings.DECOMPRESSION_ENCODINGS.get(encoding)
+            if compressor is not None:
+                max_length = settings.MAX_DECOMPRESSED_CONTENT_LENGTH
+                self._stream = decompressing_stream(self._stream, compressor, max_length)
+                self._content_length = None
+                self._content_decoded = True
+
+        self._form_data = None
+        if self.is_overloadable() and self.method_overloading and self.api_settings.METHOD_OVERLOADING:
+            # Buffer and decode the form once, sharing the decoded data with
+            # the parser, and the buffered body with `get_buffered_body()`.
+            body = self._stream.read()
+            data = url_decode(body, cls=MultiDict)
             self._stream = io.BytesIO(body)
+            self._buffered_body = body
+            self._form_data = data
             if '_method' in data:
                 # Support browser forms with PUT, PATCH, DELETE & other methods.
                 self._method = data['_method']
@@ -156,9 +320,23 @@ class APIRequest(Request):
                 # Support browser forms with non-form data, such as JSON.
                 body = data['_content'].encode('utf8')
                 self._stream = io.BytesIO(body)
+                self._buffered_body = body
+                self._form_data = None
                 self._content_type = data['_content_type']
                 self._content_length = len(body)
 
+    def is_overloadable(self):
+        """
+        Return `True` if the request is a browser form, which may use method
+        and content type overloading.  Browser forms are never compressed,
+        and decoding the body before the request is dispatched would surface
+        any errors as 500s.
+        """
+        method = self.environ.get('REQUEST_METHOD', 'GET').upper()
+        encoding = self.headers.get('Content-Encoding', 'identity').strip().lower()
+        content_type = self.headers.get('Content-Type')
+        return method == 'POST' and content_type == 'application/x-www-form-urlencoded' and encoding == 'identity'
+
     # Misc...
 
     @property
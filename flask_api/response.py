@@ -1,18 +1,67 @@
 # coding: utf8
 from __future__ import unicode_literals
-from flask import request, Response
+from flask import has_request_context, request, stream_with_context, Response
 from flask._compat import text_type
+from flask_api.etags import match_etag, not_modified
+from flask_api.fields import ALL_FIELDS
+from flask_api.pagination import Page
+from flask_api.settings import current_settings
+from flask_api.streaming import StreamingList
+
+
+def get_matching_etag(etag):
+    """
+    Return the ETag matched by the request's 'If-None-Match' header,
+    or `None` if the response should be sent in full.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    settings = current_settings()
+    encodings = [compressor.encoding for compressor in settings.COMPRESSION_ENCODINGS] if settings.COMPRESSION else ()
+    return match_etag(request.headers.get('If-None-Match'), etag, encodings)
 
 
 class APIResponse(Response):
 
     api_return_types = (list, dict)
 
+    # A dictionary of precompressed bodies, keyed by content encoding.
+    # See `flask_api.compression.precompress()`.
+    precompressed = None
+
     def __init__(self, content=None, *args, **kwargs):
         super(APIResponse, self).__init__(None, *args, **kwargs)
 
         media_type = None
-        if isinstance(content, self.api_return_types) or content == '':
+        matched = None
+        if 'ETag' in self.headers and self.status_code == 200 and has_request_context():
+            matched = get_matching_etag(self.headers['ETag'])
+
+        if matched is not None:
+            # The view has provided an ETag up front, and the client already
+            # has this version of the content, so there is no need to render it.
+            media_type = request.accepted_media_type
+            content = None
+            not_modified(self, matched)
+        elif isinstance(content, StreamingList):
+            if isinstance(content, Page):
+                self.headers.extend(content.headers)
+            fieldset = self.get_fieldset()
+            if fieldset is not ALL_FIELDS:
+                content = fieldset.apply_stream(content)
+            renderer = request.accepted_renderer
+            media_type = request.accepted_media_type
+            options = self.get_renderer_options()
+            if renderer.handles_streaming:
+                content = stream_with_context(renderer.render(content, media_type, **options))
+            else:
+                content = renderer.render(list(content), media_type, **options)
+            if self.status_code == 204:
+                self.status_code = 200
+        elif isinstance(content, self.api_return_types) or content == '':
+            fieldset = self.get_fieldset()
+            if fieldset is not ALL_FIELDS and content != '':
+                content = fieldset.apply(content)
             renderer = request.accepted_renderer
             if content != '' or renderer.handles_empty_responses:
                 media_type = request.accepted_media_type
@@ -32,6 +81,15 @@ class APIResponse(Response):
         if media_type is not None:
             self.headers['Content-Type'] = str(media_type)
 
+    def get_fieldset(self):
+        """
+        Return the fields selected by the request, which are only applied
+        to successful responses.
+        """
+        if not (200 <= self.status_code < 300 and has_request_context()):
+            return ALL_FIELDS
+        return getattr(request, 'fields', ALL_FIELDS)
+
     def get_renderer_options(self):
         return {
             'status': self.status,
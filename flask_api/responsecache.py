@@ -0,0 +1,434 @@
+# coding: utf8
+"""
+Server side caching of rendered responses.
+
+Views are opted in with the `cache_response` decorator.  The rendered body
+is stored along with its status and headers, keyed on the request method,
+host, path and query string, and on the negotiated media type, so that
+each representation of a resource is cached separately.  Responses which
+vary on any other request headers are not cached, and neither are requests
+with credentials, unless the view opts in to caching them for each client.
+"""
+from __future__ import unicode_literals
+from collections import OrderedDict
+from flask_api import cbor
+from flask_api.compat import fcntl
+from flask_api.compression import precompress
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+
+
+# Headers that are recomputed, or should never be replayed to another client.
+UNCACHED_HEADERS = frozenset(['content-length', 'set-cookie'])
+
+# Request headers that responses may vary on, as the negotiated media type
+# is part of the cache key, and compression is applied as they are served.
+KEYED_HEADERS = frozenset(['accept', 'accept-encoding'])
+
+# Request headers that identify the client.
+CREDENTIAL_HEADERS = ('Authorization', 'Cookie')
+
+
+def has_credentials(request):
+    """
+    Return `True` if the request has any of the `CREDENTIAL_HEADERS`.
+    """
+    return any(request.headers.get(header) for header in CREDENTIAL_HEADERS)
+
+
+def get_cache_key(request, per_client=False):
+    """
+    Return the cache key for a request, as bytes.  If `per_client` is set,
+    the key is also scoped to the client's credentials.
+    """
+    method = 'GET' if request.method == 'HEAD' else request.method
+    key = '%s %s%s?%s %s' % (
+        method,
+        request.host,
+        request.path,
+        request.query_string.decode('latin-1'),
+        request.accepted_media_type
+    )
+    if per_client:
+        credentials = hashlib.sha256()
+        for header in CREDENTIAL_HEADERS:
+            credentials.update(request.headers.get(header, '').encode('utf8') + b'\n')
+        key += ' ' + credentials.hexdigest()
+    return key.encode('utf8')
+
+
+def is_cacheable(response, per_client=False):
+    """
+    Return `True` if the response may be stored and replayed, to other
+    clients, or only to the same client if `per_client` is set.
+    """
+    if response.status_code != 200 or response.is_streamed or response.direct_passthrough:
+        return False
+    if 'Set-Cookie' in response.headers:
+        return False
+    keyed_headers = KEYED_HEADERS
+    if per_client:
+        keyed_headers = keyed_headers.union(header.lower() for header in CREDENTIAL_HEADERS)
+    if any(header.lower() not in keyed_headers for header in response.vary):
+        return False
+    cache_control = response.cache_control
+    return not (cache_control.no_store or cache_control.private)
+
+
+def precompress_response(response, settings):
+    """
+    Compress the body of a response that is to be stored with each of the
+    `COMPRESSION_ENCODINGS`, if compression applies to it, so that it is not
+    compressed again each time it is served.
+    """
+    if not settings.COMPRESSION or response.mimetype not in settings.COMPRESSION_MEDIA_TYPES:
+        return
+    body = response.get_data()
+    if len(body) >= settings.COMPRESSION_MIN_SIZE:
+        response.precompressed = precompress(body, settings.COMPRESSION_ENCODINGS)
+
+
+def dump_response(response, excluded_headers=UNCACHED_HEADERS):
+    """
+    Serialize a response to bytes, along with any precompressed bodies.
+    Headers named in `excluded_headers`, in lower case, are not included.
+    """
+    headers = [
+        [key, value] for key, value in response.headers.items()
+        if key.lower() not in excluded_headers
+    ]
+    precompressed = getattr(response, 'precompressed', None) or {}
+    return cbor.dumps([response.status_code, headers, response.get_data(), precompressed])
+
+
+def load_response(data, response_class):
+    """
+    Deserialize a response that was serialized by `dump_response()`.
+    """
+    status, headers, body, precompressed = cbor.loads(data)
+    response = response_class(body, status=status, headers=[tuple(header) for header in headers])
+    if precompressed:
+        response.precompressed = precompressed
+    return response
+
+
+class BaseResponseCache(object):
+    """
+    Response caches store bytes values against bytes keys, for a limited
+    time, and within a limited number of bytes, evicting the least recently
+    used entries when full.
+    """
+
+    def get(self, key):
+        msg = '`get()` method must be implemented for class "%s"'
+        raise NotImplementedError(msg % self.__class__.__name__)
+
+    def set(self, key, value, timeout):
+        """
+        Set the value, returning `True` if it could be stored.
+        """
+        msg = '`set()` method must be implemented for class "%s"'
+        raise NotImplementedError(msg % self.__class__.__name__)
+
+    def add(self, key, value, timeout):
+        """
+        Set the value only if the key is not already present, atomically,
+        returning `True` if the value was set.
+        """
+        msg = '`add()` method must be implemented for class "%s"'
+        raise NotImplementedError(msg % self.__class__.__name__)
+
+    def delete(self, key):
+        msg = '`delete()` method must be implemented for class "%s"'
+        raise NotImplementedError(msg % self.__class__.__name__)
+
+    def clear(self):
+        msg = '`clear()` method must be implemented for class "%s"'
+        raise NotImplementedError(msg % self.__class__.__name__)
+
+    @property
+    def stats(self):
+        msg = '`stats` property must be implemented for class "%s"'
+        raise NotImplementedError(msg % self.__class__.__name__)
+
+
+class MemoryCache(BaseResponseCache):
+    """
+    A cache held in the memory of the current process.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                expires, value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            if expires <= time.time():
+                self.bytes -= len(key) + len(value)
+                self.misses += 1
+                return None
+            # Re-insert the entry, marking it as the most recently used.
+            self._data[key] = (expires, value)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            return self._set(key, value, timeout)
+
+    def add(self, key, value, timeout):
+        with self._lock:
+            existing = self._data.get(key)
+            if existing is not None and existing[0] > time.time():
+                return False
+            return self._set(key, value, timeout)
+
+    def delete(self, key):
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(key) + len(previous[1])
+
+    def _set(self, key, value, timeout):
+        size = len(key) + len(value)
+        if size > self.max_bytes:
+            return False
+        previous = self._data.pop(key, None)
+        if previous is not None:
+            self.bytes -= len(key) + len(previous[1])
+        self._data[key] = (time.time() + timeout, value)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            evicted_key, (expires, evicted) = self._data.popitem(last=False)
+            self.bytes -= len(evicted_key) + len(evicted)
+            self.evictions += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = self.hits = self.misses = self.evictions = 0
+
+    @property
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._data),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes
+        }
+
+
+class MMapCache(BaseResponseCache):
+    """
+    A cache held in a memory mapped file, which is shared by every process
+    that opens the same `path`, such as each of the workers on a server.
+    Placing the file on a memory backed filesystem, such as `/dev/shm`,
+    avoids any disk writes.
+
+    The file is divided into `max_bytes // slot_size` slots, which are
+    grouped into sets of `ways` slots.  Each key may only be stored in the
+    slots of the set that it hashes to, with the least recently used entry
+    in the set being evicted when it is full.  Values larger than a slot
+    are not cached.
+
+    Processes are synchronized using `fcntl` record locks on each set, so
+    this backend is only available on Unix.
+    """
+    magic = b'FAPICACH'
+    header = struct.Struct('<8sIII3Q')
+    slot_header = struct.Struct('<16sddI')
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, slot_size=64 * 1024, ways=4):
+        if fcntl is None:
+            raise RuntimeError('MMapCache requires the fcntl module, which is not available on this platform.')
+        self.path = path
+        self.slot_size = slot_size
+        self.ways = ways
+        self.num_sets = max(max_bytes // (slot_size * ways), 1)
+        self.max_bytes = self.num_sets * ways * slot_size
+        self.max_value_size = slot_size - self.slot_header.size
+        self._lock = threading.Lock()
+
+        size = self.header.size + self.max_bytes
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked(0, self.header.size):
+            if os.fstat(self._fd).st_size != size:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+            self._mmap = mmap.mmap(self._fd, size)
+            expected = (self.magic, 1, self.slot_size, self.ways)
+            if self.header.unpack_from(self._mmap, 0)[:4] != expected:
+                # A new file, or one created with a different layout.
+                self._mmap[:] = b'\x00' * size
+                self.header.pack_into(self._mmap, 0, self.magic, 1, self.slot_size, self.ways, 0, 0, 0)
+
+    def _locked(self, start, length):
+        return _FileLock(self._fd, self._lock, start, length)
+
+    def _digest(self, key):
+        return hashlib.blake2b(key, digest_size=16).digest()
+
+    def _set_offset(self, digest):
+        set_index = struct.unpack('<Q', digest[:8])[0] % self.num_sets
+        return self.header.size + set_index * self.ways * self.slot_size
+
+    def _count(self, hits=0, misses=0, evictions=0):
+        with self._locked(0, self.header.size):
+            fields = list(self.header.unpack_from(self._mmap, 0))
+            fields[4] += hits
+            fields[5] += misses
+            fields[6] += evictions
+            self.header.pack_into(self._mmap, 0, *fields)
+
+    def get(self, key):
+        digest = self._digest(key)
+        offset = self._set_offset(digest)
+        now = time.time()
+        value = None
+        with self._locked(offset, self.ways * self.slot_size):
+            for slot in range(offset, offset + self.ways * self.slot_size, self.slot_size):
+                slot_digest, expires, last_used, length = self.slot_header.unpack_from(self._mmap, slot)
+                if slot_digest != digest or not length:
+                    continue
+                if expires <= now:
+                    self.slot_header.pack_into(self._mmap, slot, b'\x00' * 16, 0, 0, 0)
+                    continue
+                self.slot_header.pack_into(self._mmap, slot, digest, expires, now, length)
+                start = slot + self.slot_header.size
+                value = self._mmap[start:start + length]
+                break
+
+        if value is None:
+            self._count(misses=1)
+        else:
+            self._count(hits=1)
+        return value
+
+    def set(self, key, value, timeout):
+        return self._store(key, value, timeout, replace=True)
+
+    def add(self, key, value, timeout):
+        return self._store(key, value, timeout, replace=False)
+
+    def delete(self, key):
+        digest = self._digest(key)
+        offset = self._set_offset(digest)
+        with self._locked(offset, self.ways * self.slot_size):
+            for slot in range(offset, offset + self.ways * self.slot_size, self.slot_size):
+                if self.slot_header.unpack_from(self._mmap, slot)[0] == digest:
+                    self.slot_header.pack_into(self._mmap, slot, b'\x00' * 16, 0, 0, 0)
+
+    def _store(self, key, value, timeout, replace):
+        if len(value) > self.max_value_size:
+            return False
+        digest = self._digest(key)
+        offset = self._set_offset(digest)
+        now = time.time()
+        evicted = False
+        with self._locked(offset, self.ways * self.slot_size):
+            # Look for the key in every slot of the set before choosing a
+            # free slot, so that a key is never held in two slots at once.
+            target = None
+            free = None
+            least_recently_used = None
+            for slot in range(offset, offset + self.ways * self.slot_size, self.slot_size):
+                slot_digest, expires, last_used, length = self.slot_header.unpack_from(self._mmap, slot)
+                live = length and expires > now
+                if slot_digest == digest and live:
+                    if not replace:
+                        return False
+                    target = slot
+                    break
+                if not live:
+                    # Prefer reusing an expired slot that holds the same key.
+                    if free is None or slot_digest == digest:
+                        free = slot
+                elif least_recently_used is None or last_used < least_recently_used[1]:
+                    least_recently_used = (slot, last_used)
+
+            if target is None:
+                target = free
+            if target is None:
+                target = least_recently_used[0]
+                evicted = True
+
+            start = target + self.slot_header.size
+            self._mmap[start:start + len(value)] = value
+            self.slot_header.pack_into(self._mmap, target, digest, now + timeout, now, len(value))
+
+        if evicted:
+            self._count(evictions=1)
+        return True
+
+    def clear(self):
+        with self._locked(0, self.header.size + self.max_bytes):
+            self._mmap[self.header.size:] = b'\x00' * self.max_bytes
+            self.header.pack_into(self._mmap, 0, self.magic, 1, self.slot_size, self.ways, 0, 0, 0)
+
+    @property
+    def stats(self):
+        size = num_bytes = 0
+        now = time.time()
+        with self._locked(0, self.header.size + self.max_bytes):
+            hits, misses, evictions = self.header.unpack_from(self._mmap, 0)[4:]
+            for slot in range(self.header.size, self.header.size + self.max_bytes, self.slot_size):
+                slot_digest, expires, last_used, length = self.slot_header.unpack_from(self._mmap, slot)
+                if length and expires > now:
+                    size += 1
+                    num_bytes += length
+        return {
+            'hits': hits,
+            'misses': misses,
+            'evictions': evictions,
+            'size': size,
+            'bytes': num_bytes,
+            'max_bytes': self.max_bytes
+        }
+
+    def close(self):
+        self._mmap.close()
+        os.close(self._fd)
+
+
+class _FileLock(object):
+    """
+    Holds a thread lock, and an `fcntl` record lock on a region of a file,
+    as record locks do not exclude other threads in the same process.
+    """
+
+    def __init__(self, fd, thread_lock, start, length):
+        self.fd = fd
+        self.thread_lock = thread_lock
+        self.start = start
+        self.length = length
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, self.length, self.start)
+        except BaseException:
+            self.thread_lock.release()
+            raise
+
+    def __exit__(self, *exc_info):
+        try:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, self.length, self.start)
+        finally:
+            self.thread_lock.release()
@@ -0,0 +1,244 @@
+# coding: utf8
+"""
+Validation of request data against a declared schema.
+
+Schemas are written with plain Python values:
+
+* `int`, `float`, `str` and `bool` for scalars, with strings coerced to
+  numbers and booleans, so that the same schema works for form data.
+* `object` for any value, which is passed through unchanged.
+* A dictionary of field names to schemas, for objects.  Unknown fields are
+  dropped, and missing fields are errors unless they are `Optional`.
+* A list of a single schema, for lists of items.
+* `Optional(schema, default=None)`, for fields that may be missing or null.
+
+Each schema is compiled once into the source of a Python function which
+validates and coerces the data in a single pass, with the checks for each
+field inlined, rather than walking the schema for every request.
+"""
+from __future__ import unicode_literals
+from flask._compat import integer_types, string_types, text_type
+from flask_api import exceptions
+import math
+try:
+    from collections.abc import Mapping, Sequence
+except ImportError:
+    from collections import Mapping, Sequence
+
+
+class Optional(object):
+    """
+    Marks a field that may be missing or null, which is set to `default`.
+    The default value is not copied, so should not be modified.
+    """
+
+    def __init__(self, schema, default=None):
+        self.schema = schema
+        self.default = default
+
+    def __repr__(self):
+        return 'Optional(%r, default=%r)' % (self.schema, self.default)
+
+
+INVALID = object()
+MISSING = object()
+BOOLEANS = {'true': True, 'false': False, '1': True, '0': False}
+
+
+def to_int(value):
+    if isinstance(value, bool):
+        return INVALID
+    if isinstance(value, integer_types):
+        return int(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, string_types):
+        try:
+            return int(value.strip())
+        except ValueError:
+            pass
+    return INVALID
+
+
+def to_float(value):
+    if isinstance(value, bool):
+        return INVALID
+    if isinstance(value, integer_types + (float,)):
+        value = float(value)
+    elif isinstance(value, string_types):
+        try:
+            value = float(value.strip())
+        except ValueError:
+            return INVALID
+    else:
+        return INVALID
+    if math.isinf(value) or math.isnan(value):
+        return INVALID
+    return value
+
+
+def to_text(value):
+    if isinstance(value, text_type):
+        return text_type(value)
+    return INVALID
+
+
+def to_bool(value):
+    if isinstance(value, string_types):
+        return BOOLEANS.get(value.strip().lower(), INVALID)
+    return INVALID
+
+
+def is_list(value):
+    return isinstance(value, Sequence) and not isinstance(value, string_types + (bytes, bytearray))
+
+
+# The type for the fast path, the coercion for anything else, and the error.
+SCALARS = {
+    int: ('_int', '_to_int', 'Must be an integer.'),
+    float: ('_float', '_to_float', 'Must be a number.'),
+    text_type: ('_text', '_to_text', 'Must be a string.'),
+    bool: ('_bool', '_to_bool', 'Must be a boolean.'),
+}
+
+NAMESPACE = {
+    '_int': int, '_float': float, '_text': text_type, '_bool': bool,
+    '_to_int': to_int, '_to_float': to_float, '_to_text': to_text, '_to_bool': to_bool,
+    '_dict': dict, '_list': list, '_Mapping': Mapping, '_is_list': is_list,
+    '_INVALID': INVALID, '_MISSING': MISSING,
+}
+
+
+class SchemaCompiler(object):
+    """
+    Generates the source of a `validate(data, errors)` function for a schema,
+    which returns the coerced data, and adds an error message to `errors`
+    for the path of each invalid field.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.namespace = dict(NAMESPACE)
+        self.count = 0
+
+    def compile(self, schema):
+        self.lines.append('def validate(data, errors):')
+        self.node(schema, 'data', 'result', ('', ()), 1)
+        self.emit(1, 'return result')
+        return '\n'.join(self.lines) + '\n'
+
+    def name(self, prefix):
+        self.count += 1
+        return '%s%d' % (prefix, self.count)
+
+    def constant(self, value):
+        name = self.name('_const')
+        self.namespace[name] = value
+        return name
+
+    def emit(self, depth, line):
+        self.lines.append('    ' * depth + line)
+
+    def error(self, depth, path, message):
+        # Paths are only formatted with the list indexes if there is an error.
+        fmt, args = path
+        if args:
+            key = '%r %% (%s,)' % (fmt, ', '.join(args))
+        else:
+            key = repr(fmt)
+        self.emit(depth, 'errors[%s] = %r' % (key, message))
+
+    def child_path(self, path, key=None, index=None):
+        fmt, args = path
+        if index is not None:
+            part, args = '%d', args + (index,)
+        else:
+            part = key.replace('%', '%%')
+        return (fmt + '.' + part if fmt else part), args
+
+    def node(self, schema, src, dst, path, depth):
+        if isinstance(schema, Optional):
+            self.emit(depth, 'if %s is None:' % src)
+            self.emit(depth + 1, '%s = %s' % (dst, self.constant(schema.default)))
+            self.emit(depth, 'else:')
+            self.node(schema.schema, src, dst, path, depth + 1)
+        elif schema is object:
+            self.emit(depth, '%s = %s' % (dst, src))
+        elif isinstance(schema, type) and schema in SCALARS:
+            type_name, coerce, message = SCALARS[schema]
+            self.emit(depth, 'if type(%s) is %s:' % (src, type_name))
+            self.emit(depth + 1, '%s = %s' % (dst, src))
+            self.emit(depth, 'else:')
+            self.emit(depth + 1, '%s = %s(%s)' % (dst, coerce, src))
+            self.emit(depth + 1, 'if %s is _INVALID:' % dst)
+            self.error(depth + 2, path, message)
+        elif isinstance(schema, dict):
+            self.emit(depth, 'if type(%s) is _dict or isinstance(%s, _Mapping):' % (src, src))
+            self.emit(depth + 1, '%s = {}' % dst)
+            for key, child in schema.items():
+                if not isinstance(key, string_types):
+                    raise TypeError('Schema field names must be strings, not %r.' % (key,))
+                value, out = self.name('value'), self.name('out')
+                child_path = self.child_path(path, key=key)
+                self.emit(depth + 1, '%s = %s.get(%r, _MISSING)' % (value, src, key))
+                self.emit(depth + 1, 'if %s is _MISSING:' % value)
+                if isinstance(child, Optional):
+                    self.emit(depth + 2, '%s[%r] = %s' % (dst, key, self.constant(child.default)))
+                else:
+                    self.error(depth + 2, child_path, 'This field is required.')
+                self.emit(depth + 1, 'else:')
+                self.node(child, value, out, child_path, depth + 2)
+                self.emit(depth + 2, '%s[%r] = %s' % (dst, key, out))
+            self.emit(depth, 'else:')
+            self.error(depth + 1, path, 'Must be an object.')
+            self.emit(depth + 1, '%s = None' % dst)
+        elif isinstance(schema, list) and len(schema) == 1:
+            index, item, out = self.name('index'), self.name('item'), self.name('out')
+            self.emit(depth, 'if type(%s) is _list or _is_list(%s):' % (src, src))
+            self.emit(depth + 1, '%s = []' % dst)
+            self.emit(depth + 1, 'for %s, %s in enumerate(%s):' % (index, item, src))
+            self.node(schema[0], item, out, self.child_path(path, index=index), depth + 2)
+            self.emit(depth + 2, '%s.append(%s)' % (dst, out))
+            self.emit(depth, 'else:')
+            self.error(depth + 1, path, 'Must be a list.')
+            self.emit(depth + 1, '%s = None' % dst)
+        else:
+            raise TypeError('Unsupported schema %r.' % (schema,))
+
+
+class Schema(object):
+    """
+    A schema for request data, compiled into a validation function when it
+    is created.
+    """
+
+    def __init__(self, schema):
+        compiler = SchemaCompiler()
+        self.schema = schema
+        self.source = compiler.compile(schema)
+        namespace = compiler.namespace
+        exec(compile(self.source, '<schema>', 'exec'), namespace)
+        self._validate = namespace['validate']
+
+    def validate(self, data):
+        """
+        Return `data`, coerced to the schema, or raise a `ParseError` with the
+        path and message of every invalid field in its `errors`.
+        """
+        errors = {}
+        result = self._validate(data, errors)
+        if errors:
+            raise exceptions.ParseError('Invalid request data.', errors=errors)
+        return result
+
+    def __repr__(self):
+        return '<Schema %r>' % (self.schema,)
+
+
+def get_schema(schema):
+    """
+    Return a compiled `Schema`, given a schema or an already compiled one.
+    """
+    if isinstance(schema, Schema):
+        return schema
+    return Schema(schema)
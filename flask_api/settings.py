@@ -1,4 +1,8 @@
+from flask import current_app, has_app_context
 from flask._compat import string_types
+from flask_api.compression import get_compressors, get_decompressors
+from flask_api.etags import select_hasher
+from flask_api.jsonbackends import select_json_backend
 import importlib
 
 
@@ -30,28 +34,360 @@ def import_from_string(val, setting_name):
         raise ImportError(msg)
 
 
+DEFAULTS = {
+    'DEFAULT_PARSERS': [
+        'flask_api.parsers.JSONParser',
+        'flask_api.parsers.URLEncodedParser',
+        'flask_api.parsers.MultiPartParser',
+        'flask_api.parsers.NDJSONParser',
+        'flask_api.parsers.CBORParser'
+    ],
+    'DEFAULT_RENDERERS': [
+        'flask_api.renderers.JSONRenderer',
+        'flask_api.renderers.BrowsableAPIRenderer',
+        'flask_api.renderers.NDJSONRenderer',
+        'flask_api.renderers.CBORRenderer'
+    ],
+    # The number of (Accept header, renderers) negotiation results
+    # to keep.  Set to `0` to disable the negotiation cache.
+    'NEGOTIATION_CACHE_SIZE': 128,
+    # A backend name, or list of names in order of preference, out of
+    # 'json', 'simplejson', 'ujson' and 'orjson'.
+    'JSON_BACKEND': 'json',
+    # The number of items rendered into each chunk of a streamed list.
+    'STREAMING_CHUNK_SIZE': 100,
+    # The longest line, in bytes, that is accepted in an NDJSON request.
+    'NDJSON_MAX_LINE_LENGTH': 1024 * 1024,
+    # Compression of responses, negotiated using the 'Accept-Encoding' header.
+    'COMPRESSION': False,
+    'COMPRESSION_ENCODINGS': ['br', 'zstd', 'gzip', 'deflate'],
+    'COMPRESSION_LEVEL': None,
+    'COMPRESSION_MIN_SIZE': 500,
+    'COMPRESSION_MEDIA_TYPES': [
+        'application/json',
+        'application/x-ndjson',
+        'text/html',
+        'text/plain',
+        'text/css',
+        'application/javascript',
+    ],
+    # Request bodies with any of these 'Content-Encoding's are decompressed
+    # as they are read.  Others are rejected as unsupported.
+    'DECOMPRESSION_ENCODINGS': ['gzip', 'deflate', 'br', 'zstd'],
+    # The largest size that a compressed request body may decompress to.
+    # Set to `None` to disable the limit.
+    'MAX_DECOMPRESSED_CONTENT_LENGTH': 16 * 1024 * 1024,
+    # Generate ETags for GET responses by hashing the rendered content.
+    'ETAGS': False,
+    # A hasher name, or list of names in order of preference, out of
+    # 'xxhash', 'blake2b', 'md5' and 'sha1', or a function.
+    'ETAG_HASH': ['xxhash', 'blake2b'],
+    # The backend used by the `cache_response` decorator, as an import
+    # string or class, which is instantiated with `RESPONSE_CACHE_OPTIONS`.
+    'RESPONSE_CACHE_BACKEND': 'flask_api.responsecache.MemoryCache',
+    'RESPONSE_CACHE_OPTIONS': {},
+    # The default number of seconds to cache responses for.
+    'RESPONSE_CACHE_TIMEOUT': 60,
+    # The number of threads used to refresh precomputed responses, the
+    # default number of seconds between refreshes, and the number of
+    # responses that are held.
+    'PRECOMPUTE_WORKERS': 4,
+    'PRECOMPUTE_INTERVAL': 10,
+    'PRECOMPUTE_MAX_ENTRIES': 1000,
+    # Share a single execution of the view between identical concurrent
+    # GET and HEAD requests, waiting up to `COALESCE_TIMEOUT` seconds.
+    'COALESCE_REQUESTS': False,
+    'COALESCE_TIMEOUT': 30,
+    # Store and replay the responses to unsafe requests with an
+    # 'Idempotency-Key' header.  The backend is one of the response cache
+    # backends, instantiated with `IDEMPOTENCY_OPTIONS`.
+    'IDEMPOTENCY_KEYS': False,
+    'IDEMPOTENCY_BACKEND': 'flask_api.responsecache.MemoryCache',
+    'IDEMPOTENCY_OPTIONS': {},
+    'IDEMPOTENCY_TIMEOUT': 24 * 60 * 60,
+    'IDEMPOTENCY_LOCK_TIMEOUT': 60,
+    # Enable the batch endpoint, at '/flask-api/batch/'.  Sub-requests are
+    # run in a pool of `BATCH_WORKERS` threads that is shared by every
+    # batch, with up to `BATCH_CONCURRENCY` at a time from each batch.
+    'BATCH_REQUESTS': False,
+    'BATCH_WORKERS': 8,
+    'BATCH_CONCURRENCY': 4,
+    'BATCH_MAX_SIZE': 50,
+    # The number of seconds each sub-request may take.
+    'BATCH_TIMEOUT': 30,
+    # The default and largest number of items on each page of `paginate()`.
+    'PAGINATION_PAGE_SIZE': 20,
+    'PAGINATION_MAX_PAGE_SIZE': 100,
+    # Prune response data to the fields selected by the 'fields' and
+    # 'exclude' query parameters.
+    'SPARSE_FIELDSETS': False,
+    # Support the '_method', '_content' and '_content_type' fields of
+    # browser forms.  Disable for APIs that are never used from browsers.
+    'METHOD_OVERLOADING': True,
+    # Uploaded files are held in memory up to `UPLOAD_SPOOL_SIZE` bytes, and
+    # then written to a temporary file in `UPLOAD_TEMP_DIR`, or the system's
+    # default temporary directory.
+    'UPLOAD_SPOOL_SIZE': 500 * 1024,
+    'UPLOAD_TEMP_DIR': None,
+    # The largest size of each uploaded file, or `None` for no limit.  The
+    # size of the whole request is limited by Flask's `MAX_CONTENT_LENGTH`.
+    'UPLOAD_MAX_FILE_SIZE': None,
+    # Checksums computed for each uploaded file as it is received, out of
+    # 'crc32' and the names of `hashlib` algorithms, such as 'sha256'.
+    'UPLOAD_CHECKSUMS': [],
+    # Reject requests with an unsupported content type, or which are too
+    # large, using their headers, before the view is run or the body read.
+    'EARLY_BODY_CHECKS': False,
+}
+
+# Settings that are given as import strings, or lists of import strings.
+IMPORT_STRINGS = ('DEFAULT_PARSERS', 'DEFAULT_RENDERERS')
+
+
 class APISettings(object):
+    """
+    Settings are read from `user_config`, falling back to `DEFAULTS`.
+
+    Import string settings are imported the first time they are read, and
+    cached as tuples.  The cache is refreshed when a setting is replaced
+    in `user_config`; call `invalidate()` after modifying a setting in place.
+    Once `freeze()` has been called the cached values are always used.
+    """
+
     def __init__(self, user_config=None):
         self.user_config = user_config or {}
+        self.frozen = False
+        self._cache = {}
+
+    def freeze(self):
+        """
+        Import every import string setting up front, so that bad import
+        paths fail at startup, and stop checking `user_config` for changes.
+        """
+        for setting_name in IMPORT_STRINGS:
+            self._get_imported(setting_name)
+        self.JSON_BACKEND
+        self.COMPRESSION_ENCODINGS
+        self.COMPRESSION_MEDIA_TYPES
+        self.DECOMPRESSION_ENCODINGS
+        self.ETAG_HASH
+        self.RESPONSE_CACHE_BACKEND
+        self.IDEMPOTENCY_BACKEND
+        self.frozen = True
+
+    def invalidate(self):
+        """
+        Discard any cached settings, and undo `freeze()`.
+        """
+        self._cache.clear()
+        self.frozen = False
+
+    def _get_resolved(self, setting_name, resolve):
+        """
+        Return `resolve(value)` for the given setting, caching the result
+        until the setting is replaced.
+        """
+        cached = self._cache.get(setting_name)
+        if cached is not None and self.frozen:
+            return cached[1]
+
+        val = self.user_config.get(setting_name, DEFAULTS[setting_name])
+        if cached is not None and cached[0] is val:
+            return cached[1]
+
+        resolved = resolve(val)
+        self._cache[setting_name] = (val, resolved)
+        return resolved
+
+    def _get_imported(self, setting_name):
+        def resolve(val):
+            imported = perform_imports(val, setting_name)
+            if not isinstance(imported, (list, tuple)):
+                imported = [imported]
+            return tuple(imported)
+        return self._get_resolved(setting_name, resolve)
 
     @property
     def DEFAULT_PARSERS(self):
-        default = [
-            'flask_api.parsers.JSONParser',
-            'flask_api.parsers.URLEncodedParser',
-            'flask_api.parsers.MultiPartParser'
-        ]
-        val = self.user_config.get('DEFAULT_PARSERS', default)
-        return perform_imports(val, 'DEFAULT_PARSERS')
+        return self._get_imported('DEFAULT_PARSERS')
 
     @property
     def DEFAULT_RENDERERS(self):
-        default = [
-            'flask_api.renderers.JSONRenderer',
-            'flask_api.renderers.BrowsableAPIRenderer'
-        ]
-        val = self.user_config.get('DEFAULT_RENDERERS', default)
-        return perform_imports(val, 'DEFAULT_RENDERERS')
+        return self._get_imported('DEFAULT_RENDERERS')
+
+    @property
+    def NEGOTIATION_CACHE_SIZE(self):
+        return self.user_config.get('NEGOTIATION_CACHE_SIZE', DEFAULTS['NEGOTIATION_CACHE_SIZE'])
+
+    @property
+    def STREAMING_CHUNK_SIZE(self):
+        return self.user_config.get('STREAMING_CHUNK_SIZE', DEFAULTS['STREAMING_CHUNK_SIZE'])
+
+    @property
+    def JSON_BACKEND(self):
+        return self._get_resolved('JSON_BACKEND', select_json_backend)
+
+    @property
+    def NDJSON_MAX_LINE_LENGTH(self):
+        return self.user_config.get('NDJSON_MAX_LINE_LENGTH', DEFAULTS['NDJSON_MAX_LINE_LENGTH'])
+
+    @property
+    def COMPRESSION(self):
+        return self.user_config.get('COMPRESSION', DEFAULTS['COMPRESSION'])
+
+    @property
+    def COMPRESSION_ENCODINGS(self):
+        # Resolves to compressor instances.  Note that changing only
+        # `COMPRESSION_LEVEL` requires a call to `invalidate()`.
+        level = self.COMPRESSION_LEVEL
+        return self._get_resolved('COMPRESSION_ENCODINGS', lambda val: get_compressors(val, level))
+
+    @property
+    def COMPRESSION_LEVEL(self):
+        return self.user_config.get('COMPRESSION_LEVEL', DEFAULTS['COMPRESSION_LEVEL'])
+
+    @property
+    def COMPRESSION_MIN_SIZE(self):
+        return self.user_config.get('COMPRESSION_MIN_SIZE', DEFAULTS['COMPRESSION_MIN_SIZE'])
+
+    @property
+    def COMPRESSION_MEDIA_TYPES(self):
+        return self._get_resolved('COMPRESSION_MEDIA_TYPES', frozenset)
+
+    @property
+    def DECOMPRESSION_ENCODINGS(self):
+        # Resolves to a dictionary of compressor instances, keyed by encoding.
+        return self._get_resolved('DECOMPRESSION_ENCODINGS', get_decompressors)
+
+    @property
+    def MAX_DECOMPRESSED_CONTENT_LENGTH(self):
+        return self.user_config.get('MAX_DECOMPRESSED_CONTENT_LENGTH', DEFAULTS['MAX_DECOMPRESSED_CONTENT_LENGTH'])
+
+    @property
+    def ETAGS(self):
+        return self.user_config.get('ETAGS', DEFAULTS['ETAGS'])
+
+    @property
+    def ETAG_HASH(self):
+        return self._get_resolved('ETAG_HASH', select_hasher)
+
+    @property
+    def RESPONSE_CACHE_BACKEND(self):
+        return self._get_resolved('RESPONSE_CACHE_BACKEND', lambda val: perform_imports(val, 'RESPONSE_CACHE_BACKEND'))
+
+    @property
+    def RESPONSE_CACHE_OPTIONS(self):
+        return self.user_config.get('RESPONSE_CACHE_OPTIONS', DEFAULTS['RESPONSE_CACHE_OPTIONS'])
+
+    @property
+    def RESPONSE_CACHE_TIMEOUT(self):
+        return self.user_config.get('RESPONSE_CACHE_TIMEOUT', DEFAULTS['RESPONSE_CACHE_TIMEOUT'])
+
+    @property
+    def PRECOMPUTE_WORKERS(self):
+        return self.user_config.get('PRECOMPUTE_WORKERS', DEFAULTS['PRECOMPUTE_WORKERS'])
+
+    @property
+    def PRECOMPUTE_INTERVAL(self):
+        return self.user_config.get('PRECOMPUTE_INTERVAL', DEFAULTS['PRECOMPUTE_INTERVAL'])
+
+    @property
+    def PRECOMPUTE_MAX_ENTRIES(self):
+        return self.user_config.get('PRECOMPUTE_MAX_ENTRIES', DEFAULTS['PRECOMPUTE_MAX_ENTRIES'])
+
+    @property
+    def COALESCE_REQUESTS(self):
+        return self.user_config.get('COALESCE_REQUESTS', DEFAULTS['COALESCE_REQUESTS'])
+
+    @property
+    def COALESCE_TIMEOUT(self):
+        return self.user_config.get('COALESCE_TIMEOUT', DEFAULTS['COALESCE_TIMEOUT'])
+
+    @property
+    def IDEMPOTENCY_KEYS(self):
+        return self.user_config.get('IDEMPOTENCY_KEYS', DEFAULTS['IDEMPOTENCY_KEYS'])
+
+    @property
+    def IDEMPOTENCY_BACKEND(self):
+        return self._get_resolved('IDEMPOTENCY_BACKEND', lambda val: perform_imports(val, 'IDEMPOTENCY_BACKEND'))
+
+    @property
+    def IDEMPOTENCY_OPTIONS(self):
+        return self.user_config.get('IDEMPOTENCY_OPTIONS', DEFAULTS['IDEMPOTENCY_OPTIONS'])
+
+    @property
+    def IDEMPOTENCY_TIMEOUT(self):
+        return self.user_config.get('IDEMPOTENCY_TIMEOUT', DEFAULTS['IDEMPOTENCY_TIMEOUT'])
+
+    @property
+    def IDEMPOTENCY_LOCK_TIMEOUT(self):
+        return self.user_config.get('IDEMPOTENCY_LOCK_TIMEOUT', DEFAULTS['IDEMPOTENCY_LOCK_TIMEOUT'])
+
+    @property
+    def BATCH_REQUESTS(self):
+        return self.user_config.get('BATCH_REQUESTS', DEFAULTS['BATCH_REQUESTS'])
+
+    @property
+    def BATCH_WORKERS(self):
+        return self.user_config.get('BATCH_WORKERS', DEFAULTS['BATCH_WORKERS'])
+
+    @property
+    def BATCH_CONCURRENCY(self):
+        return self.user_config.get('BATCH_CONCURRENCY', DEFAULTS['BATCH_CONCURRENCY'])
+
+    @property
+    def BATCH_MAX_SIZE(self):
+        return self.user_config.get('BATCH_MAX_SIZE', DEFAULTS['BATCH_MAX_SIZE'])
+
+    @property
+    def BATCH_TIMEOUT(self):
+        return self.user_config.get('BATCH_TIMEOUT', DEFAULTS['BATCH_TIMEOUT'])
+
+    @property
+    def PAGINATION_PAGE_SIZE(self):
+        return self.user_config.get('PAGINATION_PAGE_SIZE', DEFAULTS['PAGINATION_PAGE_SIZE'])
+
+    @property
+    def PAGINATION_MAX_PAGE_SIZE(self):
+        return self.user_config.get('PAGINATION_MAX_PAGE_SIZE', DEFAULTS['PAGINATION_MAX_PAGE_SIZE'])
+
+    @property
+    def SPARSE_FIELDSETS(self):
+        return self.user_config.get('SPARSE_FIELDSETS', DEFAULTS['SPARSE_FIELDSETS'])
+
+    @property
+    def METHOD_OVERLOADING(self):
+        return self.user_config.get('METHOD_OVERLOADING', DEFAULTS['METHOD_OVERLOADING'])
+
+    @property
+    def UPLOAD_SPOOL_SIZE(self):
+        return self.user_config.get('UPLOAD_SPOOL_SIZE', DEFAULTS['UPLOAD_SPOOL_SIZE'])
+
+    @property
+    def UPLOAD_TEMP_DIR(self):
+        return self.user_config.get('UPLOAD_TEMP_DIR', DEFAULTS['UPLOAD_TEMP_DIR'])
+
+    @property
+    def UPLOAD_MAX_FILE_SIZE(self):
+        return self.user_config.get('UPLOAD_MAX_FILE_SIZE', DEFAULTS['UPLOAD_MAX_FILE_SIZE'])
+
+    @property
+    def UPLOAD_CHECKSUMS(self):
+        return self.user_config.get('UPLOAD_CHECKSUMS', DEFAULTS['UPLOAD_CHECKSUMS'])
+
+    @property
+    def EARLY_BODY_CHECKS(self):
+        return self.user_config.get('EARLY_BODY_CHECKS', DEFAULTS['EARLY_BODY_CHECKS'])
 
 
 default_settings = APISettings()
+
+
+def current_settings():
+    """
+    Return the settings for the current application, or the default
+    settings if there is no application context.
+    """
+    if has_app_context():
+        return getattr(current_app, 'api_settings', default_settings)
+    return default_settings
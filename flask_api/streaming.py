@@ -0,0 +1,33 @@
+# coding: utf8
+from __future__ import unicode_literals
+import io
+import types
+
+
+class StreamingList(object):
+    """
+    Wraps an iterable, so that it is rendered incrementally as a list,
+    without first being materialized in memory.
+
+    `chunk_size` is the number of items rendered into each chunk of the
+    response, defaulting to the `STREAMING_CHUNK_SIZE` setting.
+    """
+
+    def __init__(self, iterable, chunk_size=None):
+        self.iterable = iterable
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        return iter(self.iterable)
+
+
+def is_streaming(content):
+    """
+    Returns `True` if the content returned by a view should be streamed.
+    That is, if it is a `StreamingList`, a generator, or an iterator.
+    """
+    if isinstance(content, (StreamingList, types.GeneratorType)):
+        return True
+    if isinstance(content, io.IOBase) or not hasattr(content, '__iter__'):
+        return False
+    return hasattr(content, '__next__') or hasattr(content, 'next')
@@ -0,0 +1,139 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask import request
+from flask_api import exceptions, status, FlaskAPI
+import json
+import threading
+import time
+import unittest
+
+
+class BatchTests(unittest.TestCase):
+    def setUp(self):
+        app = FlaskAPI(__name__)
+        app.config['BATCH_REQUESTS'] = True
+        app.logger.disabled = True
+        self.release = threading.Event()
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+        @app.route('/items/<int:pk>/', methods=['GET', 'PUT'])
+        def item(pk):
+            with self.lock:
+                self.running += 1
+                self.max_running = max(self.max_running, self.running)
+            time.sleep(0.01)
+            with self.lock:
+                self.running -= 1
+            if pk == 0:
+                raise exceptions.NotFound()
+            if request.method == 'PUT':
+                return {'pk': pk, 'data': request.data}
+            return {'pk': pk, 'page': request.args.get('page'), 'auth': request.headers.get('Authorization')}
+
+        @app.route('/error/')
+        def error():
+            raise ValueError('Failed')
+
+        @app.route('/slow/')
+        def slow():
+            self.release.wait(5)
+            return {'slow': True}
+
+        @app.route('/text/')
+        def text():
+            return app.response_class('plain', content_type='text/plain')
+
+        self.app = app
+
+    def tearDown(self):
+        self.release.set()
+        self.app.batcher.shutdown()
+
+    def batch(self, data, **kwargs):
+        with self.app.test_client() as client:
+            response = client.post('/flask-api/batch/', data=json.dumps(data), content_type='application/json', **kwargs)
+            return response.status_code, response.get_data()
+
+    def results(self, data, **kwargs):
+        status_code, content = self.batch(data, **kwargs)
+        assert status_code == status.HTTP_200_OK
+        results = json.loads(content.decode('utf8'))
+        return sorted(results, key=lambda result: result['index'])
+
+    def test_batch(self):
+        results = self.results([
+            {'path': '/items/1/?page=2'},
+            {'method': 'put', 'path': '/items/2/', 'body': {'example': 'abc'}, 'id': 'put'},
+            {'path': '/items/0/'},
+            {'path': '/missing/'},
+            {'path': '/text/'}
+        ], headers={'Authorization': 'Token abc'})
+        assert [result['status'] for result in results] == [200, 200, 404, 404, 200]
+        assert results[0]['body'] == {'pk': 1, 'page': '2', 'auth': 'Token abc'}
+        assert results[0]['headers']['Content-Type'] == 'application/json'
+        assert results[1]['body'] == {'pk': 2, 'data': {'example': 'abc'}}
+        assert results[1]['id'] == 'put'
+        assert results[4]['body'] == 'plain'
+        assert self.app.batcher.stats['requests'] == 5
+
+    def test_errors_isolated(self):
+        results = self.results([{'path': '/error/'}, {'path': '/items/1/'}])
+        assert results[0]['status'] == status.HTTP_500_INTERNAL_SERVER_ERROR
+        assert results[0]['body'] == {'message': 'Internal server error.'}
+        assert results[1]['status'] == status.HTTP_200_OK
+        assert self.app.batcher.stats['errors'] == 1
+
+    def test_timeout(self):
+        self.app.config['BATCH_TIMEOUT'] = 0.05
+        results = self.results([{'path': '/slow/'}, {'path': '/items/1/'}])
+        assert results[0]['status'] == status.HTTP_504_GATEWAY_TIMEOUT
+        assert results[1]['status'] == status.HTTP_200_OK
+        assert self.app.batcher.stats['timeouts'] == 1
+
+    def test_results_streamed_as_completed(self):
+        with self.app.test_client() as client:
+            response = client.post(
+                '/flask-api/batch/',
+                data=json.dumps([{'path': '/slow/'}, {'path': '/items/1/'}]),
+                content_type='application/json',
+                buffered=False
+            )
+            assert response.is_streamed
+            chunks = iter(response.response)
+            first = next(chunks)
+            assert b'"index": 1' in first
+            self.release.set()
+            content = first + b''.join(chunks)
+        results = json.loads(content.decode('utf8'))
+        assert [result['index'] for result in results] == [1, 0]
+
+    def test_concurrency_limit(self):
+        self.app.config['BATCH_CONCURRENCY'] = 2
+        results = self.results([{'path': '/items/%d/' % pk} for pk in range(1, 9)])
+        assert [result['status'] for result in results] == [200] * 8
+        assert self.max_running <= 2
+
+    def test_ndjson(self):
+        status_code, content = self.batch([{'path': '/items/1/'}], headers={'Accept': 'application/x-ndjson'})
+        assert status_code == status.HTTP_200_OK
+        assert json.loads(content.decode('utf8'))['body']['pk'] == 1
+
+    def test_invalid_batch(self):
+        for data in ({'path': '/'}, [{'method': 'GET'}], ['/items/1/'], [{'path': '/', 'headers': []}]):
+            status_code, content = self.batch(data)
+            assert status_code == status.HTTP_400_BAD_REQUEST
+
+        self.app.config['BATCH_MAX_SIZE'] = 2
+        status_code, content = self.batch([{'path': '/items/1/'}] * 3)
+        assert status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_nested_batch(self):
+        results = self.results([{'method': 'POST', 'path': '/flask-api/batch/', 'body': []}])
+        assert results[0]['status'] == status.HTTP_404_NOT_FOUND
+
+    def test_disabled(self):
+        self.app.config['BATCH_REQUESTS'] = False
+        status_code, content = self.batch([{'path': '/items/1/'}])
+        assert status_code == status.HTTP_404_NOT_FOUND
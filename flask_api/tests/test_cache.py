@@ -0,0 +1,33 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask_api.cache import LRUCache
+import unittest
+
+
+class LRUCacheTests(unittest.TestCase):
+    def test_get_and_set(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.get('b', 'default') == 'default'
+        assert cache.stats == {'hits': 1, 'misses': 2, 'size': 1, 'maxsize': 2}
+
+    def test_discards_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert 'c' in cache
+        assert len(cache) == 2
+
+    def test_clear(self):
+        cache = LRUCache()
+        cache.set('a', 1)
+        cache.get('a')
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.hits == 0
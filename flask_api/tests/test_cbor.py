@@ -0,0 +1,59 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask_api import cbor
+import binascii
+import unittest
+import pytest
+
+
+class CBORTests(unittest.TestCase):
+    def test_encode_rfc_examples(self):
+        # Examples from RFC 8949, Appendix A.
+        examples = [
+            (0, '00'),
+            (23, '17'),
+            (24, '1818'),
+            (1000, '1903e8'),
+            (1000000, '1a000f4240'),
+            (18446744073709551615, '1bffffffffffffffff'),
+            (18446744073709551616, 'c249010000000000000000'),
+            (-1, '20'),
+            (-1000, '3903e7'),
+            (-18446744073709551617, 'c349010000000000000000'),
+            (1.1, 'fb3ff199999999999a'),
+            (False, 'f4'),
+            (True, 'f5'),
+            (None, 'f6'),
+            (b'\x01\x02\x03\x04', '4401020304'),
+            ('IETF', '6449455446'),
+            ('ü', '62c3bc'),
+            ([1, [2, 3], [4, 5]], '8301820203820405'),
+            ({'a': 1}, 'a1616101'),
+        ]
+        for value, expected in examples:
+            assert binascii.hexlify(cbor.dumps(value)).decode('ascii') == expected
+            assert cbor.loads(binascii.unhexlify(expected)) == value
+
+    def test_decode_rfc_examples(self):
+        examples = [
+            ('f93c00', 1.0),
+            ('fa47c35000', 100000.0),
+            ('f7', None),
+            ('5f42010243030405ff', b'\x01\x02\x03\x04\x05'),
+            ('7f657374726561646d696e67ff', 'streaming'),
+            ('9f018202039f0405ffff', [1, [2, 3], [4, 5]]),
+            ('bf61610161629f0203ffff', {'a': 1, 'b': [2, 3]}),
+            ('c074323031332d30332d32315432303a30343a30305a', '2013-03-21T20:04:00Z'),
+        ]
+        for data, expected in examples:
+            assert cbor.loads(binascii.unhexlify(data)) == expected
+
+    def test_default(self):
+        assert cbor.loads(cbor.dumps({'set': set([1])}, default=list)) == {'set': [1]}
+        with pytest.raises(TypeError):
+            cbor.dumps(set([1]))
+
+    def test_invalid_data(self):
+        for data in ('', '1a000f42', '8301', '0000', 'ff', '1c', 'a18101'):
+            with pytest.raises(ValueError):
+                cbor.loads(binascii.unhexlify(data))
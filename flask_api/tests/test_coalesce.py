@@ -0,0 +1,108 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask_api import exceptions, renderers, status, FlaskAPI
+from flask_api.decorators import set_renderers
+import json
+import threading
+import time
+import unittest
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError('Timed out waiting for condition.')
+        time.sleep(0.001)
+
+
+class CoalesceTests(unittest.TestCase):
+    def setUp(self):
+        app = FlaskAPI(__name__)
+        app.config['COALESCE_REQUESTS'] = True
+        self.calls = 0
+        self.release = threading.Event()
+
+        @app.route('/', methods=['GET', 'POST'])
+        def example():
+            self.calls += 1
+            self.release.wait(5)
+            return {'calls': self.calls}
+
+        @app.route('/error/')
+        def error():
+            self.calls += 1
+            self.release.wait(5)
+            raise exceptions.NotFound()
+
+        @app.route('/html/')
+        @set_renderers(renderers.BrowsableAPIRenderer, renderers.JSONRenderer)
+        def html():
+            self.calls += 1
+            self.release.wait(5)
+            return {'calls': self.calls}
+
+        self.app = app
+
+    def request(self, count, path, method='get', headers=None, ready=None):
+        """
+        Make `count` concurrent requests, releasing the view once all of
+        them are waiting on it, or once `ready()` returns `True`.
+        """
+        responses = [None] * count
+
+        def make_request(idx):
+            with self.app.test_client() as client:
+                responses[idx] = getattr(client, method)(path, headers=headers)
+
+        threads = [threading.Thread(target=make_request, args=(idx,)) for idx in range(count)]
+        for thread in threads:
+            thread.start()
+        wait_for(ready or (lambda: sum(
+            call.waiters + 1 for call in list(self.app.coalescer._calls.values())
+        ) >= count))
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def test_coalesced_requests(self):
+        responses = self.request(5, '/')
+        assert self.calls == 1
+        for response in responses:
+            assert response.status_code == status.HTTP_200_OK
+            assert response.content_type == 'application/json'
+            assert json.loads(response.get_data().decode('utf8')) == {'calls': 1}
+
+        stats = self.app.coalescer.stats
+        assert stats['executions'] == 1
+        assert stats['coalesced'] == 4
+        assert stats['in_flight'] == 0
+
+    def test_error_propagated(self):
+        responses = self.request(3, '/error/')
+        assert self.calls == 1
+        for response in responses:
+            assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert self.app.coalescer.stats['errors'] == 1
+
+    def test_negotiated_media_type(self):
+        responses = self.request(3, '/html/', headers={'Accept': '*/*'})
+        assert self.calls == 1
+        for response in responses:
+            assert response.content_type == 'text/html'
+
+    def test_unsafe_methods_not_coalesced(self):
+        self.request(3, '/', method='post', ready=lambda: self.calls == 3)
+        assert self.app.coalescer.stats['executions'] == 0
+
+    def test_timeout(self):
+        self.app.config['COALESCE_TIMEOUT'] = 0.01
+        responses = self.request(3, '/', ready=lambda: self.calls == 3)
+        assert [response.status_code for response in responses] == [200, 200, 200]
+        assert self.app.coalescer.stats['timeouts'] == 2
+
+    def test_disabled(self):
+        self.app.config['COALESCE_REQUESTS'] = False
+        self.request(3, '/', ready=lambda: self.calls == 3)
+        assert self.app.coalescer.stats['executions'] == 0
@@ -0,0 +1,250 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask import Response, request
+from flask_api import compression, exceptions, status, FlaskAPI
+import io
+import json
+import unittest
+import zlib
+import pytest
+
+
+def decompress(encoding, data):
+    # Decompress incrementally, so that partial streams may be checked.
+    if encoding == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(data)
+    elif encoding == 'deflate':
+        return zlib.decompressobj().decompress(data)
+    elif encoding == 'br':
+        return compression.brotli.Decompressor().process(data)
+    elif encoding == 'zstd':
+        decompressor = compression.zstandard.ZstdDecompressor().decompressobj()
+        return decompressor.decompress(data)
+
+
+available_compressors = compression.get_compressors(sorted(compression.COMPRESSORS))
+
+
+class CompressorTests(unittest.TestCase):
+    def test_compress(self):
+        data = b'{"example": "example"}' * 100
+        for compressor in available_compressors:
+            compressed = compressor.compress(data)
+            assert len(compressed) < len(data)
+            assert decompress(compressor.encoding, compressed) == data
+
+    def test_compress_stream(self):
+        chunks = [b'[1, 2', b', 3', b']']
+        for compressor in available_compressors:
+            compressed = list(compressor.compress_stream(iter(chunks)))
+            assert decompress(compressor.encoding, b''.join(compressed)) == b'[1, 2, 3]'
+            # Every chunk is flushed, so that it can be decompressed on arrival.
+            assert decompress(compressor.encoding, compressed[0]) == b'[1, 2'
+
+    def test_get_compressors(self):
+        compressors = compression.get_compressors(['deflate', 'gzip'], level={'gzip': 9})
+        assert [compressor.encoding for compressor in compressors] == ['deflate', 'gzip']
+        assert [compressor.level for compressor in compressors] == [6, 9]
+        with pytest.raises(ValueError):
+            compression.get_compressors(['foobarz'])
+
+    def test_select_compressor(self):
+        compressors = compression.get_compressors(['gzip', 'deflate'])
+        select = compression.select_compressor
+        assert select('deflate, gzip', compressors).encoding == 'gzip'
+        assert select('deflate, gzip;q=0', compressors).encoding == 'deflate'
+        assert select('*', compressors).encoding == 'gzip'
+        assert select('identity', compressors) is None
+        assert select(None, compressors) is None
+
+
+class CompressedResponseTests(unittest.TestCase):
+    def setUp(self):
+        app = FlaskAPI(__name__)
+        app.config['COMPRESSION'] = True
+        app.config['COMPRESSION_ENCODINGS'] = ['gzip', 'deflate']
+        app.config['COMPRESSION_MIN_SIZE'] = 100
+
+        @app.route('/large/')
+        def large():
+            return {'example': 'example' * 100}
+
+        @app.route('/small/')
+        def small():
+            return {'example': 'example'}
+
+        @app.route('/stream/')
+        def stream():
+            return ({'idx': idx} for idx in range(1000))
+
+        @app.route('/text/')
+        def text():
+            return Response('example' * 100, mimetype='image/svg+xml')
+
+        @app.route('/precompressed/')
+        def precompressed():
+            response = app.response_class({'example': 'example' * 100})
+            response.precompressed = {'gzip': b'precompressed'}
+            return response
+
+        self.app = app
+
+    def test_compressed_response(self):
+        with self.app.test_client() as client:
+            response = client.get('/large/', headers={'Accept-Encoding': 'gzip'})
+            assert response.headers['Content-Encoding'] == 'gzip'
+            assert response.headers['Vary'] == 'Accept-Encoding'
+            assert int(response.headers['Content-Length']) == len(response.get_data())
+            content = json.loads(decompress('gzip', response.get_data()).decode('utf8'))
+            assert content == {'example': 'example' * 100}
+
+    def test_uncompressed_response(self):
+        with self.app.test_client() as client:
+            response = client.get('/large/')
+            assert 'Content-Encoding' not in response.headers
+            assert response.headers['Vary'] == 'Accept-Encoding'
+
+            response = client.get('/small/', headers={'Accept-Encoding': 'gzip'})
+            assert 'Content-Encoding' not in response.headers
+
+            response = client.get('/text/', headers={'Accept-Encoding': 'gzip'})
+            assert 'Content-Encoding' not in response.headers
+            assert 'Vary' not in response.headers
+
+    def test_compression_disabled(self):
+        self.app.config['COMPRESSION'] = False
+        with self.app.test_client() as client:
+            response = client.get('/large/', headers={'Accept-Encoding': 'gzip'})
+            assert 'Content-Encoding' not in response.headers
+
+    def test_streamed_response(self):
+        with self.app.test_client() as client:
+            response = client.get('/stream/', headers={'Accept-Encoding': 'deflate'})
+            assert response.status_code == status.HTTP_200_OK
+            assert response.headers['Content-Encoding'] == 'deflate'
+            assert 'Content-Length' not in response.headers
+            content = json.loads(decompress('deflate', response.get_data()).decode('utf8'))
+            assert content == [{'idx': idx} for idx in range(1000)]
+
+    def test_precompressed_response(self):
+        with self.app.test_client() as client:
+            response = client.get('/precompressed/', headers={'Accept-Encoding': 'gzip'})
+            assert response.headers['Content-Encoding'] == 'gzip'
+            assert response.get_data() == b'precompressed'
+
+            response = client.get('/precompressed/', headers={'Accept-Encoding': 'deflate'})
+            assert response.headers['Content-Encoding'] == 'deflate'
+            assert zlib.decompress(response.get_data()).startswith(b'{"example"')
+
+    def test_precompress(self):
+        compressors = compression.get_compressors(['gzip', 'deflate'])
+        bodies = compression.precompress(b'example' * 100, compressors)
+        assert sorted(bodies) == ['deflate', 'gzip']
+        assert decompress('gzip', bodies['gzip']) == b'example' * 100
+
+
+class DecompressionTests(unittest.TestCase):
+    def test_decompress_stream(self):
+        data = b'0' * 1000000
+        for compressor in available_compressors:
+            chunks = list(compressor.decompress_stream(io.BytesIO(compressor.compress(data)), 1024))
+            assert b''.join(chunks) == data
+            # Output is produced in bounded chunks, however well compressed.
+            assert max(len(chunk) for chunk in chunks) <= 64 * 1024
+
+    def test_decompressing_stream(self):
+        compressor = compression.GzipCompressor()
+        stream = compression.decompressing_stream(io.BytesIO(compressor.compress(b'1\n2\n')), compressor)
+        assert stream.readline() == b'1\n'
+        assert stream.read() == b'2\n'
+
+    def test_decompressed_size_limit(self):
+        compressor = compression.GzipCompressor()
+        data = compressor.compress(b'0' * 10000)
+        stream = compression.decompressing_stream(io.BytesIO(data), compressor, max_length=5000)
+        with pytest.raises(exceptions.RequestEntityTooLarge):
+            stream.read()
+
+    def test_truncated_data(self):
+        compressor = compression.GzipCompressor()
+        data = compressor.compress(b'example' * 100)[:-10]
+        stream = compression.decompressing_stream(io.BytesIO(data), compressor)
+        with pytest.raises(exceptions.ParseError):
+            stream.read()
+
+    @pytest.mark.skipif(compression.zstandard is None, reason='zstandard not installed')
+    def test_truncated_zstd_data(self):
+        compressor = compression.ZstandardCompressor()
+        data = compressor.compress(b'example' * 100)[:-10]
+        stream = compression.decompressing_stream(io.BytesIO(data), compressor)
+        with pytest.raises(exceptions.ParseError):
+            stream.read()
+
+
+class CompressedRequestTests(unittest.TestCase):
+    def setUp(self):
+        app = FlaskAPI(__name__)
+        app.config['MAX_DECOMPRESSED_CONTENT_LENGTH'] = 10000
+
+        @app.route('/', methods=['POST', 'PUT'])
+        def data():
+            return {
+                'method': request.method,
+                'data': request.data,
+                'files': dict([(key, value.read().decode('utf8')) for key, value in request.files.items()])
+            }
+
+        self.app = app
+
+    def post(self, body, content_type, encoding):
+        compressor = compression.COMPRESSORS[encoding]()
+        headers = {'Content-Encoding': encoding}
+        with self.app.test_client() as client:
+            return client.post('/', data=compressor.compress(body), content_type=content_type, headers=headers)
+
+    def test_compressed_json(self):
+        for compressor in available_compressors:
+            response = self.post(b'{"example": "example"}', 'application/json', compressor.encoding)
+            assert response.status_code == status.HTTP_200_OK
+            assert json.loads(response.get_data().decode('utf8'))['data'] == {'example': 'example'}
+
+    def test_compressed_chunked_body(self):
+        # Chunked requests have no 'Content-Length' header.
+        body = compression.GzipCompressor().compress(b'{"example": "example"}')
+        environ = {'wsgi.input_terminated': True, 'HTTP_TRANSFER_ENCODING': 'chunked'}
+        headers = {'Content-Encoding': 'gzip', 'Content-Type': 'application/json'}
+        with self.app.test_client() as client:
+            response = client.post('/', input_stream=io.BytesIO(body), headers=headers, environ_overrides=environ)
+        assert response.status_code == status.HTTP_200_OK
+        assert json.loads(response.get_data().decode('utf8'))['data'] == {'example': 'example'}
+
+    def test_compressed_multipart(self):
+        body = (
+            b'--boundary\r\n'
+            b'Content-Disposition: form-data; name="upload"; filename="example.txt"\r\n'
+            b'Content-Type: text/plain\r\n\r\n'
+            b'example\r\n'
+            b'--boundary--\r\n'
+        )
+        response = self.post(body, 'multipart/form-data; boundary=boundary', 'gzip')
+        assert response.status_code == status.HTTP_200_OK
+        assert json.loads(response.get_data().decode('utf8'))['files'] == {'upload': 'example'}
+
+    def test_compressed_form(self):
+        response = self.post(b'example=1', 'application/x-www-form-urlencoded', 'deflate')
+        assert response.status_code == status.HTTP_200_OK
+        assert json.loads(response.get_data().decode('utf8'))['data'] == {'example': '1'}
+
+    def test_decompressed_size_limit(self):
+        response = self.post(b'[' + b'0, ' * 10000 + b'0]', 'application/json', 'gzip')
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+    def test_invalid_compressed_data(self):
+        with self.app.test_client() as client:
+            response = client.post('/', data=b'{}', content_type='application/json', headers={'Content-Encoding': 'gzip'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_unsupported_encoding(self):
+        with self.app.test_client() as client:
+            response = client.post('/', data=b'{}', content_type='application/json', headers={'Content-Encoding': 'compress'})
+        assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
@@ -0,0 +1,134 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask_api import etags, renderers, status, FlaskAPI
+from flask_api.decorators import etag
+import unittest
+import pytest
+
+
+class ETagTests(unittest.TestCase):
+    def test_select_hasher(self):
+        assert etags.select_hasher('md5')(b'example') == '1a79a4d60de6718e8e5b326e338ae533'
+        assert etags.select_hasher(['xxhash', 'blake2b', 'md5']) in (etags._xxhash, etags._blake2b, etags._md5)
+        assert etags.select_hasher(len) is len
+        with pytest.raises(ValueError):
+            etags.select_hasher('foobar')
+
+    def test_version_etag_varies_by_media_type(self):
+        hasher = etags.select_hasher('md5')
+        json_etag = etags.make_version_etag(hasher, 1, 'application/json')
+        html_etag = etags.make_version_etag(hasher, 1, 'text/html')
+        assert json_etag != html_etag
+        assert json_etag == etags.make_version_etag(hasher, 1, 'application/json')
+
+    def test_match_etag(self):
+        assert etags.match_etag('"abc"', '"abc"') == '"abc"'
+        assert etags.match_etag('"xyz", W/"abc"', '"abc"') == '"abc"'
+        assert etags.match_etag('*', '"abc"') == '"abc"'
+        assert etags.match_etag('"abc-gzip"', '"abc"', ['gzip']) == '"abc-gzip"'
+        assert etags.match_etag('"abc-gzip"', '"abc"') is None
+        assert etags.match_etag('"xyz"', '"abc"') is None
+        assert etags.match_etag(None, '"abc"') is None
+
+
+class ConditionalResponseTests(unittest.TestCase):
+    def setUp(self):
+        app = FlaskAPI(__name__)
+        app.config['ETAGS'] = True
+        self.version = 1
+        self.calls = 0
+
+        class CountingRenderer(renderers.JSONRenderer):
+            def render(renderer, data, media_type, **options):
+                self.calls += 1
+                return super(CountingRenderer, renderer).render(data, media_type, **options)
+
+        app.config['DEFAULT_RENDERERS'] = [CountingRenderer]
+
+        @app.route('/', methods=['GET', 'POST'])
+        def example():
+            return {'example': 'example'}
+
+        @app.route('/versioned/')
+        @etag(lambda: self.version)
+        def versioned():
+            self.calls += 1
+            return {'version': self.version}
+
+        @app.route('/known/')
+        def known():
+            return {'example': 'example'}, {'ETag': '"v1"'}
+
+        self.app = app
+
+    def test_automatic_etag(self):
+        with self.app.test_client() as client:
+            response = client.get('/')
+            assert response.status_code == status.HTTP_200_OK
+            tag = response.headers['ETag']
+
+            response = client.get('/', headers={'If-None-Match': tag})
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+            assert response.headers['ETag'] == tag
+            assert response.get_data() == b''
+
+            response = client.get('/', headers={'If-None-Match': '"other"'})
+            assert response.status_code == status.HTTP_200_OK
+
+    def test_automatic_etag_disabled(self):
+        self.app.config['ETAGS'] = False
+        with self.app.test_client() as client:
+            response = client.get('/')
+            assert 'ETag' not in response.headers
+
+    def test_unsafe_method(self):
+        with self.app.test_client() as client:
+            response = client.post('/', headers={'If-None-Match': '*'})
+            assert response.status_code == status.HTTP_200_OK
+            assert 'ETag' not in response.headers
+
+    def test_version_etag_skips_view(self):
+        with self.app.test_client() as client:
+            response = client.get('/versioned/')
+            tag = response.headers['ETag']
+            assert self.calls == 2  # The view, and the renderer.
+
+            response = client.get('/versioned/', headers={'If-None-Match': tag})
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+            assert response.headers['ETag'] == tag
+            assert self.calls == 2
+
+            self.version = 2
+            response = client.get('/versioned/', headers={'If-None-Match': tag})
+            assert response.status_code == status.HTTP_200_OK
+            assert response.headers['ETag'] != tag
+            assert self.calls == 4
+
+    def test_returned_etag_skips_render(self):
+        with self.app.test_client() as client:
+            response = client.get('/known/', headers={'If-None-Match': '"v1"'})
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+            assert response.headers['ETag'] == '"v1"'
+            assert self.calls == 0
+
+            response = client.get('/known/')
+            assert response.status_code == status.HTTP_200_OK
+            assert response.headers['ETag'] == '"v1"'
+            assert self.calls == 1
+
+    def test_compressed_etag(self):
+        self.app.config['COMPRESSION'] = True
+        self.app.config['COMPRESSION_ENCODINGS'] = ['gzip']
+        self.app.config['COMPRESSION_MIN_SIZE'] = 0
+        headers = {'Accept-Encoding': 'gzip'}
+        with self.app.test_client() as client:
+            response = client.get('/known/', headers=headers)
+            assert response.headers['Content-Encoding'] == 'gzip'
+            assert response.headers['ETag'] == '"v1-gzip"'
+
+            headers['If-None-Match'] = '"v1-gzip"'
+            response = client.get('/known/', headers=headers)
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+            assert response.headers['ETag'] == '"v1-gzip"'
+            assert response.headers['Vary'] == 'Accept-Encoding'
+            assert 'Content-Encoding' not in response.headers
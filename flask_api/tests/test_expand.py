@@ -0,0 +1,116 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask_api import FlaskAPI
+from flask_api.expand import expand, get_data_loader, DataLoader, Related
+import json
+import unittest
+
+
+USERS = {
+    1: {'id': 1, 'name': 'one', 'company': 10},
+    2: {'id': 2, 'name': 'two', 'company': 20},
+}
+COMPANIES = {10: {'id': 10, 'name': 'ten'}, 20: {'id': 20, 'name': 'twenty'}}
+NOTES = [{'id': idx, 'text': 'note %d' % idx, 'author': idx % 2 + 1} for idx in range(6)]
+
+
+def user_repr(user):
+    return {'id': user['id'], 'name': user['name'], 'company': Related('companies', user['company'])}
+
+
+def note_repr(note):
+    return {
+        'id': note['id'],
+        'text': note['text'],
+        'author': Related('users', note['author'], default='http://localhost/users/%d/' % note['author'])
+    }
+
+
+class ExpandTests(unittest.TestCase):
+    def setUp(self):
+        app = FlaskAPI(__name__)
+        self.calls = []
+
+        @app.data_loader('users')
+        def load_users(keys):
+            self.calls.append(('users', sorted(keys)))
+            return dict((key, user_repr(USERS[key])) for key in keys if key in USERS)
+
+        @app.data_loader('companies')
+        def load_companies(keys):
+            self.calls.append(('companies', sorted(keys)))
+            return [COMPANIES[key] for key in keys]
+
+        @app.route('/')
+        def notes_list():
+            return expand([note_repr(note) for note in NOTES])
+
+        @app.route('/stream/')
+        def notes_stream():
+            return expand((note_repr(note) for note in NOTES), chunk_size=4)
+
+        @app.route('/loader/')
+        def loader():
+            data_loader = get_data_loader()
+            data_loader.load_many('users', [1, 2])
+            return expand({'author': Related('users', 1), 'missing': Related('users', 3)})
+
+        self.app = app
+
+    def get(self, url):
+        with self.app.test_client() as client:
+            response = client.get(url)
+        return json.loads(response.get_data().decode('utf8'))
+
+    def test_not_expanded(self):
+        data = self.get('/')
+        assert data[0] == {'id': 0, 'text': 'note 0', 'author': 'http://localhost/users/1/'}
+        assert self.calls == []
+
+    def test_expanded(self):
+        data = self.get('/?expand=author')
+        assert data[0]['author'] == {'id': 1, 'name': 'one', 'company': 10}
+        assert data[1]['author'] == {'id': 2, 'name': 'two', 'company': 20}
+        assert self.calls == [('users', [1, 2])]
+
+    def test_nested(self):
+        data = self.get('/?expand=author.company')
+        assert data[0]['author']['company'] == {'id': 10, 'name': 'ten'}
+        assert self.calls == [('users', [1, 2]), ('companies', [10, 20])]
+
+    def test_streamed_in_chunks(self):
+        data = self.get('/stream/?expand=author')
+        assert len(data) == 6
+        assert data[5]['author']['name'] == 'two'
+        # Keys loaded for the first chunk are cached for the rest of the request.
+        assert self.calls == [('users', [1, 2])]
+
+    def test_request_cache(self):
+        data = self.get('/loader/?expand=author,missing')
+        assert data == {'author': {'id': 1, 'name': 'one', 'company': 10}, 'missing': None}
+        assert self.calls == [('users', [1, 2]), ('users', [3])]
+
+    def test_pruned_fields_not_loaded(self):
+        self.app.config['SPARSE_FIELDSETS'] = True
+        data = self.get('/?expand=author&fields=id')
+        assert data[0] == {'id': 0}
+        assert self.calls == []
+
+    def test_many_keys_batched(self):
+        batches = []
+
+        def load_numbers(keys):
+            batches.append(list(keys))
+            return keys
+
+        loader = DataLoader({'numbers': load_numbers})
+        keys = list(range(20000)) * 2
+        assert loader.load_many('numbers', keys) == keys
+        # Each key is loaded once, in a single batch.
+        assert batches == [list(range(20000))]
+        assert loader.calls == 1
+
+    def test_unknown_relation(self):
+        with self.app.test_request_context('/?expand=other'):
+            with self.assertRaises(ValueError):
+                expand({'other': Related('other', 1)})
@@ -0,0 +1,109 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask import request
+from flask_api import exceptions, status, FlaskAPI
+from flask_api.fields import fieldset_cache, get_fieldset, ALL_FIELDS
+import json
+import unittest
+
+
+BOOK = {
+    'id': 1,
+    'title': 'Example',
+    'author': {'name': 'Someone', 'email': 'someone@example.com', 'address': {'city': 'Brighton'}},
+    'tags': [{'name': 'a', 'slug': 'a'}, {'name': 'b', 'slug': 'b'}]
+}
+
+
+class FieldSetTests(unittest.TestCase):
+    def test_include(self):
+        fieldset = get_fieldset('id,author.name,tags.slug')
+        assert fieldset.apply(BOOK) == {
+            'id': 1,
+            'author': {'name': 'Someone'},
+            'tags': [{'slug': 'a'}, {'slug': 'b'}]
+        }
+
+    def test_exclude(self):
+        fieldset = get_fieldset(exclude='title,author.email,author.address.city')
+        assert fieldset.apply(BOOK) == {
+            'id': 1,
+            'author': {'name': 'Someone', 'address': {}},
+            'tags': BOOK['tags']
+        }
+
+    def test_include_and_exclude(self):
+        fieldset = get_fieldset('id,author', 'author.email,author.address')
+        assert fieldset.apply([BOOK]) == [{'id': 1, 'author': {'name': 'Someone'}}]
+
+    def test_parent_selected_in_full(self):
+        for spec in ('author.name,author', 'author,author.name'):
+            assert get_fieldset(spec).apply(BOOK) == {'author': BOOK['author']}
+
+    def test_contains(self):
+        fieldset = get_fieldset('id,author.name', 'author.name.first')
+        assert 'id' in fieldset
+        assert 'author' in fieldset
+        assert 'author.name' in fieldset
+        assert 'author.name.last' in fieldset
+        assert 'author.name.first' not in fieldset
+        assert 'author.email' not in fieldset
+        assert 'title' not in fieldset
+        assert 'anything' in ALL_FIELDS
+
+    def test_cached(self):
+        fieldset_cache.clear()
+        assert get_fieldset('id,title') is get_fieldset('id,title')
+        assert fieldset_cache.stats['hits'] == 1
+        assert get_fieldset() is ALL_FIELDS
+        assert get_fieldset('', '') is ALL_FIELDS
+
+
+class SparseFieldsetsTests(unittest.TestCase):
+    def setUp(self):
+        app = FlaskAPI(__name__)
+        app.config['SPARSE_FIELDSETS'] = True
+        self.computed = []
+
+        @app.route('/')
+        def book():
+            data = dict(BOOK)
+            if 'author.email' not in request.fields:
+                data['author'] = {'name': BOOK['author']['name']}
+            self.computed.append(data)
+            return data
+
+        @app.route('/list/')
+        def book_list():
+            return (book for book in [BOOK, BOOK])
+
+        @app.route('/error/')
+        def error():
+            raise exceptions.NotFound()
+
+        self.app = app
+
+    def get(self, url):
+        with self.app.test_client() as client:
+            response = client.get(url)
+        return response.status_code, json.loads(response.get_data().decode('utf8'))
+
+    def test_fields(self):
+        status_code, data = self.get('/?fields=id,author.name')
+        assert status_code == status.HTTP_200_OK
+        assert data == {'id': 1, 'author': {'name': 'Someone'}}
+        assert 'email' not in self.computed[0]['author']
+
+    def test_streamed_list(self):
+        status_code, data = self.get('/list/?exclude=tags,author')
+        assert data == [{'id': 1, 'title': 'Example'}] * 2
+
+    def test_errors_not_pruned(self):
+        status_code, data = self.get('/error/?fields=id')
+        assert status_code == status.HTTP_404_NOT_FOUND
+        assert 'message' in data
+
+    def test_disabled(self):
+        self.app.config['SPARSE_FIELDSETS'] = False
+        status_code, data = self.get('/?fields=id')
+        assert data == BOOK
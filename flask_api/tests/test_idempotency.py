@@ -0,0 +1,185 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask import request
+from flask_api import status, FlaskAPI
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+
+class IdempotencyTests(unittest.TestCase):
+    def setUp(self):
+        app = FlaskAPI(__name__)
+        app.config['IDEMPOTENCY_KEYS'] = True
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+        @app.route('/', methods=['GET', 'POST'])
+        def example():
+            self.calls += 1
+            self.started.set()
+            self.release.wait(5)
+            return {'calls': self.calls, 'data': request.data}, status.HTTP_201_CREATED
+
+        @app.route('/error/', methods=['POST'])
+        def error():
+            self.calls += 1
+            if self.calls == 1:
+                raise ValueError('Failed')
+            return {'calls': self.calls}
+
+        @app.route('/cookie/', methods=['POST'])
+        def cookie():
+            self.calls += 1
+            return {'calls': self.calls}, {'Set-Cookie': 'session=example'}
+
+        @app.route('/large/', methods=['POST'])
+        def large():
+            self.calls += 1
+            return {'text': 'x' * 1000}
+
+        @app.route('/server-error/', methods=['POST'])
+        def server_error():
+            self.calls += 1
+            return {'calls': self.calls}, status.HTTP_503_SERVICE_UNAVAILABLE
+
+        self.app = app
+
+    def post(self, path, data, key, **kwargs):
+        headers = kwargs.pop('headers', {})
+        headers['Idempotency-Key'] = key
+        # Without the cookie jar, so that 'Cookie' headers can be set.
+        with self.app.test_client(use_cookies=False) as client:
+            return client.post(path, data=json.dumps(data), content_type='application/json', headers=headers)
+
+    def test_replay(self):
+        response = self.post('/', {'example': 1}, 'abc')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert 'Idempotent-Replayed' not in response.headers
+        body = response.get_data()
+
+        response = self.post('/', {'example': 1}, 'abc')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.headers['Idempotent-Replayed'] == 'true'
+        assert response.content_type == 'application/json'
+        assert response.get_data() == body
+        assert self.calls == 1
+
+        # A different key runs the view again.
+        response = self.post('/', {'example': 1}, 'xyz')
+        assert json.loads(response.get_data().decode('utf8'))['calls'] == 2
+
+        assert self.app.idempotency.stats['replays'] == 1
+        assert self.app.idempotency.stats['executions'] == 2
+
+    def test_keys_scoped_to_credentials(self):
+        self.post('/', {'example': 1}, 'abc', headers={'Authorization': 'Token one'})
+        response = self.post('/', {'example': 1}, 'abc', headers={'Authorization': 'Token two'})
+        assert 'Idempotent-Replayed' not in response.headers
+        assert self.calls == 2
+
+        self.post('/', {'example': 1}, 'abc', headers={'Cookie': 'session=one'})
+        response = self.post('/', {'example': 1}, 'abc', headers={'Cookie': 'session=two'})
+        assert 'Idempotent-Replayed' not in response.headers
+        assert self.calls == 4
+
+    def test_different_request(self):
+        self.post('/', {'example': 1}, 'abc')
+        response = self.post('/', {'example': 2}, 'abc')
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert self.calls == 1
+        assert self.app.idempotency.stats['mismatches'] == 1
+
+    def test_in_flight(self):
+        self.release.clear()
+        thread = threading.Thread(target=self.post, args=('/', {'example': 1}, 'abc'))
+        thread.start()
+        assert self.started.wait(5)
+
+        response = self.post('/', {'example': 1}, 'abc')
+        assert response.status_code == status.HTTP_409_CONFLICT
+        self.release.set()
+        thread.join()
+
+        response = self.post('/', {'example': 1}, 'abc')
+        assert response.headers['Idempotent-Replayed'] == 'true'
+        assert self.calls == 1
+
+    def test_exception_releases_key(self):
+        self.app.logger.disabled = True
+        response = self.post('/error/', {}, 'abc')
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+        response = self.post('/error/', {}, 'abc')
+        assert response.status_code == status.HTTP_200_OK
+        assert self.calls == 2
+
+    def test_server_errors_not_stored(self):
+        self.post('/server-error/', {}, 'abc')
+        response = self.post('/server-error/', {}, 'abc')
+        assert 'Idempotent-Replayed' not in response.headers
+        assert self.calls == 2
+
+    def test_cookies_replayed(self):
+        self.post('/cookie/', {}, 'abc')
+        response = self.post('/cookie/', {}, 'abc')
+        assert response.headers['Idempotent-Replayed'] == 'true'
+        assert response.headers['Set-Cookie'] == 'session=example'
+        assert self.calls == 1
+
+    def test_response_too_large_to_store(self):
+        self.app.config['IDEMPOTENCY_OPTIONS'] = {'max_bytes': 500}
+        with mock.patch.object(self.app.logger, 'warning') as warning:
+            response = self.post('/large/', {}, 'abc')
+        assert response.status_code == status.HTTP_200_OK
+        assert warning.call_count == 1
+
+        # The view is not run again.
+        response = self.post('/large/', {}, 'abc')
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert self.calls == 1
+        assert self.app.idempotency.stats['unstored'] == 1
+
+    def test_safe_methods_and_disabled(self):
+        with self.app.test_client() as client:
+            client.get('/', headers={'Idempotency-Key': 'abc'})
+            client.get('/', headers={'Idempotency-Key': 'abc'})
+        assert self.calls == 2
+
+        self.app.config['IDEMPOTENCY_KEYS'] = False
+        self.post('/', {}, 'abc')
+        self.post('/', {}, 'abc')
+        assert self.calls == 4
+
+    def test_long_key(self):
+        response = self.post('/', {}, 'a' * 256)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_shared_store(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            self.app.config['IDEMPOTENCY_BACKEND'] = 'flask_api.responsecache.MMapCache'
+            self.app.config['IDEMPOTENCY_OPTIONS'] = {'path': os.path.join(tempdir, 'idempotency'), 'max_bytes': 64 * 1024}
+            self.post('/', {'example': 1}, 'abc')
+
+            # Another worker process, with its own app instance.
+            other = FlaskAPI(__name__)
+            other.config.update(self.app.config)
+            other.add_url_rule('/', 'example', self.app.view_functions['example'], methods=['POST'])
+            self.app, app = other, self.app
+            response = self.post('/', {'example': 1}, 'abc')
+            assert response.headers['Idempotent-Replayed'] == 'true'
+            assert self.calls == 1
+            other.idempotency.store.close()
+            app.idempotency.store.close()
+        finally:
+            shutil.rmtree(tempdir)
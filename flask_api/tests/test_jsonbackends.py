@@ -0,0 +1,116 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask_api import exceptions, parsers, renderers, FlaskAPI
+from flask_api.compat import simplejson
+from flask_api.jsonbackends import BACKENDS, StdlibJSONBackend, select_json_backend
+from flask_api.mediatypes import MediaType
+import datetime
+import decimal
+import io
+import json
+import unittest
+import uuid
+import pytest
+
+
+available_backends = [
+    backend_cls() for backend_cls in BACKENDS.values() if backend_cls.available
+]
+
+payload = {
+    'text': 'I ♥ Python </script>',
+    'integer': 1,
+    'float': 1.5,
+    'boolean': True,
+    'null': None,
+    'list': [1, 'two', {'three': 3}],
+    'datetime': datetime.datetime(2017, 1, 2, 3, 4, 5),
+    'date': datetime.date(2017, 1, 2),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+}
+
+
+class JSONBackendConformanceTests(unittest.TestCase):
+    def test_backends_render_equivalent_output(self):
+        expected = json.loads(StdlibJSONBackend().dumps(payload).decode('utf-8'))
+        assert expected['datetime'] == 'Mon, 02 Jan 2017 03:04:05 GMT'
+        assert expected['uuid'] == '12345678-1234-5678-1234-567812345678'
+        for backend in available_backends:
+            for indent in (None, 2, 4):
+                content = backend.dumps(payload, indent=indent)
+                assert isinstance(content, bytes), backend.name
+                assert json.loads(content.decode('utf-8')) == expected, backend.name
+
+    def test_backends_render_edge_cases(self):
+        data = {
+            'big': 2 ** 70,
+            'negative': -2 ** 70,
+            'special': [float('nan'), float('inf'), -float('inf')],
+            'null': None
+        }
+        if simplejson is not None:
+            # Flask's encoder only supports decimals when using simplejson.
+            data['decimal'] = decimal.Decimal('1.5')
+        for backend in available_backends:
+            for indent in (None, 0, 2, 4):
+                content = backend.dumps(data, indent=indent).decode('utf-8')
+                parsed = json.loads(content)
+                assert parsed['big'] == 2 ** 70, backend.name
+                assert parsed['negative'] == -2 ** 70, backend.name
+                assert parsed.get('decimal', 1.5) == 1.5, backend.name
+                assert parsed['special'][0] != parsed['special'][0], backend.name
+                assert parsed['special'][1:] == [float('inf'), -float('inf')], backend.name
+                assert parsed['null'] is None, backend.name
+                if indent is not None:
+                    assert '\n' in content, backend.name
+
+    def test_backends_parse_bytes(self):
+        content = '{"text": "I ♥ Python", "list": [1, 2.5, null]}'.encode('utf-8')
+        for backend in available_backends:
+            data = backend.loads(content)
+            assert data == {'text': 'I ♥ Python', 'list': [1, 2.5, None]}, backend.name
+
+    def test_backends_raise_parse_errors(self):
+        for backend in available_backends:
+            with pytest.raises(ValueError):
+                backend.loads(b'{key: 1}')
+
+
+class JSONBackendSettingTests(unittest.TestCase):
+    def test_select_backend_by_preference(self):
+        backend = select_json_backend(['orjson', 'json'])
+        if BACKENDS['orjson'].available:
+            assert backend.name == 'orjson'
+        else:
+            assert backend.name == 'json'
+
+    def test_select_unknown_backend(self):
+        with pytest.raises(ValueError):
+            select_json_backend('foobarz')
+
+    def test_fallback_when_not_installed(self):
+        class MissingBackend(StdlibJSONBackend):
+            name = 'missing'
+            available = False
+
+        BACKENDS['missing'] = MissingBackend
+        try:
+            backend = select_json_backend('missing')
+        finally:
+            del BACKENDS['missing']
+        assert type(backend) is StdlibJSONBackend
+
+    def test_json_backend_setting(self):
+        for backend in available_backends:
+            app = FlaskAPI(__name__)
+            app.config['JSON_BACKEND'] = backend.name
+            with app.app_context():
+                renderer = renderers.JSONRenderer()
+                content = renderer.render({'example': 'example'}, MediaType('application/json'))
+                assert json.loads(content.decode('utf-8')) == {'example': 'example'}
+
+                parser = parsers.JSONParser()
+                stream = io.BytesIO(b'{key: 1}')
+                with pytest.raises(exceptions.ParseError):
+                    parser.parse(stream, MediaType('application/json'))
+                assert type(app.api_settings.JSON_BACKEND) is type(backend)
@@ -1,7 +1,9 @@
 # coding: utf8
 from __future__ import unicode_literals
 from flask_api.mediatypes import MediaType, parse_accept_header
+import pickle
 import unittest
+import pytest
 
 
 class MediaTypeParsingTests(unittest.TestCase):
@@ -52,6 +54,31 @@ class MediaTypeParsingTests(unittest.TestCase):
         assert media.precedence == 0
 
 
+class MediaTypeInterningTests(unittest.TestCase):
+    def test_equal_strings_return_same_instance(self):
+        media = MediaType('application/json; indent=4')
+        assert MediaType('application/json; indent=4') is media
+
+    def test_equivalent_strings_compare_equal(self):
+        media = MediaType('application/xml; schema=foobar, q=0.5')
+        other = MediaType('application/xml; q="0.5", schema="foobar"')
+        assert media is other
+        assert hash(media) == hash(other)
+        assert media != MediaType('application/xml')
+
+    def test_media_type_is_immutable(self):
+        media = MediaType('application/json; indent=4')
+        with pytest.raises(AttributeError):
+            media.sub_type = 'xml'
+        with pytest.raises(TypeError):
+            media.params['indent'] = '2'
+        assert str(media) == 'application/json; indent="4"'
+
+    def test_media_type_pickles(self):
+        media = MediaType('application/json; indent=4')
+        assert pickle.loads(pickle.dumps(media)) is media
+
+
 class MediaTypeMatchingTests(unittest.TestCase):
     def test_media_type_includes_params(self):
         media_type = MediaType('application/json')
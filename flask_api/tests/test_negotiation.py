@@ -91,3 +91,44 @@ class TestParserNegotiation(unittest.TestCase):
         msg = str(exception.value)
         expected = '`select_parser()` method must be implemented for class "BaseNegotiation"'
         assert msg == expected
+
+
+class TestNegotiationCache(unittest.TestCase):
+    def setUp(self):
+        self.app = flask_api.FlaskAPI(__name__)
+
+        @self.app.route('/')
+        def example():
+            return {'example': 'example'}
+
+    def test_repeated_accept_header_hits_cache(self):
+        cache = self.app.negotiation_cache
+        with self.app.test_client() as client:
+            client.get('/', headers={'Accept': 'application/json'})
+            client.get('/', headers={'Accept': 'application/json'})
+        assert cache.misses == 1
+        assert cache.hits == 1
+
+    def test_media_type_params_are_cached_per_accept_header(self):
+        with self.app.test_client() as client:
+            for indent in (4, 2, 4):
+                headers = {'Accept': 'application/json; indent=%d' % indent}
+                response = client.get('/', headers=headers)
+                expected = '{\n%s"example": "example"\n}' % (' ' * indent)
+                assert response.get_data().decode('utf8') == expected
+                assert response.content_type == 'application/json; indent="%d"' % indent
+        assert self.app.negotiation_cache.hits == 1
+
+    def test_not_acceptable_is_cached(self):
+        with self.app.test_client() as client:
+            for _ in range(2):
+                response = client.get('/', headers={'Accept': 'application/xml'})
+                assert response.status_code == 406
+        assert self.app.negotiation_cache.hits == 1
+
+    def test_cache_disabled(self):
+        self.app.config['NEGOTIATION_CACHE_SIZE'] = 0
+        with self.app.test_client() as client:
+            response = client.get('/', headers={'Accept': 'application/json'})
+            assert response.status_code == 200
+        assert len(self.app.negotiation_cache) == 0
@@ -0,0 +1,110 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask_api import status, FlaskAPI
+from flask_api.pagination import encode_cursor, paginate, seek
+import json
+import re
+import unittest
+
+
+ITEMS = [{'id': idx, 'group': idx // 10} for idx in range(95)]
+
+
+class PaginationTests(unittest.TestCase):
+    def setUp(self):
+        app = FlaskAPI(__name__)
+        app.config['SECRET_KEY'] = 'example'
+        app.config['PAGINATION_PAGE_SIZE'] = 20
+        app.config['PAGINATION_MAX_PAGE_SIZE'] = 50
+        self.queries = []
+
+        @app.route('/')
+        def items():
+            return paginate(ITEMS, key=lambda item: item['id'])
+
+        @app.route('/query/')
+        def query():
+            def fetch(after, limit):
+                self.queries.append((after, limit))
+                start = 0 if after is None else after[1] + 1
+                return ITEMS[start:start + limit]
+            return paginate(fetch, key=lambda item: (item['group'], item['id']), serializer=lambda item: item['id'])
+
+        @app.route('/generator/')
+        def generator():
+            return paginate((item for item in ITEMS), key=lambda item: item['id'], page_size=40)
+
+        self.app = app
+
+    def get_all(self, url):
+        pages = []
+        with self.app.test_client() as client:
+            while url:
+                response = client.get(url)
+                assert response.status_code == status.HTTP_200_OK
+                pages.append(json.loads(response.get_data().decode('utf8')))
+                link = response.headers.get('Link')
+                url = re.match(r'<http://localhost([^>]*)>; rel="next"', link).group(1) if link else None
+        return pages
+
+    def test_pages(self):
+        pages = self.get_all('/')
+        assert [len(page) for page in pages] == [20, 20, 20, 20, 15]
+        assert sum(pages, []) == ITEMS
+
+    def test_query_callback(self):
+        pages = self.get_all('/query/?page_size=30')
+        assert sum(pages, []) == list(range(95))
+        assert self.queries == [(None, 31), ((2, 29), 31), ((5, 59), 31), ((8, 89), 31)]
+
+    def test_generator(self):
+        pages = self.get_all('/generator/')
+        assert [len(page) for page in pages] == [40, 40, 15]
+
+    def test_page_size(self):
+        with self.app.test_client() as client:
+            for page_size, expected in (('10', 10), ('1000', 50), ('0', 20), ('abc', 20)):
+                response = client.get('/?page_size=' + page_size)
+                assert len(json.loads(response.get_data().decode('utf8'))) == expected
+
+    def test_link_keeps_query_parameters(self):
+        with self.app.test_client() as client:
+            response = client.get('/?page_size=10&example=a')
+        link = response.headers['Link']
+        assert 'page_size=10' in link
+        assert 'example=a' in link
+        assert 'cursor=' in link
+
+    def test_streamed(self):
+        with self.app.test_client() as client:
+            response = client.get('/')
+        assert response.is_streamed
+
+    def test_invalid_cursor(self):
+        with self.app.test_client() as client:
+            response = client.get('/')
+            cursor = re.search(r'cursor=([^&>]*)', response.headers['Link']).group(1)
+            response = client.get('/?cursor=' + cursor[:-1] + ('A' if cursor[-1] != 'A' else 'B'))
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_cursor_from_other_endpoint(self):
+        with self.app.test_client() as client:
+            response = client.get('/query/')
+            cursor = re.search(r'cursor=([^&>]*)', response.headers['Link']).group(1)
+            response = client.get('/?cursor=' + cursor)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_cursor_of_other_type(self):
+        for url in ('/', '/generator/'):
+            with self.app.test_request_context(url):
+                cursor = encode_cursor('example')
+            with self.app.test_client() as client:
+                response = client.get(url + '?cursor=' + cursor)
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_seek(self):
+        items = list(range(0, 100, 2))
+        assert list(seek(items, lambda item: item, 10))[:3] == [12, 14, 16]
+        assert list(seek(items, lambda item: item, 11))[:3] == [12, 14, 16]
+        assert list(seek(items, lambda item: item, 98)) == []
+        assert list(seek(iter(items), lambda item: item, 95)) == [96, 98]
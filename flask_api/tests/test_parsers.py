@@ -2,11 +2,23 @@
 from __future__ import unicode_literals
 from flask import request
 from flask_api import exceptions, parsers, status, mediatypes, FlaskAPI
-from flask_api.decorators import set_parsers
+from flask_api.compat import simdjson
+from flask_api.decorators import set_parsers, set_upload_sink
+from flask_api.lazyjson import LazyArray, LazyObject
+import hashlib
 import io
 import json
+import shutil
+import tempfile
+import timeit
 import unittest
 import pytest
+import zlib
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
 
 
 app = FlaskAPI(__name__)
@@ -179,3 +191,337 @@ class OverrideParserSettings(unittest.TestCase):
                 "data": "custom parser 2",
             }
             assert data == expected
+
+
+@pytest.mark.skipif(simdjson is None, reason='pysimdjson is not installed')
+class LazyJSONParserTests(unittest.TestCase):
+    def parse(self, content):
+        return parsers.LazyJSONParser().parse(io.BytesIO(content), mediatypes.MediaType('application/json'))
+
+    def test_parse_object(self):
+        data = self.parse(b'{"key": 1, "items": [{"id": 1}, {"id": 2}], "other": null}')
+        assert isinstance(data, LazyObject)
+        assert data['key'] == 1
+        assert data.get('missing') is None
+        assert list(data) == ['key', 'items', 'other']
+        assert len(data) == 3
+        assert data['items'][-1]['id'] == 2
+        assert data['items'] is data['items']
+        assert list(data.values())[1] is data['items']
+        assert data == {'key': 1, 'items': [{'id': 1}, {'id': 2}], 'other': None}
+        assert data.materialize() == {'key': 1, 'items': [{'id': 1}, {'id': 2}], 'other': None}
+
+    def test_parse_array(self):
+        data = self.parse(b'[1, "two", {"three": 3}]')
+        assert isinstance(data, LazyArray)
+        assert len(data) == 3
+        assert data[-1] is data[2]
+        assert data[1:] == ['two', {'three': 3}]
+        assert list(data) == [1, 'two', {'three': 3}]
+        assert data == [1, 'two', {'three': 3}]
+        with pytest.raises(IndexError):
+            data[3]
+
+    def test_iteration_converts_in_one_pass(self):
+        data = self.parse(b'{"items": [{"id": 1, "tags": ["a"]}, {"id": 2, "tags": ["b"]}]}')
+        first = data['items'][0]
+        items = list(data['items'])
+        # Items accessed earlier keep their wrappers, and the rest are plain values.
+        assert items[0] is first
+        assert type(items[1]) is dict
+        assert items[1] == {'id': 2, 'tags': ['b']}
+
+    def test_full_walk_as_fast_as_eager_parsing(self):
+        content = json.dumps({'items': [
+            {'id': idx, 'name': 'item %d' % idx, 'attrs': {'x': idx, 'y': idx * 2.5}} for idx in range(20000)
+        ]}).encode('utf8')
+
+        def walk(parser):
+            data = parser.parse(io.BytesIO(content), mediatypes.MediaType('application/json'))
+            return [item['attrs']['x'] for item in data['items']]
+
+        with FlaskAPI(__name__).app_context():
+            eager = min(timeit.repeat(lambda: walk(parsers.JSONParser()), number=1, repeat=5))
+            lazy = min(timeit.repeat(lambda: walk(parsers.LazyJSONParser()), number=1, repeat=5))
+        # Allow for timing noise.
+        assert lazy < eager * 1.5
+
+    def test_parse_scalar(self):
+        assert self.parse('"I ♥ Python"'.encode('utf8')) == 'I ♥ Python'
+
+    def test_invalid_json(self):
+        with pytest.raises(exceptions.ParseError) as exception:
+            self.parse(b'{key: 1}')
+        assert str(exception.value).startswith('JSON parse error - ')
+
+    def test_render_lazy_document(self):
+        app = FlaskAPI(__name__)
+
+        @app.route('/', methods=['POST'])
+        @set_parsers(parsers.LazyJSONParser)
+        def echo():
+            return {'name': request.data['user']['name'], 'data': request.data}
+
+        with app.test_client() as client:
+            data = json.dumps({'user': {'name': 'example', 'tags': ['a', 'b']}})
+            response = client.post('/', data=data, content_type='application/json')
+            assert response.status_code == status.HTTP_200_OK
+            assert json.loads(response.get_data().decode('utf8')) == {
+                'name': 'example',
+                'data': {'user': {'name': 'example', 'tags': ['a', 'b']}}
+            }
+
+
+class LazyJSONParserFallbackTests(unittest.TestCase):
+    def test_parsed_eagerly_without_simdjson(self):
+        with mock.patch('flask_api.parsers.simdjson', None):
+            data = parsers.LazyJSONParser().parse(io.BytesIO(b'{"key": [1, 2]}'), 'application/json')
+        assert data == {'key': [1, 2]}
+        assert isinstance(data, dict)
+
+
+class StreamingJSONParserTests(unittest.TestCase):
+    def parse(self, content, chunk_size=4):
+        parser = parsers.StreamingJSONParser()
+        parser.chunk_size = chunk_size
+        return parser.parse(io.BytesIO(content), mediatypes.MediaType('application/json'))
+
+    def test_parse_array(self):
+        content = ' [1, 23456789, "a \\" ] string", {"key": [1, 2]}, null, true] '
+        items = self.parse(content.encode('utf8'))
+        assert list(items) == [1, 23456789, 'a " ] string', {'key': [1, 2]}, None, True]
+
+    def test_parse_empty_array(self):
+        assert list(self.parse(b'[ ]')) == []
+
+    def test_parse_multibyte_characters(self):
+        content = '["I ♥ Python", "♥♥♥"]'.encode('utf8')
+        assert list(self.parse(content, chunk_size=1)) == ['I ♥ Python', '♥♥♥']
+
+    def test_items_are_parsed_lazily(self):
+        stream = io.BytesIO(b'[1, 2, {invalid}]')
+        items = parsers.StreamingJSONParser().parse(stream, 'application/json')
+        assert next(items) == 1
+        assert next(items) == 2
+
+    def test_parse_error_reports_element_index(self):
+        items = self.parse(b'[1, 2, {invalid}]')
+        with pytest.raises(exceptions.ParseError) as exception:
+            list(items)
+        assert str(exception.value).startswith('JSON parse error in element 2 - ')
+
+    def test_invalid_item_reported_without_reading_stream(self):
+        content = b'[{invalid}, ' + b', '.join([b'"%s"' % (b'x' * 1000)] * 1000) + b']'
+        items = parsers.StreamingJSONParser().parse(io.BytesIO(content), 'application/json')
+        with pytest.raises(exceptions.ParseError) as exception:
+            list(items)
+        assert str(exception.value).startswith('JSON parse error in element 0 - ')
+        assert items.bytes_read <= parsers.StreamingJSONParser.chunk_size
+
+    def test_items_split_across_chunks(self):
+        content = '["a \\u2665 string", -Infinity, null, 1.5e10, {"key": [true, false]}]'.encode('utf8')
+        for chunk_size in range(1, 8):
+            assert list(self.parse(content, chunk_size)) == [
+                'a \u2665 string', float('-inf'), None, 1.5e10, {'key': [True, False]}
+            ]
+
+    def test_missing_delimiter(self):
+        with pytest.raises(exceptions.ParseError) as exception:
+            list(self.parse(b'[1, 2 3]'))
+        assert str(exception.value) == "JSON parse error in element 2 - Expecting ',' delimiter"
+
+    def test_truncated_array(self):
+        with pytest.raises(exceptions.ParseError):
+            list(self.parse(b'[1, 2'))
+
+    def test_not_an_array(self):
+        with pytest.raises(exceptions.ParseError) as exception:
+            list(self.parse(b'{"key": 1}'))
+        assert str(exception.value) == 'JSON parse error - Expected a JSON array'
+
+    def test_iter_data(self):
+        app = FlaskAPI(__name__)
+        app.config['MAX_CONTENT_LENGTH'] = 64
+
+        @app.route('/', methods=['POST'])
+        @set_parsers(parsers.StreamingJSONParser)
+        def ingest():
+            return {'total': sum(item['value'] for item in request.iter_data())}
+
+        with app.test_client() as client:
+            data = json.dumps([{'value': 1}, {'value': 2}])
+            response = client.post('/', data=data, content_type='application/json')
+            assert response.status_code == status.HTTP_200_OK
+            assert json.loads(response.get_data().decode('utf8')) == {'total': 3}
+
+            data = '[{"value": 1}, {invalid}]'
+            response = client.post('/', data=data, content_type='application/json')
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+            data = json.dumps([{'value': idx} for idx in range(10)])
+            response = client.post('/', data=data, content_type='application/json')
+            assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+    def test_max_content_length(self):
+        app = FlaskAPI(__name__)
+        app.config['MAX_CONTENT_LENGTH'] = 8
+        kwargs = {
+            'method': 'POST',
+            'input_stream': io.BytesIO(b'[1, 2, 3, 4, 5, 6]'),
+            'content_type': 'application/json',
+            'headers': {'Content-Length': '18'}
+        }
+        with app.test_request_context(**kwargs):
+            request.parser_classes = [parsers.StreamingJSONParser]
+            with pytest.raises(exceptions.RequestEntityTooLarge):
+                list(request.iter_data())
+
+
+class NDJSONParserTests(unittest.TestCase):
+    def test_parse_records(self):
+        parser = parsers.NDJSONParser()
+        stream = io.BytesIO(b'{"key": 1}\n\n[2, 3]\r\n"four"')
+        records = parser.parse(stream, mediatypes.MediaType('application/x-ndjson'))
+        assert list(records) == [{'key': 1}, [2, 3], 'four']
+
+    def test_parse_error_reports_line_number(self):
+        parser = parsers.NDJSONParser()
+        stream = io.BytesIO(b'{"key": 1}\n{invalid}\n')
+        records = parser.parse(stream, mediatypes.MediaType('application/x-ndjson'))
+        assert next(records) == {'key': 1}
+        with pytest.raises(exceptions.ParseError) as exception:
+            next(records)
+        assert str(exception.value).startswith('NDJSON parse error on line 2 - ')
+
+    def test_line_length_limit(self):
+        app = FlaskAPI(__name__)
+        app.config['NDJSON_MAX_LINE_LENGTH'] = 10
+        parser = parsers.NDJSONParser()
+        stream = io.BytesIO(b'[1, 2, 3]\n[1, 2, 3, 4]\n')
+        with app.app_context():
+            records = parser.parse(stream, mediatypes.MediaType('application/x-ndjson'))
+            assert next(records) == [1, 2, 3]
+            with pytest.raises(exceptions.ParseError) as exception:
+                next(records)
+        assert str(exception.value) == 'NDJSON parse error on line 2 - Line exceeds 10 bytes'
+        # The rest of the line was not read.
+        assert stream.tell() == 21
+
+    def test_accessing_ndjson(self):
+        app = FlaskAPI(__name__)
+
+        @app.route('/', methods=['POST'])
+        def records():
+            return {'data': list(request.iter_data())}
+
+        with app.test_client() as client:
+            data = b'{"key": 1}\n{"key": 2}\n'
+            response = client.post('/', data=data, content_type='application/x-ndjson')
+            assert response.status_code == status.HTTP_200_OK
+            data = json.loads(response.get_data().decode('utf8'))
+            assert data['data'] == [{'key': 1}, {'key': 2}]
+
+
+class UploadTests(unittest.TestCase):
+    def setUp(self):
+        self.app = FlaskAPI(__name__)
+        self.sinks = []
+        self.app.config['UPLOAD_CHECKSUMS'] = ['sha256', 'crc32']
+
+        class Sink(object):
+            def __init__(self, name, filename, content_type):
+                self.name = name
+                self.filename = filename
+                self.chunks = []
+                self.closed = self.aborted = False
+
+            def write(self, data):
+                self.chunks.append(data)
+
+            def close(self):
+                self.closed = True
+
+            def abort(self):
+                self.aborted = True
+
+        def sink_factory(name, filename, content_type):
+            if name == 'spooled':
+                return None
+            sink = Sink(name, filename, content_type)
+            self.sinks.append(sink)
+            return sink
+
+        @self.app.route('/', methods=['POST'])
+        def upload():
+            upload = request.files['upload']
+            return {
+                'size': upload.size,
+                'checksums': upload.checksums,
+                'in_memory': not upload.stream._file._rolled,
+                'contents': upload.read().decode('utf8')
+            }
+
+        @self.app.route('/sink/', methods=['POST'])
+        @set_upload_sink(sink_factory)
+        def sink():
+            return {
+                'files': sorted(request.files.keys()),
+                'spooled': request.files['spooled'].read().decode('utf8') if 'spooled' in request.files else None
+            }
+
+    def post(self, path, **files):
+        data = dict((name, (io.BytesIO(contents), name + '.txt')) for name, contents in files.items())
+        with self.app.test_client() as client:
+            response = client.post(path, data=data)
+        return response.status_code, json.loads(response.get_data().decode('utf8'))
+
+    def test_checksums(self):
+        status_code, data = self.post('/', upload=b'file contents')
+        assert status_code == status.HTTP_200_OK
+        assert data['size'] == 13
+        assert data['checksums'] == {
+            'sha256': hashlib.sha256(b'file contents').hexdigest(),
+            'crc32': '%08x' % (zlib.crc32(b'file contents') & 0xffffffff)
+        }
+        assert data['contents'] == 'file contents'
+        assert data['in_memory']
+
+    def test_spool_to_disk(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            self.app.config['UPLOAD_SPOOL_SIZE'] = 1024
+            self.app.config['UPLOAD_TEMP_DIR'] = tempdir
+            status_code, data = self.post('/', upload=b'a' * 4096)
+            assert status_code == status.HTTP_200_OK
+            assert not data['in_memory']
+            assert data['size'] == 4096
+        finally:
+            shutil.rmtree(tempdir)
+
+    def test_sink(self):
+        contents = b'x' * (200 * 1024)
+        status_code, data = self.post('/sink/', upload=contents, other=b'abc', spooled=b'def')
+        assert status_code == status.HTTP_200_OK
+        assert data == {'files': ['other', 'spooled', 'upload'], 'spooled': 'def'}
+        sinks = dict((sink.name, sink) for sink in self.sinks)
+        assert sorted(sinks) == ['other', 'upload']
+        assert b''.join(sinks['upload'].chunks) == contents
+        assert len(sinks['upload'].chunks) > 1
+        assert sinks['upload'].filename == 'upload.txt'
+        assert all(sink.closed for sink in self.sinks)
+
+    def test_max_file_size(self):
+        self.app.config['UPLOAD_MAX_FILE_SIZE'] = 1024
+        status_code, data = self.post('/sink/', upload=b'a' * 2048)
+        assert status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        assert 'upload.txt' in data['message']
+        assert self.sinks[0].aborted and not self.sinks[0].closed
+
+        status_code, data = self.post('/', upload=b'a' * 1024)
+        assert status_code == status.HTTP_200_OK
+
+    def test_max_content_length(self):
+        self.app.config['MAX_CONTENT_LENGTH'] = 1024
+        status_code, data = self.post('/sink/', upload=b'a' * 2048)
+        assert status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        assert self.sinks == []
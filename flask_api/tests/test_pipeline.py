@@ -0,0 +1,67 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask import request
+from flask_api import exceptions, parsers, renderers, FlaskAPI
+from flask_api.decorators import set_parsers
+from flask_api.pipeline import Pipeline, get_pipeline
+import unittest
+import pytest
+
+
+class AnyParser(parsers.BaseParser):
+    media_type = '*/*'
+
+
+class PipelineTests(unittest.TestCase):
+    def test_get_pipeline_is_shared(self):
+        pipeline = get_pipeline([parsers.JSONParser], [renderers.JSONRenderer])
+        other = get_pipeline((parsers.JSONParser,), (renderers.JSONRenderer,))
+        assert pipeline is other
+        assert isinstance(pipeline.parsers[0], parsers.JSONParser)
+        assert str(pipeline.renderer_media_types[0]) == 'application/json'
+
+    def test_select_parser_dispatch(self):
+        pipeline = Pipeline([parsers.JSONParser, parsers.MultiPartParser], [])
+        parser, media_type = pipeline.select_parser('multipart/form-data; boundary=foo')
+        assert parser is pipeline.parsers[1]
+        assert media_type.params == {'boundary': 'foo'}
+
+    def test_select_parser_after_wildcard_parser(self):
+        app = FlaskAPI(__name__)
+        pipeline = Pipeline([AnyParser, parsers.JSONParser], [])
+        with app.test_request_context(content_type='application/json'):
+            parser, media_type = pipeline.select_parser(request.content_type)
+        assert parser is pipeline.parsers[0]
+
+    def test_select_parser_failed(self):
+        app = FlaskAPI(__name__)
+        pipeline = Pipeline([parsers.JSONParser], [])
+        with app.test_request_context(content_type='text/plain'):
+            with pytest.raises(exceptions.UnsupportedMediaType):
+                pipeline.select_parser(request.content_type)
+
+    def test_renderer_instances_are_shared_between_requests(self):
+        app = FlaskAPI(__name__)
+        with app.test_request_context():
+            first = request.accepted_renderer
+        with app.test_request_context():
+            assert request.accepted_renderer is first
+
+    def test_routes_share_compiled_pipelines(self):
+        app = FlaskAPI(__name__)
+
+        def make_view(idx):
+            @set_parsers(parsers.JSONParser)
+            def view():
+                return {'parser': request.pipeline.parsers[0].__class__.__name__}
+            view.__name__ = str('view_%d' % idx)
+            return view
+
+        for idx in range(1000):
+            app.route('/%d/' % idx, methods=['POST'])(make_view(idx))
+
+        pipeline = get_pipeline((parsers.JSONParser,), app.api_settings.DEFAULT_RENDERERS)
+        with app.test_client() as client:
+            response = client.post('/999/')
+            assert response.get_data().decode('utf8') == '{"parser": "JSONParser"}'
+            assert request.pipeline is pipeline
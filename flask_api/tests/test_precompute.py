@@ -0,0 +1,159 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask import request
+from flask_api import status, FlaskAPI
+from flask_api.decorators import precompute
+import json
+import time
+import unittest
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError('Timed out waiting for condition.')
+        time.sleep(0.01)
+
+
+class PrecomputeTests(unittest.TestCase):
+    def setUp(self):
+        app = FlaskAPI(__name__)
+        app.logger.disabled = True
+        self.calls = 0
+        self.fail = False
+
+        @app.route('/', methods=['GET', 'POST'])
+        @precompute(interval=60)
+        def example():
+            if self.fail:
+                raise ValueError('Refresh failed')
+            self.calls += 1
+            return {'calls': self.calls, 'page': request.args.get('page')}
+
+        @app.route('/fast/')
+        @precompute(interval=0.05)
+        def fast():
+            self.calls += 1
+            return {'calls': self.calls}
+
+        self.app = app
+
+    def tearDown(self):
+        self.app.precomputer.stop()
+
+    def get_data(self, response):
+        return json.loads(response.get_data().decode('utf8'))
+
+    def test_precomputed_response(self):
+        with self.app.test_client() as client:
+            response = client.get('/')
+            assert self.get_data(response) == {'calls': 1, 'page': None}
+
+            response = client.get('/')
+            assert response.status_code == status.HTTP_200_OK
+            assert response.content_type == 'application/json'
+            assert self.get_data(response) == {'calls': 1, 'page': None}
+
+            response = client.get('/?page=2')
+            assert self.get_data(response) == {'calls': 2, 'page': '2'}
+
+            response = client.post('/')
+            assert self.get_data(response) == {'calls': 3, 'page': None}
+
+        stats = self.app.precomputer.stats
+        assert stats['hits'] == 1
+        assert stats['misses'] == 2
+        assert len(stats['entries']) == 2
+
+    def test_requests_with_credentials_not_precomputed(self):
+        with self.app.test_client(use_cookies=False) as client:
+            response = client.get('/', headers={'Authorization': 'Token one'})
+            assert self.get_data(response) == {'calls': 1, 'page': None}
+            response = client.get('/', headers={'Cookie': 'session=two'})
+            assert self.get_data(response) == {'calls': 2, 'page': None}
+            response = client.get('/')
+            assert self.get_data(response) == {'calls': 3, 'page': None}
+        assert self.app.precomputer.stats['misses'] == 1
+
+    def test_invalidate(self):
+        with self.app.test_client() as client:
+            client.get('/', headers={'Accept': 'application/json; indent=4'})
+            self.app.precomputer.invalidate('/')
+            wait_for(lambda: self.app.precomputer.stats['refreshes'] == 1)
+
+            # The view was re-run, for the same media type.
+            response = client.get('/', headers={'Accept': 'application/json; indent=4'})
+            assert self.get_data(response) == {'calls': 2, 'page': None}
+            assert b'\n' in response.get_data()
+
+    def test_interval(self):
+        with self.app.test_client() as client:
+            # Responses are refreshed once they have been served again.
+            client.get('/fast/')
+            client.get('/fast/')
+            client.get('/fast/')
+            wait_for(lambda: self.app.precomputer.stats['refreshes'] >= 2)
+            response = client.get('/fast/')
+            assert self.get_data(response)['calls'] >= 3
+
+    def test_refresh_failure(self):
+        with self.app.test_client() as client:
+            client.get('/')
+            self.fail = True
+            self.app.precomputer.invalidate()
+            wait_for(lambda: self.app.precomputer.stats['failures'] == 1)
+
+            # The previous response continues to be served.
+            response = client.get('/')
+            assert self.get_data(response) == {'calls': 1, 'page': None}
+
+        entry = self.app.precomputer.stats['entries'][0]
+        assert entry['last_error'] == 'ValueError: Refresh failed'
+        assert entry['last_duration'] is not None
+
+    def test_one_off_requests_not_refreshed(self):
+        with self.app.test_client() as client:
+            for idx in range(20):
+                client.get('/fast/?junk=%d' % idx)
+            time.sleep(0.3)
+        assert self.calls == 20
+        assert self.app.precomputer.stats['refreshes'] == 0
+
+    def test_max_entries(self):
+        self.app.precomputer.max_entries = 2
+        with self.app.test_client() as client:
+            client.get('/?page=1')
+            client.get('/?page=2')
+            client.get('/?page=1')
+            client.get('/?page=3')
+            response = client.get('/?page=1')
+            assert self.get_data(response) == {'calls': 1, 'page': '1'}
+            response = client.get('/?page=2')
+            assert self.get_data(response) == {'calls': 4, 'page': '2'}
+        assert self.app.precomputer.stats['evictions'] == 2
+
+    def test_max_stale(self):
+        self.app.precomputer.max_stale = 0.001
+        with self.app.test_client() as client:
+            client.get('/')
+            time.sleep(0.1)
+            self.fail = True
+            response = client.get('/')
+            # The failing view is run, rather than serving a stale response.
+            assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    def test_after_request_applied_once(self):
+        @self.app.after_request
+        def add_header(response):
+            response.headers.add('X-Example', 'a')
+            return response
+
+        with self.app.test_client() as client:
+            client.get('/')
+            client.get('/')
+            self.app.precomputer.invalidate('/')
+            wait_for(lambda: self.app.precomputer.stats['refreshes'] == 1)
+            response = client.get('/')
+            assert self.get_data(response) == {'calls': 2, 'page': None}
+            assert response.headers.getlist('X-Example') == ['a']
@@ -1,9 +1,16 @@
 # coding: utf8
 from __future__ import unicode_literals
-from flask_api import renderers, status, FlaskAPI
+from flask import request
+from flask_api import cbor, renderers, status, FlaskAPI
+from flask_api.compat import msgpack
 from flask_api.decorators import set_renderers
 from flask_api.mediatypes import MediaType
+from flask_api.settings import DEFAULTS
+from flask_api.streaming import StreamingList
+import datetime
+import json
 import unittest
+import uuid
 import pytest
 
 
@@ -11,13 +18,13 @@ class RendererTests(unittest.TestCase):
     def test_render_json(self):
         renderer = renderers.JSONRenderer()
         content = renderer.render({'example': 'example'}, MediaType('application/json'))
-        expected = '{"example": "example"}'
+        expected = b'{"example": "example"}'
         assert content == expected
 
     def test_render_json_with_indent(self):
         renderer = renderers.JSONRenderer()
         content = renderer.render({'example': 'example'}, MediaType('application/json; indent=4'))
-        expected = '{\n    "example": "example"\n}'
+        expected = b'{\n    "example": "example"\n}'
         assert content == expected
 
     def test_render_browsable_encoding(self):
@@ -120,3 +127,178 @@ class OverrideParserSettings(unittest.TestCase):
             assert response.headers['Content-Type'] == 'application/example2'
             data = response.get_data().decode('utf8')
             assert data == "custom renderer 2"
+
+
+class StreamingRendererTests(unittest.TestCase):
+    def setUp(self):
+        app = FlaskAPI(__name__)
+        app.config['STREAMING_CHUNK_SIZE'] = 2
+        self.produced = []
+
+        def generate(count):
+            for idx in range(count):
+                self.produced.append(idx)
+                yield {'idx': idx}
+
+        @app.route('/generator/')
+        def generator():
+            return generate(5)
+
+        @app.route('/empty/')
+        def empty():
+            return generate(0)
+
+        @app.route('/streaming_list/')
+        def streaming_list():
+            return StreamingList(generate(5), chunk_size=5), status.HTTP_201_CREATED
+
+        self.app = app
+
+    def test_render_stream(self):
+        renderer = renderers.JSONRenderer()
+        data = StreamingList(iter([1, {'two': 2}, [3]]), chunk_size=2)
+        chunks = list(renderer.render(data, MediaType('application/json')))
+        assert chunks == [b'[1, {"two": 2}', b', [3]', b']']
+
+    def test_render_stream_with_indent(self):
+        renderer = renderers.JSONRenderer()
+        data = [{'one': 1}, [2]]
+        media_type = MediaType('application/json; indent=4')
+        expected = renderer.render(data, media_type)
+        content = b''.join(renderer.render(StreamingList(data), media_type))
+        assert content == expected
+
+    def test_render_empty_stream(self):
+        renderer = renderers.JSONRenderer()
+        for indent in ('0', '4'):
+            media_type = MediaType('application/json; indent=%s' % indent)
+            content = b''.join(renderer.render(StreamingList([]), media_type))
+            assert content == b'[]'
+
+    def test_streamed_response_is_incremental(self):
+        with self.app.test_client() as client:
+            response = client.get('/generator/', buffered=False)
+            assert response.status_code == status.HTTP_200_OK
+            assert response.headers['Content-Type'] == 'application/json'
+            assert 'Content-Length' not in response.headers
+            chunks = iter(response.response)
+            assert next(chunks) == b'[{"idx": 0}, {"idx": 1}'
+            assert self.produced == [0, 1]
+            rest = b''.join(chunks)
+        content = json.loads((b'[{"idx": 0}, {"idx": 1}' + rest).decode('utf8'))
+        assert content == [{'idx': idx} for idx in range(5)]
+
+    def test_streamed_empty_response(self):
+        with self.app.test_client() as client:
+            response = client.get('/empty/')
+            assert response.get_data() == b'[]'
+
+    def test_streaming_list(self):
+        with self.app.test_client() as client:
+            response = client.get('/streaming_list/')
+            assert response.status_code == status.HTTP_201_CREATED
+            content = json.loads(response.get_data().decode('utf8'))
+            assert content == [{'idx': idx} for idx in range(5)]
+
+    def test_browsable_api_renders_stream(self):
+        with self.app.test_client() as client:
+            response = client.get('/generator/', headers={'Accept': 'text/html'})
+            assert response.status_code == status.HTTP_200_OK
+            assert '"idx": 4' in response.get_data().decode('utf8')
+
+
+class NDJSONRendererTests(unittest.TestCase):
+    def test_render_ndjson(self):
+        renderer = renderers.NDJSONRenderer()
+        content = renderer.render([{'one': 1}, [2]], MediaType('application/x-ndjson'))
+        assert content == b'{"one": 1}\n[2]\n'
+
+    def test_render_ndjson_single_record(self):
+        renderer = renderers.NDJSONRenderer()
+        content = renderer.render({'one': 1}, MediaType('application/x-ndjson'))
+        assert content == b'{"one": 1}\n'
+
+    def test_render_ndjson_stream(self):
+        renderer = renderers.NDJSONRenderer()
+        data = StreamingList(iter([1, 2, 3]), chunk_size=2)
+        chunks = list(renderer.render(data, MediaType('application/x-ndjson')))
+        assert chunks == [b'1\n2\n', b'3\n']
+
+    def test_negotiate_ndjson(self):
+        app = FlaskAPI(__name__)
+
+        @app.route('/records/')
+        def records():
+            return ({'idx': idx} for idx in range(3))
+
+        with app.test_client() as client:
+            response = client.get('/records/', headers={'Accept': 'application/x-ndjson'})
+            assert response.status_code == status.HTTP_200_OK
+            assert response.headers['Content-Type'] == 'application/x-ndjson'
+            assert response.get_data() == b'{"idx": 0}\n{"idx": 1}\n{"idx": 2}\n'
+
+
+class BinaryRendererTests(unittest.TestCase):
+    def setUp(self):
+        app = FlaskAPI(__name__)
+
+        @app.route('/example/', methods=['GET', 'POST'])
+        def example():
+            if request.method == 'POST':
+                return {'data': request.data}
+            return {
+                'text': 'I ♥ Python',
+                'date': datetime.date(2017, 1, 2),
+                'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            }
+
+        @app.route('/stream/')
+        def stream():
+            return (idx for idx in range(3))
+
+        self.app = app
+        self.expected = {
+            'text': 'I ♥ Python',
+            'date': 'Mon, 02 Jan 2017 00:00:00 GMT',
+            'uuid': '12345678-1234-5678-1234-567812345678',
+        }
+
+    def test_cbor(self):
+        with self.app.test_client() as client:
+            response = client.get('/example/', headers={'Accept': 'application/cbor'})
+            assert response.headers['Content-Type'] == 'application/cbor'
+            assert cbor.loads(response.get_data()) == self.expected
+
+            content = cbor.dumps({'example': [1, 2.5, None]})
+            response = client.post('/example/', data=content, content_type='application/cbor')
+            assert json.loads(response.get_data().decode('utf8')) == {'data': {'example': [1, 2.5, None]}}
+
+            response = client.post('/example/', data=b'\xa1', content_type='application/cbor')
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_cbor_stream(self):
+        with self.app.test_client() as client:
+            response = client.get('/stream/', headers={'Accept': 'application/cbor'})
+            assert response.get_data() == b'\x9f\x00\x01\x02\xff'
+            assert cbor.loads(response.get_data()) == [0, 1, 2]
+
+    @pytest.mark.skipif(msgpack is None, reason='msgpack is not installed')
+    def test_msgpack(self):
+        with self.app.test_client() as client:
+            # MessagePack is not enabled by default.
+            response = client.get('/example/', headers={'Accept': 'application/msgpack'})
+            assert response.status_code == status.HTTP_406_NOT_ACCEPTABLE
+
+        self.app.config['DEFAULT_PARSERS'] = DEFAULTS['DEFAULT_PARSERS'] + ['flask_api.parsers.MessagePackParser']
+        self.app.config['DEFAULT_RENDERERS'] = DEFAULTS['DEFAULT_RENDERERS'] + ['flask_api.renderers.MessagePackRenderer']
+        with self.app.test_client() as client:
+            response = client.get('/example/', headers={'Accept': 'application/msgpack'})
+            assert response.headers['Content-Type'] == 'application/msgpack'
+            assert msgpack.unpackb(response.get_data(), raw=False) == self.expected
+
+            content = msgpack.packb({'example': [1, 2.5, None]}, use_bin_type=True)
+            response = client.post('/example/', data=content, content_type='application/msgpack')
+            assert json.loads(response.get_data().decode('utf8')) == {'data': {'example': [1, 2.5, None]}}
+
+            response = client.post('/example/', data=b'\x81', content_type='application/msgpack')
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
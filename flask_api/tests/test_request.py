@@ -2,8 +2,11 @@
 from __future__ import unicode_literals
 from flask import request
 from flask_api import exceptions
+from flask_api.decorators import disable_method_overloading, set_max_content_length, set_parsers
+from flask_api.parsers import JSONParser
 import flask_api
 import io
+import json
 import unittest
 import pytest
 
@@ -50,3 +53,146 @@ class MediaTypeParsingTests(unittest.TestCase):
         """
         with app.test_request_context(method='GET', path='/?a=b'):
             assert request.full_path == '/?a=b'
+
+
+class MethodOverloadingTests(unittest.TestCase):
+    def setUp(self):
+        self.app = flask_api.FlaskAPI(__name__)
+
+        @self.app.route('/', methods=['POST', 'PUT'])
+        def example():
+            return {'method': request.method, 'data': request.data}
+
+        @self.app.route('/no-overloading/', methods=['POST', 'PUT'])
+        @disable_method_overloading
+        def no_overloading():
+            return {'method': request.method, 'data': request.data}
+
+    def post(self, path, data):
+        kwargs = {
+            'method': 'POST',
+            'input_stream': io.BytesIO(data),
+            'content_type': 'application/x-www-form-urlencoded',
+            'content_length': len(data)
+        }
+        return self.app.test_request_context(path, **kwargs)
+
+    def test_method_overloading(self):
+        with self.post('/', b'_method=PUT&example=abc'):
+            assert request.method == 'PUT'
+            assert request.url_rule.rule == '/'
+            assert request.data['example'] == 'abc'
+
+    def test_content_overloading(self):
+        with self.post('/', b'_content=%7B%22example%22%3A+1%7D&_content_type=application%2Fjson'):
+            assert request.data == {'example': 1}
+
+    def test_form_decoded_once(self):
+        for size in (1024, 1024 * 1024, 10 * 1024 * 1024):
+            value = 'a' * (size - len('_method=PUT&example='))
+            body = ('_method=PUT&example=' + value).encode('ascii')
+            with self.post('/', body):
+                form = request._form_data
+                assert request.method == 'PUT'
+                # The parser is given the form decoded for overloading.
+                assert request.data is form
+                assert request.form['example'] == value
+                assert request.get_buffered_body() == body
+
+    def test_disabled_by_setting(self):
+        self.app.config['METHOD_OVERLOADING'] = False
+        with self.post('/', b'_method=PUT&example=abc'):
+            assert request.method == 'POST'
+            assert request._form_data is None
+            assert request.data['_method'] == 'PUT'
+
+    def test_disabled_by_view(self):
+        with self.post('/no-overloading/', b'_method=PUT&example=abc'):
+            assert request.method == 'POST'
+            assert request.data['_method'] == 'PUT'
+
+
+class UnreadableStream(io.BytesIO):
+    def read(self, *args):
+        raise AssertionError('The request body should not be read.')
+
+    readline = readinto = read
+
+
+class EarlyBodyCheckTests(unittest.TestCase):
+    def setUp(self):
+        self.app = flask_api.FlaskAPI(__name__)
+        self.app.config['EARLY_BODY_CHECKS'] = True
+        self.app.config['MAX_CONTENT_LENGTH'] = 1024
+        self.calls = 0
+
+        @self.app.route('/', methods=['POST'])
+        def example():
+            self.calls += 1
+            return {'data': request.data}
+
+        @self.app.route('/json/', methods=['POST'])
+        @set_parsers(JSONParser)
+        def json_only():
+            self.calls += 1
+            return {'data': request.data}
+
+        @self.app.route('/large/', methods=['POST'])
+        @set_max_content_length(4096)
+        def large():
+            self.calls += 1
+            return {'data': request.data, 'max_content_length': request.max_content_length}
+
+    def post(self, path, length, content_type='application/json', body=None, headers=None):
+        with self.app.test_client() as client:
+            return client.post(
+                path,
+                input_stream=UnreadableStream() if body is None else io.BytesIO(body),
+                content_type=content_type,
+                headers=headers,
+                environ_overrides={'CONTENT_LENGTH': str(length)}
+            )
+
+    def test_too_large(self):
+        response = self.post('/', 2048, headers={'Expect': '100-continue'})
+        assert response.status_code == 413
+        assert response.headers['Connection'] == 'close'
+        assert self.calls == 0
+
+    def test_unsupported_media_type(self):
+        response = self.post('/', 10, content_type='text/plain')
+        assert response.status_code == 415
+        assert response.headers['Connection'] == 'close'
+
+        response = self.post('/json/', 10, content_type='multipart/form-data; boundary=example')
+        assert response.status_code == 415
+        assert self.calls == 0
+
+    def test_unsupported_content_encoding(self):
+        response = self.post('/', 10, headers={'Content-Encoding': 'unknown'})
+        assert response.status_code == 415
+
+    def test_oversized_form_not_read_for_overloading(self):
+        response = self.post('/', 2048, content_type='application/x-www-form-urlencoded')
+        assert response.status_code == 413
+
+    def test_route_limit(self):
+        body = b'"' + b'a' * 2046 + b'"'
+        response = self.post('/large/', len(body), body=body)
+        assert response.status_code == 200
+        assert json.loads(response.get_data().decode('utf8'))['max_content_length'] == 4096
+
+        response = self.post('/large/', 8192)
+        assert response.status_code == 413
+
+    def test_accepted(self):
+        body = b'{"example": 1}'
+        response = self.post('/json/', len(body), body=body)
+        assert response.status_code == 200
+        assert 'Connection' not in response.headers
+
+    def test_disabled(self):
+        self.app.config['EARLY_BODY_CHECKS'] = False
+        response = self.post('/', 10, content_type='text/plain', body=b'0123456789')
+        assert response.status_code == 415
+        assert self.calls == 1
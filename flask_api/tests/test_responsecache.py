@@ -0,0 +1,258 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask import request
+from flask_api import responsecache, status, FlaskAPI
+from flask_api.compression import GzipCompressor
+from flask_api.decorators import cache_response
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+
+class MemoryCacheTests(unittest.TestCase):
+    def test_get_and_set(self):
+        cache = responsecache.MemoryCache()
+        assert cache.get(b'key') is None
+        cache.set(b'key', b'value', 60)
+        assert cache.get(b'key') == b'value'
+        assert cache.stats['hits'] == 1
+        assert cache.stats['misses'] == 1
+        assert cache.stats['bytes'] == 8
+
+    def test_timeout(self):
+        cache = responsecache.MemoryCache()
+        cache.set(b'key', b'value', -1)
+        assert cache.get(b'key') is None
+        assert cache.stats['bytes'] == 0
+
+    def test_evicts_least_recently_used(self):
+        cache = responsecache.MemoryCache(max_bytes=20)
+        cache.set(b'a', b'1' * 9, 60)
+        cache.set(b'b', b'2' * 9, 60)
+        cache.get(b'a')
+        cache.set(b'c', b'3' * 9, 60)
+        assert cache.get(b'a') == b'1' * 9
+        assert cache.get(b'b') is None
+        assert cache.stats['evictions'] == 1
+        assert cache.stats['bytes'] == 20
+
+        # Values which would not fit in the cache are not stored.
+        cache.set(b'd', b'4' * 20, 60)
+        assert cache.get(b'd') is None
+
+
+class MMapCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_get_and_set(self):
+        cache = responsecache.MMapCache(self.path, max_bytes=64 * 1024, slot_size=1024)
+        assert cache.get(b'key') is None
+        cache.set(b'key', b'value', 60)
+        assert cache.get(b'key') == b'value'
+        cache.set(b'key', b'other', 60)
+        assert cache.get(b'key') == b'other'
+        assert cache.stats['size'] == 1
+        assert cache.stats['bytes'] == 5
+
+        cache.set(b'large', b'0' * 1024, 60)
+        assert cache.get(b'large') is None
+
+    def test_shared_between_instances(self):
+        # Each worker process opens its own instance on the same file.
+        cache = responsecache.MMapCache(self.path, max_bytes=64 * 1024, slot_size=1024)
+        other = responsecache.MMapCache(self.path, max_bytes=64 * 1024, slot_size=1024)
+        cache.set(b'key', b'value', 60)
+        assert other.get(b'key') == b'value'
+        assert cache.stats['hits'] == 1
+        other.close()
+        cache.close()
+
+    def test_timeout(self):
+        cache = responsecache.MMapCache(self.path, max_bytes=64 * 1024, slot_size=1024)
+        cache.set(b'key', b'value', -1)
+        assert cache.get(b'key') is None
+        assert cache.stats['size'] == 0
+
+    def test_evicts_least_recently_used(self):
+        # A single set of two slots.
+        cache = responsecache.MMapCache(self.path, max_bytes=2048, slot_size=1024, ways=2)
+        cache.set(b'a', b'1', 60)
+        cache.set(b'b', b'2', 60)
+        time.sleep(0.01)
+        cache.get(b'a')
+        cache.set(b'c', b'3', 60)
+        assert cache.get(b'a') == b'1'
+        assert cache.get(b'b') is None
+        assert cache.get(b'c') == b'3'
+        assert cache.stats['evictions'] == 1
+
+    def test_add_checks_every_slot_in_the_set(self):
+        # A single set, where the key is stored after a slot that is freed.
+        cache = responsecache.MMapCache(self.path, max_bytes=4096, slot_size=1024, ways=4)
+        cache.set(b'other', b'1', 60)
+        cache.set(b'key', b'2', 60)
+        cache.delete(b'other')
+        assert not cache.add(b'key', b'3', 60)
+        assert cache.get(b'key') == b'2'
+        cache.set(b'key', b'4', 60)
+        assert cache.get(b'key') == b'4'
+        assert cache.stats['size'] == 1
+
+    def test_clear(self):
+        cache = responsecache.MMapCache(self.path, max_bytes=64 * 1024, slot_size=1024)
+        cache.set(b'key', b'value', 60)
+        cache.get(b'key')
+        cache.clear()
+        assert cache.get(b'key') is None
+        assert cache.stats['hits'] == 0
+
+
+class CacheResponseTests(unittest.TestCase):
+    def setUp(self):
+        app = FlaskAPI(__name__)
+        self.calls = 0
+
+        @app.route('/', methods=['GET', 'POST'])
+        @cache_response(timeout=60)
+        def example():
+            self.calls += 1
+            return {'calls': self.calls}
+
+        @app.route('/private/')
+        @cache_response()
+        def private():
+            self.calls += 1
+            return {'calls': self.calls}, {'Cache-Control': 'private'}
+
+        @app.route('/cookie/')
+        @cache_response()
+        def cookie():
+            self.calls += 1
+            return {'calls': self.calls}, {'Vary': 'Cookie'}
+
+        @app.route('/large/')
+        @cache_response()
+        def large():
+            self.calls += 1
+            return {'text': 'x' * 1000}
+
+        @app.route('/user/')
+        @cache_response(per_client=True)
+        def user():
+            self.calls += 1
+            return {'user': request.headers.get('Authorization'), 'calls': self.calls}
+
+        self.app = app
+
+    def get_data(self, response):
+        return json.loads(response.get_data().decode('utf8'))
+
+    def test_cached_response(self):
+        with self.app.test_client() as client:
+            response = client.get('/')
+            assert self.get_data(response) == {'calls': 1}
+            assert response.headers['Vary'] == 'Accept'
+
+            response = client.get('/')
+            assert response.status_code == status.HTTP_200_OK
+            assert response.content_type == 'application/json'
+            assert response.headers['Vary'] == 'Accept'
+            assert self.get_data(response) == {'calls': 1}
+            assert self.app.response_cache.stats['hits'] == 1
+
+    def test_key_includes_query_and_media_type(self):
+        with self.app.test_client() as client:
+            client.get('/')
+            response = client.get('/?page=2')
+            assert self.get_data(response) == {'calls': 2}
+
+            response = client.get('/', headers={'Accept': 'application/json; indent=4'})
+            assert self.get_data(response) == {'calls': 3}
+            assert b'\n' in response.get_data()
+
+            response = client.get('/', headers={'Accept': 'text/html'})
+            assert response.content_type == 'text/html'
+            assert self.calls == 4
+
+    def test_unsafe_methods_not_cached(self):
+        with self.app.test_client() as client:
+            client.post('/')
+            response = client.post('/')
+            assert self.get_data(response) == {'calls': 2}
+
+    def test_private_responses_not_cached(self):
+        with self.app.test_client() as client:
+            client.get('/private/')
+            response = client.get('/private/')
+            assert self.get_data(response) == {'calls': 2}
+
+    def test_responses_varying_on_other_headers_not_cached(self):
+        with self.app.test_client() as client:
+            client.get('/cookie/', headers={'Cookie': 'session=one'})
+            response = client.get('/cookie/', headers={'Cookie': 'session=two'})
+            assert self.get_data(response) == {'calls': 2}
+
+    def test_requests_with_credentials_not_cached(self):
+        with self.app.test_client(use_cookies=False) as client:
+            client.get('/', headers={'Authorization': 'Token one'})
+            response = client.get('/', headers={'Authorization': 'Token two'})
+            assert self.get_data(response) == {'calls': 2}
+            response = client.get('/', headers={'Cookie': 'session=one'})
+            assert self.get_data(response) == {'calls': 3}
+            assert self.app.response_cache.stats['size'] == 0
+
+            # Anonymous requests are not served a response to a client with credentials.
+            response = client.get('/')
+            assert self.get_data(response) == {'calls': 4}
+
+    def test_per_client_responses(self):
+        with self.app.test_client(use_cookies=False) as client:
+            for idx in range(2):
+                one = client.get('/user/', headers={'Authorization': 'Token one'})
+                two = client.get('/user/', headers={'Authorization': 'Token two'})
+                assert self.get_data(one) == {'user': 'Token one', 'calls': 1}
+                assert self.get_data(two) == {'user': 'Token two', 'calls': 2}
+
+    def test_cached_bodies_precompressed(self):
+        self.app.config['COMPRESSION'] = True
+        self.app.config['COMPRESSION_ENCODINGS'] = ['gzip']
+        original = GzipCompressor.compress
+        with mock.patch.object(GzipCompressor, 'compress', autospec=True, side_effect=original) as compress:
+            with self.app.test_client() as client:
+                for idx in range(3):
+                    response = client.get('/large/', headers={'Accept-Encoding': 'gzip'})
+                    assert response.headers['Content-Encoding'] == 'gzip'
+                    assert json.loads(gzip.decompress(response.get_data()).decode('utf8'))['text'] == 'x' * 1000
+        assert self.calls == 1
+        assert compress.call_count == 1
+
+    def test_backend_setting(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            self.app.config['RESPONSE_CACHE_BACKEND'] = 'flask_api.responsecache.MMapCache'
+            self.app.config['RESPONSE_CACHE_OPTIONS'] = {
+                'path': os.path.join(tempdir, 'cache'),
+                'max_bytes': 64 * 1024
+            }
+            with self.app.test_client() as client:
+                client.get('/')
+                response = client.get('/')
+                assert self.get_data(response) == {'calls': 1}
+            assert isinstance(self.app.response_cache, responsecache.MMapCache)
+            self.app.response_cache.close()
+        finally:
+            shutil.rmtree(tempdir)
@@ -0,0 +1,109 @@
+# coding: utf8
+from __future__ import unicode_literals
+from flask import request
+from flask_api import exceptions, status, FlaskAPI
+from flask_api.decorators import validate_data
+from flask_api.schema import get_schema, Optional, Schema
+from werkzeug.datastructures import MultiDict
+import json
+import pytest
+import unittest
+
+
+NOTE = {
+    'text': str,
+    'priority': Optional(int, default=0),
+    'tags': [{'name': str, 'weight': float}],
+    'done': Optional(bool, default=False),
+    'extra': Optional(object)
+}
+
+
+class SchemaTests(unittest.TestCase):
+    def setUp(self):
+        self.schema = Schema(NOTE)
+
+    def test_valid(self):
+        data = {'text': 'example', 'priority': 2, 'tags': [{'name': 'a', 'weight': 1.5}], 'done': True}
+        assert self.schema.validate(data) == dict(data, extra=None)
+
+    def test_defaults_and_unknown_fields(self):
+        data = {'text': 'example', 'priority': None, 'tags': [], 'other': 1}
+        assert self.schema.validate(data) == {
+            'text': 'example', 'priority': 0, 'tags': [], 'done': False, 'extra': None
+        }
+
+    def test_coercion(self):
+        data = MultiDict([('text', 'example'), ('priority', ' 3 '), ('tags', []), ('done', 'true')])
+        result = self.schema.validate(data)
+        assert result['priority'] == 3
+        assert result['done'] is True
+        assert get_schema([float]).validate([1, '2.5']) == [1.0, 2.5]
+
+    def test_every_error_reported(self):
+        data = {'priority': 'high', 'tags': [{'name': 'a', 'weight': 'heavy'}, 'b', {'weight': True}]}
+        with pytest.raises(exceptions.ParseError) as exception:
+            self.schema.validate(data)
+        assert exception.value.errors == {
+            'text': 'This field is required.',
+            'priority': 'Must be an integer.',
+            'tags.0.weight': 'Must be a number.',
+            'tags.1': 'Must be an object.',
+            'tags.2.name': 'This field is required.',
+            'tags.2.weight': 'Must be a number.'
+        }
+
+    def test_invalid_scalars(self):
+        for schema, value in ((int, True), (int, 1.5), (float, 'nan'), (str, 1), (bool, 'maybe'), ([int], 'abc')):
+            with pytest.raises(exceptions.ParseError):
+                get_schema(schema).validate(value)
+
+    def test_invalid_schema(self):
+        with pytest.raises(TypeError):
+            Schema({'text': set})
+        with pytest.raises(TypeError):
+            Schema({1: int})
+
+    def test_get_schema(self):
+        assert get_schema(self.schema) is self.schema
+
+
+class ValidateDataTests(unittest.TestCase):
+    def setUp(self):
+        app = FlaskAPI(__name__)
+
+        @app.route('/', methods=['GET', 'POST'])
+        @validate_data({'text': str, 'priority': Optional(int, default=0)})
+        def create():
+            return {'data': request.data}
+
+        self.app = app
+        self.view = create
+
+    def test_valid(self):
+        with self.app.test_client() as client:
+            response = client.post('/', data=json.dumps({'text': 'example'}), content_type='application/json')
+        assert response.status_code == status.HTTP_200_OK
+        assert json.loads(response.get_data().decode('utf8')) == {'data': {'text': 'example', 'priority': 0}}
+
+    def test_form_data_coerced(self):
+        with self.app.test_client() as client:
+            response = client.post('/', data={'text': 'example', 'priority': '2'})
+        assert json.loads(response.get_data().decode('utf8')) == {'data': {'text': 'example', 'priority': 2}}
+
+    def test_invalid(self):
+        with self.app.test_client() as client:
+            response = client.post('/', data=json.dumps({'priority': 'high'}), content_type='application/json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert json.loads(response.get_data().decode('utf8')) == {
+            'message': 'Invalid request data.',
+            'errors': {'text': 'This field is required.', 'priority': 'Must be an integer.'}
+        }
+
+    def test_other_methods_not_validated(self):
+        with self.app.test_client() as client:
+            response = client.get('/')
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_compiled_on_registration(self):
+        assert isinstance(self.view.data_schema, Schema)
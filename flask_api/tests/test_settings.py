@@ -1,5 +1,6 @@
 # coding: utf8
 from __future__ import unicode_literals
+from flask_api import renderers
 from flask_api.settings import APISettings
 import unittest
 import pytest
@@ -20,3 +21,38 @@ class SettingsTests(unittest.TestCase):
             "'DEFAULT_PARSERS'. No module named 'foobarz'."
         )
         assert msg in (excepted_py2, excepted_py3)
+
+    def test_imports_are_cached_as_tuples(self):
+        settings = APISettings({})
+        parsers = settings.DEFAULT_PARSERS
+        assert isinstance(parsers, tuple)
+        assert settings.DEFAULT_PARSERS is parsers
+
+    def test_replaced_setting_is_reimported(self):
+        config = {'DEFAULT_RENDERERS': ['flask_api.renderers.JSONRenderer']}
+        settings = APISettings(config)
+        assert settings.DEFAULT_RENDERERS == (renderers.JSONRenderer,)
+        config['DEFAULT_RENDERERS'] = ['flask_api.renderers.HTMLRenderer']
+        assert settings.DEFAULT_RENDERERS == (renderers.HTMLRenderer,)
+
+    def test_invalidate(self):
+        config = {'DEFAULT_RENDERERS': ['flask_api.renderers.JSONRenderer']}
+        settings = APISettings(config)
+        assert settings.DEFAULT_RENDERERS == (renderers.JSONRenderer,)
+        config['DEFAULT_RENDERERS'].append('flask_api.renderers.HTMLRenderer')
+        assert settings.DEFAULT_RENDERERS == (renderers.JSONRenderer,)
+        settings.invalidate()
+        assert settings.DEFAULT_RENDERERS == (renderers.JSONRenderer, renderers.HTMLRenderer)
+
+    def test_freeze(self):
+        config = {'DEFAULT_RENDERERS': ['flask_api.renderers.JSONRenderer']}
+        settings = APISettings(config)
+        settings.freeze()
+        config['DEFAULT_RENDERERS'] = ['flask_api.renderers.HTMLRenderer']
+        assert settings.DEFAULT_RENDERERS == (renderers.JSONRenderer,)
+
+    def test_freeze_bad_import(self):
+        settings = APISettings({'DEFAULT_RENDERERS': ['foobarz.FailedImport']})
+        with pytest.raises(ImportError):
+            settings.freeze()
+        assert not settings.frozen
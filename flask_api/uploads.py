@@ -0,0 +1,186 @@
+# coding: utf8
+"""
+Handling of files uploaded in multipart request bodies.
+
+Each file is written to a temporary file as it is parsed, which is held in
+memory until it reaches the spool size, or passed directly to an upload
+sink, if the view has set one with `set_upload_sink`.  Checksums and size
+limits are applied as each chunk is received, so that uploads which are too
+large are rejected without reading the rest of the request.
+"""
+from __future__ import unicode_literals
+from flask_api import exceptions
+from tempfile import SpooledTemporaryFile
+from werkzeug.formparser import MultiPartParser
+from werkzeug.http import parse_options_header
+import functools
+import hashlib
+import io
+import zlib
+
+
+class CRC32(object):
+    """
+    A CRC-32 checksum, with the same interface as the `hashlib` hashes.
+    """
+    name = 'crc32'
+
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+
+    def hexdigest(self):
+        return '%08x' % (self.value & 0xffffffff)
+
+
+def get_checksum(name):
+    if name == 'crc32':
+        return CRC32()
+    return hashlib.new(name)
+
+
+class SizeLimit(object):
+    """
+    Counts the bytes received across every file in a request.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+
+    def add(self, size):
+        self.size += size
+        if self.max_size is not None and self.size > self.max_size:
+            raise exceptions.RequestEntityTooLarge()
+
+
+class UploadFile(object):
+    """
+    Receives the content of an uploaded file as it is parsed, writing it to
+    `sink`, if given, or otherwise to a temporary file, which is held in
+    memory until it exceeds `spool_size` bytes.
+
+    Available as the stream of the file in `request.files`, so that the
+    `size`, `checksums` and `sink` attributes may be read from there.
+    """
+
+    def __init__(self, filename, content_type, spool_size, temp_dir=None,
+                 checksums=(), max_size=None, total=None, sink=None):
+        self.filename = filename
+        self.content_type = content_type
+        self.max_size = max_size
+        self.total = total
+        self.sink = sink
+        self.size = 0
+        self.finished = False
+        self._checksums = [get_checksum(name) for name in checksums]
+        if sink is None:
+            self._file = SpooledTemporaryFile(max_size=spool_size, mode='wb+', dir=temp_dir)
+        else:
+            self._file = io.BytesIO()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            msg = 'File "%s" exceeds the maximum size of %d bytes.' % (self.filename, self.max_size)
+            raise exceptions.RequestEntityTooLarge(msg)
+        if self.total is not None:
+            self.total.add(len(data))
+        for checksum in self._checksums:
+            checksum.update(data)
+        if self.sink is None:
+            self._file.write(data)
+        else:
+            self.sink.write(data)
+
+    def finish(self):
+        """
+        Called once the whole request body has been parsed, closing the sink.
+        """
+        if self.finished:
+            return
+        self.finished = True
+        if self.sink is not None and hasattr(self.sink, 'close'):
+            self.sink.close()
+
+    def abort(self):
+        """
+        Called if the request body could not be parsed.
+        """
+        if self.finished:
+            return
+        self.finished = True
+        if self.sink is not None and hasattr(self.sink, 'abort'):
+            self.sink.abort()
+
+    @property
+    def checksums(self):
+        """
+        A dictionary of the hex digests of the file content.
+        """
+        return dict((checksum.name, checksum.hexdigest()) for checksum in self._checksums)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+class UploadStreamFactory(object):
+    """
+    Creates an `UploadFile` for each file in a multipart request body, for
+    use as the multipart parser's `stream_factory`.
+
+    `sink_factory` is called with the field name, filename and content type
+    of each file, and should return an object with a `write()` method, and
+    optionally `close()` and `abort()` methods, or `None` to spool the file
+    as usual.
+    """
+
+    def __init__(self, spool_size=500 * 1024, temp_dir=None, checksums=(),
+                 max_file_size=None, max_size=None, sink_factory=None):
+        self.spool_size = spool_size
+        self.temp_dir = temp_dir
+        self.checksums = checksums
+        self.max_file_size = max_file_size
+        self.sink_factory = sink_factory
+        self.total = SizeLimit(max_size)
+        self.files = []
+
+    def __call__(self, total_content_length, filename, content_type, content_length=None, name=None):
+        sink = None
+        if self.sink_factory is not None:
+            sink = self.sink_factory(name, filename, content_type)
+        upload = UploadFile(
+            filename, content_type, self.spool_size, self.temp_dir,
+            self.checksums, self.max_file_size, self.total, sink
+        )
+        self.files.append(upload)
+        return upload
+
+    def finish(self):
+        for upload in self.files:
+            upload.finish()
+
+    def abort(self):
+        for upload in self.files:
+            upload.abort()
+
+
+class UploadMultiPartParser(MultiPartParser):
+    """
+    Passes the field name of each file to the stream factory, which
+    Werkzeug does not include in its arguments.
+    """
+
+    def start_file_streaming(self, filename, headers, total_content_length):
+        name = parse_options_header(headers.get('content-disposition'))[1].get('name')
+        stream_factory = self.stream_factory
+        self.stream_factory = functools.partial(stream_factory, name=name)
+        try:
+            return super(UploadMultiPartParser, self).start_file_streaming(filename, headers, total_content_length)
+        finally:
+            self.stream_factory = stream_factory
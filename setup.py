@@ -17,7 +17,12 @@ author_email = 'tom@tomchristie.com'
 license = 'BSD'
 install_requires = [
     'Flask >= 0.10.1',
+    # The multipart parser is extended for uploads, and was rewritten in 2.0.
+    'Werkzeug >= 1.0, < 2.0',
 ]
+extras_require = {
+    'lazyjson': ['pysimdjson'],
+}
 
 long_description = """Browsable web APIs for Flask."""
 
@@ -77,6 +82,7 @@ setup(
     packages=get_packages(package),
     package_data=get_package_data(package),
     install_requires=install_requires,
+    extras_require=extras_require,
     classifiers=[
         'Development Status :: 4 - Beta',
         'Environment :: Web Environment',